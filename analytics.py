@@ -0,0 +1,190 @@
+import os, time, argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from graph_index import open_index, index_dir_for, DATA_DIR, INDEX_DIR, GraphIndex
+from metrics import REGISTRY, main_entry
+
+# =============================
+# Phân tích đồ thị ngay trong Python (thay cho Neo4j GDS)
+#   python analytics.py [--edges played_for coached] [--samples 256] [--workers 4] [--parquet]
+# Ghi data/analytics/{player,club,coach}_metrics.csv: degree, pagerank, betweenness, component, community
+# → nạp lại vào Neo4j bằng epl_gds.cypher
+# =============================
+OUT_DIR = os.path.join(DATA_DIR, "analytics")
+LABELS = {"player_": "player", "club_": "club", "coach_": "coach"}
+DEFAULT_EDGES = ("played_for", "coached")
+
+def adjacency(g):
+    n = g.n_nodes
+    return sp.csr_matrix((np.ones(len(g.indices), dtype=np.float64), np.asarray(g.indices), np.asarray(g.indptr)),
+                         shape=(n, n))
+
+# ---------- các thuật toán ----------
+def degree(g):
+    return np.diff(np.asarray(g.indptr))
+
+def pagerank(A, damping=0.85, tol=1e-6, max_iter=100):
+    """Lặp luỹ thừa: r ← d·Aᵀ(r/deg) + (d·Σr[dangling] + 1 − d)/n; dừng khi Σ|Δr| < tol·n (như networkx)."""
+    n = A.shape[0]
+    deg = np.asarray(A.sum(axis=1)).ravel()
+    inv = np.divide(1.0, deg, out=np.zeros(n), where=deg > 0)
+    dangling = deg == 0
+    r = np.full(n, 1.0 / n)
+    At = A.T.tocsr()
+    for it in range(max_iter):
+        nxt = damping * (At @ (r * inv)) + (damping * r[dangling].sum() + 1 - damping) / n
+        err = np.abs(nxt - r).sum()
+        if err < tol * n:
+            return nxt, it + 1
+        r = nxt
+    print(f"⚠️  PageRank chưa hội tụ sau {max_iter} vòng (Σ|Δr| = {err:.2e} ≥ {tol * n:.2e})")
+    return r, max_iter
+
+_G = None
+
+def _init_bc(index_dir):
+    global _G
+    _G = GraphIndex.load(index_dir)
+
+def _brandes(sources):
+    """Brandes cho 1 nhóm nguồn; mỗi tầng BFS xử lý bằng mảng (không lặp từng node)."""
+    indptr, indices = np.asarray(_G.indptr), np.asarray(_G.indices)
+    n = len(indptr) - 1
+    bc = np.zeros(n)
+    for s in sources:
+        dist = np.full(n, -1, dtype=np.int64)
+        sigma = np.zeros(n)
+        dist[s], sigma[s] = 0, 1.0
+        levels, frontier = [np.array([s])], np.array([s])
+        while len(frontier):
+            lens = indptr[frontier + 1] - indptr[frontier]
+            total = int(lens.sum())
+            if not total:
+                break
+            offs = np.repeat(indptr[frontier] - (np.cumsum(lens) - lens), lens) + np.arange(total)
+            nbrs, srcs = indices[offs], np.repeat(frontier, lens)
+            d = dist[frontier[0]] + 1
+            new = np.unique(nbrs[dist[nbrs] < 0])
+            dist[new] = d
+            on = dist[nbrs] == d                     # cạnh nằm trên đường ngắn nhất
+            np.add.at(sigma, nbrs[on], sigma[srcs[on]])
+            if not len(new):
+                break
+            levels.append(new)
+            frontier = new
+        delta = np.zeros(n)
+        for lvl in range(len(levels) - 1, 0, -1):
+            w = levels[lvl]
+            lens = indptr[w + 1] - indptr[w]
+            offs = np.repeat(indptr[w] - (np.cumsum(lens) - lens), lens) + np.arange(int(lens.sum()))
+            v, ws = indices[offs], np.repeat(w, lens)
+            up = dist[v] == lvl - 1
+            v, ws = v[up], ws[up]
+            np.add.at(delta, v, sigma[v] / sigma[ws] * (1 + delta[ws]))
+        delta[s] = 0
+        bc += delta
+    return bc
+
+def betweenness(g, samples=256, workers=1, index_dir=INDEX_DIR, seed=0):
+    """Betweenness xấp xỉ: Brandes từ `samples` nguồn ngẫu nhiên, nhân n/k (đồ thị vô hướng → chia 2)."""
+    n = g.n_nodes
+    k = min(samples, n) if samples else n
+    sources = np.sort(np.random.default_rng(seed).choice(n, size=k, replace=False))
+    chunks = [c for c in np.array_split(sources, max(1, workers * 4)) if len(c)]
+    if workers <= 1:
+        _init_bc(index_dir)
+        bc = sum(_brandes(c) for c in chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_bc, initargs=(index_dir,)) as ex:
+            bc = sum(ex.map(_brandes, chunks))
+    return bc * (n / k) / 2.0
+
+def components(A):
+    return connected_components(A, directed=False)
+
+def label_propagation(A, max_iter=50, tol=1e-3):
+    """Lan truyền nhãn đồng bộ, vector hoá: mỗi node lấy nhãn phổ biến nhất trong {bản thân} ∪ láng giềng
+    (hoà → nhãn nhỏ nhất). Tính cả bản thân để tránh dao động 2 pha trên đồ thị hai phía cầu thủ — CLB."""
+    n = A.shape[0]
+    A = (A + sp.identity(n, format="csr")).tocoo()
+    rows, cols = A.row.astype(np.int64), A.col
+    labels = np.arange(n, dtype=np.int64)
+    for it in range(max_iter):
+        key = rows * n + labels[cols]
+        uniq, counts = np.unique(key, return_counts=True)
+        node, lab = uniq // n, uniq % n
+        order = np.lexsort((lab, -counts, node))      # theo node, số phiếu giảm dần, nhãn tăng dần
+        node, lab = node[order], lab[order]
+        first = np.r_[True, node[1:] != node[:-1]]
+        new = labels.copy()
+        new[node[first]] = lab[first]
+        changed = int((new != labels).sum())
+        labels = new
+        if changed <= tol * n:
+            return labels, it + 1
+    return labels, max_iter
+
+def modularity(A, labels):
+    """Q = Σ_c [L_c/m − (d_c/2m)²] (vector hoá)."""
+    coo = A.tocoo()
+    m = coo.data.sum() / 2
+    if not m:
+        return 0.0
+    same = labels[coo.row] == labels[coo.col]
+    inside = np.bincount(labels[coo.row[same]], weights=coo.data[same]) / 2
+    deg = np.bincount(labels, weights=np.asarray(A.sum(axis=1)).ravel())
+    return float(inside.sum() / m - ((deg / (2 * m)) ** 2).sum())
+
+# ---------- chạy + ghi ----------
+def run(edges=DEFAULT_EDGES, samples=256, workers=1, out_dir=OUT_DIR, parquet=False, index_dir=None):
+    index_dir = index_dir or index_dir_for(edges)
+    timings = {}
+
+    def timed(name, fn, *a, **kw):
+        t0 = time.perf_counter()
+        out = fn(*a, **kw)
+        timings[name] = time.perf_counter() - t0
+        REGISTRY.observe("call_seconds", timings[name], kind="load" if name == "load" else "build", fn=name)
+        print(f"⏱️  {name:<18} {timings[name] * 1000:10.1f} ms")
+        return out
+
+    g = timed("load", open_index, edges, index_dir, verbose=False)
+    A = timed("adjacency", adjacency, g)
+    deg = timed("degree", degree, g)
+    pr, pr_iter = timed("pagerank", pagerank, A)
+    bc = timed("betweenness", betweenness, g, samples, workers, index_dir)
+    n_comp, comp = timed("components", components, A)
+    comm, lp_iter = timed("label_propagation", label_propagation, A)
+    q = modularity(A, comm)
+    print(f"📈 {g.n_nodes} node, {g.n_edges} cạnh | PageRank {pr_iter} vòng | {n_comp} thành phần liên thông | "
+          f"{len(np.unique(comm))} cộng đồng (LPA {lp_iter} vòng, modularity {q:.3f})")
+
+    keys = np.asarray(g.keys).astype(str)
+    df = pd.DataFrame({"id": keys, "degree": deg, "pagerank": pr, "betweenness": bc,
+                       "component": comp, "community": comm})
+    os.makedirs(out_dir, exist_ok=True)
+    for prefix, label in LABELS.items():
+        part = df[df["id"].str.startswith(prefix)]
+        if part.empty:
+            continue
+        path = os.path.join(out_dir, f"{label}_metrics.csv")
+        part.to_csv(path, index=False, encoding="utf-8")
+        if parquet:
+            part.to_parquet(path[:-4] + ".parquet", index=False)
+        print(f"✅ {path} → {len(part)} dòng")
+    return df, timings
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="PageRank / degree / betweenness / thành phần / cộng đồng")
+    ap.add_argument("--edges", nargs="+", default=list(DEFAULT_EDGES))
+    ap.add_argument("--samples", type=int, default=256, help="số nguồn cho betweenness xấp xỉ (0 = chính xác)")
+    ap.add_argument("--workers", type=int, default=1, help="số process cho betweenness")
+    ap.add_argument("--parquet", action="store_true", help="ghi thêm file .parquet (cần pyarrow)")
+    args = ap.parse_args(argv)
+    run(args.edges, args.samples, args.workers, parquet=args.parquet)
+
+if __name__ == "__main__":
+    main_entry("analytics", main)
@@ -0,0 +1,116 @@
+import os, sys, random, argparse
+
+# =============================
+# Benchmark hợp nhất thực thể trên đội hình tổng hợp ~100k người
+#   python bench/bench_entity_resolution.py --persons 100000
+# Mỗi người 1 bản ghi gốc; VARIANT_RATE người có thêm 1 bản ghi biến thể (lỗi gõ, đảo thứ tự từ, viết tắt,
+# tên đệm, dấu) và JUNK_RATE bản ghi rác → biết trước đáp án, đo được precision / recall cùng thông lượng.
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import RESULT_DIR, use_etl, measure, add_common_args, parse_args, finish
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "ben", "tor", "san", "vi", "del", "mar", "ko", "ne", "las", "ri", "go", "fer",
+             "tu", "an", "sel", "do", "pe", "ja", "mo", "lin", "che", "va", "ros", "bi", "zu", "ha", "nu", "ell"]
+ACCENTS = {"a": "á", "e": "é", "o": "ø", "u": "ü", "i": "í", "n": "ñ", "c": "ç"}
+NATIONS = [f"N{i:02d}" for i in range(60)]
+POSITIONS = ["GK", "DF", "MF", "FW"]
+JUNK = ["Unknown †", "Vacant", "TBA", "Caretaker", "Under-23s Head Coach"]
+VARIANT_RATE = 0.10
+JUNK_RATE = 0.005
+
+def _word(rnd, lo=2, hi=4):
+    return "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(lo, hi))).capitalize()
+
+def _variant(rnd, name):
+    first, *rest = name.split()
+    kind = rnd.choice(["typo", "swap", "initial", "middle", "accent"])
+    if kind == "typo":
+        last = rest[-1]
+        i = rnd.randrange(1, len(last) - 1)
+        last = last[:i] + last[i + 1:] if rnd.random() < 0.5 else last[:i] + last[i] + last[i:]
+        return " ".join([first] + rest[:-1] + [last]), kind
+    if kind == "swap":
+        return " ".join(rest + [first]), kind
+    if kind == "initial":
+        return " ".join([first[0] + "."] + rest), kind
+    if kind == "middle":
+        return " ".join([first, _word(rnd, 2, 2)] + rest), kind
+    return "".join(ACCENTS.get(c, c) if rnd.random() < 0.5 else c for c in name), kind
+
+def synthetic_roster(persons, clubs=200, seasons=33, seed=0):
+    """(node rows, relation rows, đáp án {id biến thể: id gốc}, id rác)."""
+    rnd = random.Random(seed)
+    nodes, rels, truth, junk = [], [], {}, set()
+
+    def add(pid, name, nation, position, career):
+        nodes.append({"player_id": pid, "name": name, "nation": nation, "position": position})
+        rels.extend({"player_id": pid, "club_id": c, "season": s, "position": position} for c, s in career)
+
+    for i in range(persons):
+        name = f"{_word(rnd)} {_word(rnd)}"
+        nation, position = rnd.choice(NATIONS), rnd.choice(POSITIONS)
+        career = [(f"club_{rnd.randrange(clubs)}", f"S{rnd.randrange(seasons)}") for _ in range(rnd.randint(1, 6))]
+        pid = f"player_{i}"
+        add(pid, name, nation, position, career)
+        if rnd.random() < VARIANT_RATE:
+            alias, _ = _variant(rnd, name)
+            # biến thể xuất hiện ở trang khác: cùng CLB (mùa khác) hoặc chỉ cùng quốc tịch
+            club = career[0][0] if rnd.random() < 0.7 else f"club_{rnd.randrange(clubs)}"
+            add(f"{pid}_v", alias, nation if rnd.random() < 0.8 else "", position, [(club, "S99")])
+            truth[f"{pid}_v"] = pid
+    for k in range(int(persons * JUNK_RATE)):
+        jid = f"player_junk_{k}"
+        add(jid, rnd.choice(JUNK), "", "", [(f"club_{rnd.randrange(clubs)}", "S0")])
+        junk.add(jid)
+    return nodes, rels, truth, junk
+
+def accuracy(mapping, records, truth, junk):
+    """Precision / recall trên các cặp được gộp (so với đáp án)."""
+    merged = {r.id: mapping[r.id] for r in records if mapping.get(r.id) not in (None, r.id)}
+    tp = sum(1 for a, c in merged.items() if truth.get(a) == c or truth.get(c) == a
+             or (a in truth and truth[a] == truth.get(c)))
+    precision = tp / len(merged) if merged else 1.0
+    recall = tp / len(truth) if truth else 1.0
+    junk_recall = sum(1 for j in junk if mapping.get(j) is None) / len(junk) if junk else 1.0
+    return precision, recall, junk_recall
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark hợp nhất thực thể (blocking + Jaro-Winkler + union-find)")
+    ap.add_argument("--persons", type=int, default=100_000, help="số người khác nhau")
+    ap.add_argument("--naive-sample", type=int, default=2_000,
+                    help="số bản ghi cho phép so từng cặp O(n²) để so sánh (0 = bỏ)")
+    add_common_args(ap, os.path.join(RESULT_DIR, "entity_resolution.json"))
+    args = parse_args(ap, argv)
+    use_etl()
+
+    import entity_resolution as er
+
+    nodes, rels, truth, junk = synthetic_roster(args.persons)
+    records = er.make_records("Player", nodes, rels)
+    print(f"⏱️  {len(records)} bản ghi ({args.persons} người, {len(truth)} biến thể, {len(junk)} rác)")
+
+    mapping, _, st = er.resolve(records)
+    precision, recall, junk_recall = accuracy(mapping, records, truth, junk)
+    print(f"🎯 precision {precision:.3f}, recall {recall:.3f}, rác bị loại {junk_recall:.3f} — "
+          f"{st['pairs']} cặp ứng viên ({st['pairs'] / max(1, st['naive_pairs']):.2e} của n²), "
+          f"{st['skipped_blocks']} khối quá lớn bị bỏ")
+
+    results = [
+        measure("make_records", er.make_records, [("Player", nodes, rels)], args.repeat, len),
+        measure("candidate_pairs", lambda rs: sum(1 for _ in er.candidate_pairs(rs)), [(records,)], args.repeat,
+                lambda n: n),
+        measure("resolve", lambda rs: er.resolve(rs)[0], [(records,)], args.repeat, len),
+    ]
+    if args.naive_sample:
+        sample = records[:args.naive_sample]
+        def naive(rs):
+            return [(a.id, b.id) for i, a in enumerate(rs) for b in rs[i + 1:]
+                    if er.score_pair(a, b) >= er.THRESHOLD]
+        res = measure(f"naive_pairwise_{len(sample)}", naive, [(sample,)], 1)
+        scale = (len(records) / len(sample)) ** 2
+        print(f"   (so từng cặp trên {len(records)} bản ghi ước tính ≈ {res['mean_ms'] * scale / 1000:.0f}s)")
+        results.append(res)
+    finish(results, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os, sys, shutil, inspect, argparse, tempfile, contextlib, io
+
+# =============================
+# Benchmark parser ETL + build_relations
+#   python bench/bench_etl.py                         → ghi bench/results/etl.json
+#   python bench/bench_etl.py --baseline bench/results/etl_baseline.json
+# Fixture HTML: bench/fixtures/pages.warc.gz (có sẵn trong repo, dựng lại bằng bench/make_fixtures.py), đọc ở chế độ
+# replay; thiếu fixture → thoát lỗi thay vì bỏ qua benchmark parser.
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import DATA_DIR, RESULT_DIR, use_etl, measure, add_common_args, parse_args, finish
+from make_fixtures import FIXTURE_ARCHIVE, FIXTURE_SEASONS, FIXTURE_CLUBS, require_fixture
+
+def quiet(func):
+    """Tắt print của hàm ETL trong lúc đo."""
+    def run(*args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args)
+    return run
+
+def _len(x):
+    return 0 if x is None else len(x)
+
+def bench_parsers(repeat):
+    import pandas as pd
+    import crawl_clubs, crawl_players, crawl_coaches, crawl_seasons
+    from archive import ARCHIVE
+    from html_tables import parse_html
+
+    season_pages = [ARCHIVE.get(crawl_clubs.season_url(season)).content for season in FIXTURE_SEASONS]
+    club_args = [(name, cid, FIXTURE_SEASONS[0]) for name, cid in FIXTURE_CLUBS]
+
+    results = [
+        measure("get_table_for_season", quiet(crawl_clubs.get_table_for_season), FIXTURE_SEASONS, repeat, _len),
+        measure("_find_stadia_table", lambda c: crawl_clubs._find_stadia_table(parse_html(c)),
+                season_pages, repeat),
+        measure("get_season_info", quiet(crawl_seasons.get_season_info), FIXTURE_SEASONS, repeat),
+        measure("get_players_from_club", quiet(crawl_players.get_players_from_club), club_args, repeat, _len),
+        measure("get_coach_history", quiet(crawl_coaches.get_coach_history), club_args, repeat, _len),
+    ]
+    if any(r["rows"] == 0 for r in results if r and "rows" in r):
+        sys.exit("❌ Parser không bóc được dòng nào từ fixture — archive hỏng hoặc parser hỏng")
+
+    # extract_coach_name / extract_years trên ô thật (từ data/) + ô nhiều dòng tổng hợp
+    coached = pd.read_csv(os.path.join(DATA_DIR, "relations", "coached.csv"))
+    coaches = pd.read_csv(os.path.join(DATA_DIR, "nodes", "coaches.csv"))
+    names = coaches["name"].astype(str).tolist()
+    years = coached["years"].fillna("").astype(str).tolist()
+    multi = [f"{n}\nENG\n{y}\n44.34" for n, y in zip(names, years)]
+    results += [
+        measure("extract_coach_name", lambda cells: [crawl_coaches.extract_coach_name(c) for c in cells],
+                [(names + multi,)], repeat, _len),
+        measure("extract_years", lambda cells: [crawl_coaches.extract_years(c) for c in cells],
+                [(years + multi,)], repeat, _len),
+    ]
+    return results
+
+def _required_params(func):
+    params = inspect.signature(func).parameters.values()
+    return [p for p in params if p.default is p.empty and p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+
+def bench_build_relations(repeat):
+    import build_relations
+
+    tmp = tempfile.mkdtemp(prefix="epl_bench_")
+    try:
+        for sub in ("nodes", "relations"):
+            shutil.copytree(os.path.join(DATA_DIR, sub), os.path.join(tmp, sub))
+        os.makedirs(os.path.join(tmp, "edges"))
+        # trỏ module sang bản sao để không ghi đè data/edges thật
+        build_relations.NODE_DIR = os.path.join(tmp, "nodes")
+        build_relations.REL_DIR = os.path.join(tmp, "relations")
+        build_relations.EDGE_DIR = os.path.join(tmp, "edges")
+        results = []
+        for name in sorted(n for n in dir(build_relations) if n.startswith("build_")):
+            func = getattr(build_relations, name)
+            # build_edges(name) / build_all(...) là hàm chung — chỉ đo từng build_<cạnh>() không tham số bắt buộc
+            if callable(func) and not _required_params(func):
+                results.append(measure(f"build_relations.{name}", quiet(func), [()], repeat))
+        return results
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark parser ETL và build_relations")
+    add_common_args(ap, os.path.join(RESULT_DIR, "etl.json"))
+    args = parse_args(ap, argv)
+
+    # replay từ fixture: không ra mạng, không dùng page cache
+    require_fixture()
+    os.environ["EPL_ARCHIVE_MODE"] = "replay"
+    os.environ["EPL_ARCHIVE"] = FIXTURE_ARCHIVE
+    use_etl()
+
+    print("⏱️  Parser ETL")
+    results = bench_parsers(args.repeat)
+    print("⏱️  build_relations")
+    results += bench_build_relations(args.repeat)
+    finish(results, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os, re, io, sys, random, argparse, contextlib
+
+# =============================
+# Benchmark chuẩn hoá ID trên hàng trăm nghìn tên tổng hợp
+#   python bench/bench_ids.py --names 300000
+# So sánh: cách cũ (unidecode + 2 re.sub mỗi dòng, .apply) với ids.make_ids (factorize + memo)
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import RESULT_DIR, use_etl, measure, add_common_args, parse_args, finish
+
+FIRST = ["Bukayo", "Martin", "Gabriel", "Mohamed", "Virgil", "Kevin", "Erling", "Bruno", "Heung-min", "Son",
+         "Rúben", "Jérémy", "Đặng", "Łukasz", "Ødegaard", "João", "Nicolás", "Raheem", "Declan", "Cole"]
+LAST = ["Saka", "Ødegaard", "Jesus", "Salah", "van Dijk", "De Bruyne", "Haaland", "Fernandes", "Son", "Dias",
+        "Doku", "Văn Lâm", "Fabiański", "Félix", "Jackson", "Sterling", "Rice", "Palmer", "O'Brien", "Smith-Rowe"]
+
+def synthetic_names(n, distinct, seed=0):
+    """n tên, lấy từ `distinct` tên khác nhau — mô phỏng cùng cầu thủ xuất hiện ở nhiều mùa/CLB."""
+    rnd = random.Random(seed)
+    pool = [f"{rnd.choice(FIRST)} {rnd.choice(LAST)}" + (f" {i}" if i >= len(FIRST) * len(LAST) else "")
+            for i in range(distinct)]
+    return [rnd.choice(pool) for _ in range(n)]
+
+def legacy_player_id(name):
+    """Cách cũ trong crawl_players.py (trước khi gom về ids.py)."""
+    import unidecode
+    s = unidecode.unidecode(name)
+    s = re.sub(r"[^a-zA-Z0-9\s]", " ", s)
+    s = re.sub(r"\s+", "_", s.strip().lower())
+    return f"player_{s}"
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark chuẩn hoá ID")
+    ap.add_argument("--names", type=int, default=300_000, help="số tên")
+    ap.add_argument("--distinct", type=int, default=20_000, help="số tên khác nhau")
+    add_common_args(ap, os.path.join(RESULT_DIR, "ids.json"))
+    args = parse_args(ap, argv)
+    use_etl()
+
+    import pandas as pd
+    import ids
+
+    names = pd.Series(synthetic_names(args.names, args.distinct))
+    if not names.map(legacy_player_id).equals(ids.make_ids("player", names)):
+        sys.exit("❌ make_ids cho kết quả khác cách cũ")
+
+    def cold(s):
+        ids.slug.cache_clear()
+        return ids.make_ids("player", s)
+
+    print(f"⏱️  {args.names} tên ({args.distinct} khác nhau)")
+    results = [
+        measure("legacy_apply", lambda s: s.map(legacy_player_id), [(names,)], args.repeat, len),
+        measure("make_player_id_loop", lambda s: [ids.make_player_id(x) for x in s], [(names,)], args.repeat, len),
+        measure("make_ids_cold", cold, [(names,)], args.repeat, len),
+        measure("make_ids_warm", lambda s: ids.make_ids("player", s), [(names,)], args.repeat, len),
+    ]
+
+    # va chạm: cùng tên, khác quốc tịch
+    df = pd.DataFrame({"player_id": ids.make_ids("player", names),
+                       "nation": [("ENG", "FRA", "BRA")[i % 3] for i in range(len(names))]})
+    def collisions(d):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ids.resolve_collisions(d, "player_id", ["nation"])[1]
+    results.append(measure("resolve_collisions", collisions, [(df.head(20_000),)], args.repeat, len))
+    print(f"🧠 memo: {ids.id_cache_info()}")
+    finish(results, args)
+
+if __name__ == "__main__":
+    main()
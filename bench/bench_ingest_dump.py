@@ -0,0 +1,384 @@
+import os, io, sys, bz2, csv, random, shutil, argparse, tempfile
+from xml.sax.saxutils import escape
+
+# =============================
+# Dump Wikipedia nhỏ tự sinh (bz2, định dạng export-0.11) để chạy ingest_dump.py offline + đo tốc độ đọc
+#   python bench/bench_ingest_dump.py --filler 20000
+# Fixture: 2 bài mùa giải, 4 trang CLB (có redirect, Fs player, "Out on loan", infobox), 3 bài mùa của CLB
+# (wikitable / Fs player), 2 trang "List of … managers" + trang nhiễu (bài thường, redirect, Talk:, CLB ngoài EPL).
+# Kiểm tra output từng dòng với kết quả mong đợi (GOLDEN), rồi đo thông lượng / bộ nhớ đỉnh khi dump lớn dần.
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import RESULT_DIR, use_etl, measure, add_common_args, parse_args, finish
+
+NS = "http://www.mediawiki.org/xml/export-0.11/"
+
+SEASON_2425 = """{{Short description|34th season of the Premier League}}
+The '''2024–25 Premier League''' was the 33rd season.<ref>{{cite web|url=http://x|title=x}}</ref>
+== Teams ==
+=== Stadiums and locations ===
+{| class="wikitable sortable" style="text-align:center;"
+|-
+! Team !! Location !! Stadium !! Capacity<ref name="cap">x</ref>
+|-
+| [[Arsenal F.C.|Arsenal]] || [[London]] <small>([[Holloway, London|Holloway]])</small> || [[Emirates Stadium]] || {{nts|60704}}
+|-
+| [[Brighton & Hove Albion|Brighton & Hove Albion]] || [[Brighton and Hove|Brighton]] ([[Falmer]]) || [[Falmer Stadium|American Express Stadium]] || {{nts|31876}}
+|-
+| [[Liverpool F.C.|Liverpool]]
+| [[Liverpool]] ([[Anfield]])
+| [[Anfield]] || {{nts|61276}}
+|}
+== Personnel and kits ==
+{| class="wikitable"
+! Team !! Manager
+|-
+| [[Arsenal F.C.|Arsenal]] || {{flagicon|ESP}} [[Mikel Arteta]]
+|}
+"""
+
+SEASON_2324 = """The '''2023–24 Premier League''' was the 32nd season.
+=== Stadiums and locations ===
+{| class="wikitable sortable"
+! Team !! Location !! Stadium !! Capacity
+|-
+| [[Arsenal F.C.|Arsenal]] || [[London]] ([[Holloway, London|Holloway]]) || [[Emirates Stadium]] || {{nts|60704}}
+|-
+| [[Liverpool F.C.|Liverpool]] || [[Liverpool]] ([[Anfield]]) || [[Anfield]] || {{nts|61276}}
+|-
+| [[Luton Town F.C.|Luton Town]] || [[Luton]] || [[Kenilworth Road]] || {{nts|12000}}
+|}
+"""
+
+ARSENAL = """{{Infobox football club
+| clubname = Arsenal
+| image = Arsenal FC.svg
+| ground = [[Emirates Stadium]]
+| chairman = [[Stan Kroenke]]
+| mgrtitle = Manager
+| manager = [[Mikel Arteta]]
+| league = [[Premier League]]
+}}
+'''Arsenal Football Club''' is a professional football club based in [[Islington]], London.
+== Players ==
+=== First-team squad ===
+{{Fs start}}
+{{Fs player|no=1|nat=ESP|pos=GK|name=[[David Raya]]}}
+{{Fs player|no=2|nat=FRA|pos=DF|name=[[William Saliba]]}}
+{{Fs player|no=8|nat=NOR|pos=MF|name=[[Martin Ødegaard]]|other=[[Captain (association football)|captain]]}}
+{{Fs mid}}
+{{Fs player|no=7|nat=ENG|pos=FW|name=[[Bukayo Saka]]<ref>x</ref>}}
+{{Fs end}}
+=== Out on loan ===
+{{Fs start}}
+{{Fs player|no=—|nat=ENG|pos=FW|name=[[Reiss Nelson]]|other=at [[Fulham F.C.|Fulham]]}}
+{{Fs end}}
+== Managerial history ==
+Arsenal have had many managers; see [[List of Arsenal F.C. managers]].
+"""
+
+ARSENAL_LIST = """This is a list of '''managers of Arsenal''' since 1897.
+== Managers ==
+{| class="wikitable sortable"
+! rowspan="2" | Name !! rowspan="2" | Nat. !! colspan="2" | Tenure !! rowspan="2" | P
+|-
+! From !! To
+|-
+| {{sortname|Thomas|Mitchell}} || {{flagicon|SCO}} || {{dts|1897|8|30}} || {{dts|1898|3|11}} || 30
+|-
+| {{sortname|Herbert|Chapman}} || {{flagicon|ENG}} || {{dts|1925|6|11}} || {{dts|1934|1|6}} || 403
+|-
+| {{sortname|George|Graham}}<ref>{{cite book|title=x}}</ref> || {{flagicon|SCO}} || {{dts|1986|5|14}} || {{dts|1995|2|21}} || 460
+|-
+| {{sortname|Arsène|Wenger}} || {{flagicon|FRA}} || {{dts|1996|10|1}} || {{dts|2018|5|13}} || 1235
+|-
+| {{sortname|Mikel|Arteta}} || {{flagicon|ESP}} || {{dts|2019|12|20}} || Present || 280
+|}
+{| class="wikitable"
+! Caretaker !! Games
+|-
+| [[Pat Rice]] || 1
+|}
+"""
+
+LIVERPOOL = """{{Infobox football club
+| clubname = Liverpool
+| manager = [[Arne Slot]]
+| league = [[Premier League]]
+}}
+'''Liverpool Football Club''' is a professional football club.
+== Players ==
+=== First-team squad ===
+{{Fs start}}
+{{Fs player|no=1|nat=BRA|pos=GK|name=[[Alisson Becker|Alisson]]}}
+{{Fs player|no=4|nat=NED|pos=DF|name=[[Virgil van Dijk]]|other=captain}}
+{{Fs player|no=11|nat=EGY|pos=FW|name=[[Mohamed Salah]]}}
+{{Fs end}}
+== Managers ==
+{| class="wikitable"
+! Dates !! Name !! Notes
+|-
+| 1959–1974 || [[Bill Shankly]] ||
+|-
+| 2015–2024 || [[Jürgen Klopp]] || {{efn|Won the Premier League}}
+|-
+| 2024– || [[Arne Slot]] ||
+|}
+"""
+
+BRIGHTON = """{{Infobox football club
+| clubname = Brighton & Hove Albion
+| manager = [[Fabian Hürzeler]]
+| league = [[Premier League]]
+}}
+'''Brighton & Hove Albion Football Club''' plays in the Premier League.
+== Players ==
+=== First-team squad ===
+{{Football squad player|no=1|nat=NED|pos=GK|name=[[Bart Verbruggen]]}}
+{{Football squad player|no=5|nat=ENG|pos=DF|name=[[Lewis Dunk]]|other=captain}}
+"""
+
+LUTON = """{{infobox Football club
+| manager = [[Matt Bloomfield]]
+| league = [[EFL Championship]]
+}}
+'''Luton Town''' were promoted to the Premier League in 2023.
+== Managers ==
+{| class="wikitable"
+! Name !! From
+|-
+| [[Rob Edwards (footballer, born 1982)|Rob Edwards]] || 2022
+|-
+| [[Matt Bloomfield]] || 2025
+|}
+"""
+
+ARSENAL_2324 = """The '''2023–24 season''' was Arsenal's 32nd season in the Premier League.
+== Squad ==
+{| class="wikitable"
+! No. !! Pos. !! Nat. !! Player
+|-
+| 1 || GK || {{flagicon|ENG}} ENG || [[Aaron Ramsdale]]
+|-
+| 2 || DF || {{flagicon|FRA}} FRA || [[William Saliba]]
+|-
+| 41 || MF || {{flagicon|ENG}} ENG || [[Declan Rice]]<ref>signed</ref>
+|}
+== Transfers ==
+{| class="wikitable"
+! Player !! From
+|-
+| [[Kai Havertz]] || Chelsea
+|}
+"""
+
+LIVERPOOL_2324 = """The 2023–24 season was Liverpool's 32nd in the Premier League.
+== First-team squad ==
+{{Fs start}}
+{{Fs player|no=1|nat=BRA|pos=GK|name=[[Alisson Becker|Alisson]]}}
+{{Fs player|no=66|nat=ENG|pos=DF|name=[[Trent Alexander-Arnold]]|other=vice-captain}}
+{{Fs end}}
+"""
+
+LUTON_2324 = """Luton Town's first season in the Premier League.
+== Players ==
+{{Fs player|no=1|nat=ENG|pos=GK|name=[[Thomas Kaminski]]}}
+"""
+
+WOLFSBURG = """{{Infobox football club
+| manager = [[Ralph Hasenhüttl]]
+| league = [[Bundesliga]]
+}}
+'''VfL Wolfsburg''' is a German club.
+== Players ==
+=== First-team squad ===
+{{Fs player|no=1|nat=BEL|pos=GK|name=[[Koen Casteels]]}}
+"""
+
+PAGES = [
+    ("2024–25 Premier League", 0, None, SEASON_2425),
+    ("2023–24 Premier League", 0, None, SEASON_2324),
+    ("Arsenal F.C.", 0, None, ARSENAL),
+    ("List of Arsenal F.C. managers", 0, None, ARSENAL_LIST),
+    ("Liverpool F.C.", 0, None, LIVERPOOL),
+    ("Brighton & Hove Albion F.C.", 0, None, BRIGHTON),
+    ("Brighton & Hove Albion", 0, "Brighton & Hove Albion F.C.", "#REDIRECT [[Brighton & Hove Albion F.C.]]"),
+    ("Luton Town F.C.", 0, None, LUTON),
+    ("2023–24 Arsenal F.C. season", 0, None, ARSENAL_2324),
+    ("2023–24 Liverpool F.C. season", 0, None, LIVERPOOL_2324),
+    ("2023–24 Luton Town F.C. season", 0, None, LUTON_2324),
+    ("VfL Wolfsburg", 0, None, WOLFSBURG),
+    ("Talk:Arsenal F.C.", 1, None, "{{Infobox football club}} Premier League talk"),
+]
+
+# ---------- kết quả mong đợi (cột như crawler ghi ra) ----------
+GOLDEN = {
+    "nodes/clubs.csv": [
+        # "Capacity" cũng khớp cột Location ở crawl_clubs → 2 cột Location, như data/nodes/clubs.csv thật
+        ["club_id", "Club", "Location", "Location", "Stadium"],
+        ["club_arsenal", "Arsenal", "London (Holloway)", "60704", "Emirates Stadium"],
+        ["club_brighton_hove_albion", "Brighton & Hove Albion", "Brighton (Falmer)", "31876", "American Express Stadium"],
+        ["club_liverpool", "Liverpool", "Liverpool (Anfield)", "61276", "Anfield"],
+        ["club_luton_town", "Luton Town", "Luton", "12000", "Kenilworth Road"],
+    ],
+    "relations/clubs_by_season.csv": [
+        ["club_id", "Club", "Season"],
+        ["club_arsenal", "Arsenal", "2024–25"],
+        ["club_brighton_hove_albion", "Brighton & Hove Albion", "2024–25"],
+        ["club_liverpool", "Liverpool", "2024–25"],
+        ["club_arsenal", "Arsenal", "2023–24"],
+        ["club_liverpool", "Liverpool", "2023–24"],
+        ["club_luton_town", "Luton Town", "2023–24"],
+    ],
+    "nodes/players.csv": [
+        ["player_id", "name", "nation", "position"],
+        ["player_aaron_ramsdale", "Aaron Ramsdale", "ENG", "GK"],
+        ["player_alisson", "Alisson", "BRA", "GK"],
+        ["player_bart_verbruggen", "Bart Verbruggen", "NED", "GK"],
+        ["player_bukayo_saka", "Bukayo Saka", "ENG", "FW"],
+        ["player_david_raya", "David Raya", "ESP", "GK"],
+        ["player_declan_rice", "Declan Rice", "ENG", "MF"],
+        ["player_lewis_dunk_captain", "Lewis Dunk (captain)", "ENG", "DF"],
+        ["player_martin_odegaard_captain", "Martin Ødegaard (captain)", "NOR", "MF"],
+        ["player_mohamed_salah", "Mohamed Salah", "EGY", "FW"],
+        ["player_thomas_kaminski", "Thomas Kaminski", "ENG", "GK"],
+        ["player_trent_alexander_arnold_vice_captain", "Trent Alexander-Arnold (vice-captain)", "ENG", "DF"],
+        ["player_virgil_van_dijk_captain", "Virgil van Dijk (captain)", "NED", "DF"],
+        ["player_william_saliba", "William Saliba", "FRA", "DF"],
+    ],
+    "relations/played_for.csv": [
+        ["player_id", "club_id", "season", "position"],
+        ["player_bukayo_saka", "club_arsenal", "2024–25", "FW"],
+        ["player_david_raya", "club_arsenal", "2024–25", "GK"],
+        ["player_martin_odegaard_captain", "club_arsenal", "2024–25", "MF"],
+        ["player_william_saliba", "club_arsenal", "2024–25", "DF"],
+        ["player_aaron_ramsdale", "club_arsenal", "2023–24", "GK"],
+        ["player_declan_rice", "club_arsenal", "2023–24", "MF"],
+        ["player_william_saliba", "club_arsenal", "2023–24", "DF"],
+        ["player_bart_verbruggen", "club_brighton_hove_albion", "2024–25", "GK"],
+        ["player_lewis_dunk_captain", "club_brighton_hove_albion", "2024–25", "DF"],
+        ["player_alisson", "club_liverpool", "2024–25", "GK"],
+        ["player_mohamed_salah", "club_liverpool", "2024–25", "FW"],
+        ["player_virgil_van_dijk_captain", "club_liverpool", "2024–25", "DF"],
+        ["player_alisson", "club_liverpool", "2023–24", "GK"],
+        ["player_trent_alexander_arnold_vice_captain", "club_liverpool", "2023–24", "DF"],
+        ["player_thomas_kaminski", "club_luton_town", "2023–24", "GK"],
+    ],
+    "nodes/coaches.csv": [
+        ["coach_id", "name"],
+        ["coach_arne_slot", "Arne Slot"],
+        ["coach_arsene_wenger", "Arsène Wenger"],
+        ["coach_bill_shankly", "Bill Shankly"],
+        ["coach_fabian_hurzeler", "Fabian Hürzeler"],
+        ["coach_george_graham", "George Graham"],
+        ["coach_herbert_chapman", "Herbert Chapman"],
+        ["coach_jurgen_klopp", "Jürgen Klopp"],
+        ["coach_matt_bloomfield", "Matt Bloomfield"],
+        ["coach_mikel_arteta", "Mikel Arteta"],
+        ["coach_rob_edwards", "Rob Edwards"],
+        ["coach_thomas_mitchell", "Thomas Mitchell"],
+    ],
+    "relations/coached.csv": [
+        # trong mỗi CLB theo coach_id (part của Checkpoint được sắp theo khoá, như crawler)
+        ["coach_id", "club_id", "season", "years", "is_current"],
+        ["coach_arsene_wenger", "club_arsenal", "2024–25", "1 October 1996", "False"],
+        ["coach_george_graham", "club_arsenal", "2024–25", "14 May 1986", "False"],
+        ["coach_herbert_chapman", "club_arsenal", "2024–25", "11 June 1925", "False"],
+        ["coach_mikel_arteta", "club_arsenal", "2024–25", "20 December 2019", "True"],
+        ["coach_thomas_mitchell", "club_arsenal", "2024–25", "30 August 1897", "False"],
+        ["coach_fabian_hurzeler", "club_brighton_hove_albion", "2024–25", "", "True"],
+        ["coach_arne_slot", "club_liverpool", "2024–25", "2024–", "True"],
+        ["coach_bill_shankly", "club_liverpool", "2024–25", "1959–1974", "False"],
+        ["coach_jurgen_klopp", "club_liverpool", "2024–25", "2015–2024", "False"],
+        ["coach_matt_bloomfield", "club_luton_town", "2024–25", "2025", "True"],
+        ["coach_rob_edwards", "club_luton_town", "2024–25", "2022", "False"],
+    ],
+}
+
+def _filler(rnd, i):
+    """Trang nhiễu: bài thường / redirect / trang ns khác — như phần lớn dump thật."""
+    words = ["football", "league", "river", "history", "album", "village", "station", "season", "club", "music"]
+    kind = rnd.random()
+    if kind < 0.3:
+        return f"Redirect page {i}", 0, f"Article {rnd.randrange(i + 1)}", f"#REDIRECT [[Article {i}]]"
+    if kind < 0.4:
+        return f"Talk:Article {i}", 1, None, "Discussion " * 50
+    body = " ".join(rnd.choice(words) for _ in range(rnd.randint(100, 600)))
+    return f"Article {i}", 0, None, f"'''Article {i}''' {body}\n== History ==\n{body}\n[[Category:Things]]"
+
+def _page_xml(i, title, ns, redirect, text):
+    red = f'    <redirect title="{escape(redirect, {chr(34): "&quot;"})}" />\n' if redirect else ""
+    return (f"  <page>\n    <title>{escape(title)}</title>\n    <ns>{ns}</ns>\n    <id>{i}</id>\n{red}"
+            f"    <revision>\n      <id>{i * 10}</id>\n      <model>wikitext</model>\n"
+            f'      <text bytes="{len(text.encode("utf-8"))}" xml:space="preserve">{escape(text)}</text>\n'
+            f"    </revision>\n  </page>\n")
+
+def write_fixture(path, filler=0, seed=0):
+    """Ghi dump bz2: trang fixture rải đều giữa `filler` trang nhiễu."""
+    rnd = random.Random(seed)
+    pages = list(PAGES)
+    step = max(1, filler // (len(pages) + 1))
+    with bz2.open(path, "wt", encoding="utf-8") as f:
+        f.write(f'<mediawiki xmlns="{NS}" version="0.11" xml:lang="en">\n'
+                "  <siteinfo>\n    <sitename>Wikipedia</sitename>\n  </siteinfo>\n")
+        for i in range(filler + len(PAGES)):
+            if pages and (i % step == 0 or i >= filler):
+                f.write(_page_xml(i, *pages.pop(0)))
+            else:
+                f.write(_page_xml(i, *_filler(rnd, i)))
+        f.write("</mediawiki>\n")
+    return path
+
+def check(out):
+    bad = []
+    for rel, expected in GOLDEN.items():
+        with open(os.path.join(out, rel), encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        if rows != expected:
+            bad.append(rel)
+            print(f"❌ {rel} khác kết quả mong đợi:")
+            for row in rows:
+                print(f"     {row}")
+    return bad
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark nạp dữ liệu từ dump Wikipedia (fixture tự sinh)")
+    ap.add_argument("--filler", type=int, default=20_000, help="số trang nhiễu trong dump đo tốc độ")
+    ap.add_argument("--keep", action="store_true", help="giữ thư mục tạm (dump + output) để xem")
+    add_common_args(ap, os.path.join(RESULT_DIR, "ingest_dump.json"))
+    args = parse_args(ap, argv)
+    use_etl()
+
+    import contextlib
+    import ingest_dump
+
+    tmp = tempfile.mkdtemp(prefix="epl-dump-")
+    try:
+        # ---------- kiểm tra output (dump chỉ có trang fixture + ít nhiễu) ----------
+        small = write_fixture(os.path.join(tmp, "small.xml.bz2"), filler=200)
+        out = os.path.join(tmp, "data")
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingest_dump.ingest(small, seasons=["2024–25", "2023–24"], out=out)
+        bad = check(out)
+        if bad:
+            sys.exit(f"❌ Output khác kết quả mong đợi: {', '.join(bad)}")
+        print(f"✅ Output giống kết quả mong đợi ({len(GOLDEN)} file)")
+
+        # ---------- thông lượng + bộ nhớ đỉnh khi dump lớn dần ----------
+        results = []
+        for n in (args.filler, args.filler * 4):
+            path = write_fixture(os.path.join(tmp, f"dump_{n}.xml.bz2"), filler=n)
+            mb = os.path.getsize(path) / 1e6
+            res = measure(f"extract_{n}_pages", ingest_dump.extract, [(path,)], args.repeat,
+                          lambda d: d["stats"]["pages"])
+            print(f"   {mb:.1f} MB bz2 → {mb / (res['mean_ms'] / 1000):.1f} MB/s")
+            results.append(res)
+        finish(results, args)
+    finally:
+        if args.keep:
+            print(f"📁 {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
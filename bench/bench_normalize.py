@@ -0,0 +1,268 @@
+import os, re, sys, glob, random, argparse
+
+# =============================
+# Benchmark chuẩn hoá bảng đội hình / HLV: vòng df.iterrows() cũ vs table_normalize (theo cột)
+#   python bench/bench_normalize.py --tables 200
+# Bảng tổng hợp "bẩn" (ô nhiều dòng, <br>, [1], (caretaker), \xa0, mã quốc gia, 44.34, NaN, ô số)
+# + ô thật trong data/ → kiểm tra từng dòng ra giống hệt cách cũ, rồi đo chi phí mỗi bảng.
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import RESULT_DIR, DATA_DIR, use_etl, measure, add_common_args, parse_args, finish
+
+FIRST = ["Arsène", "Mikel", "Jürgen", "José", "Pep", "Nuno", "Roy", "Sean", "Unai", "Ange", "Kevin", "Bukayo"]
+LAST = ["Wenger", "Arteta", "Klopp", "Mourinho", "Guardiola", "Espírito Santo", "Hodgson", "Dyche", "Emery",
+        "Postecoglou", "De Bruyne", "Saka", "O'Neil", "Smith-Rowe"]
+NATIONS = ["ENG", "FRA", "ESP", "POR", "GER", "SCO", "IRL", "NIR", "WAL", "BRA"]
+POSITIONS = ["GK", "DF", "MF", "FW"]
+NOISE = ["[1]", "[a]", "[note 2]", " (caretaker)", " (interim)", "\xa0", "  ", ""]
+SEPS = ["\n", "\r\n", "<br>", "<br/>", "<BR />", " \n\n"]
+
+def _noisy(rnd, s):
+    return s + rnd.choice(NOISE) if rnd.random() < 0.4 else s
+
+def _name(rnd):
+    return f"{rnd.choice(FIRST)}{rnd.choice(['', ' ', '  ', chr(160)])} {rnd.choice(LAST)}"
+
+def _coach_cell(rnd):
+    r = rnd.random()
+    if r < 0.05:
+        return float("nan")
+    if r < 0.08:
+        return rnd.choice(["", "[1]", "ENG", "44.34", "Vacant", 1999])
+    lines = [_noisy(rnd, _name(rnd))]
+    if rnd.random() < 0.3:
+        lines.insert(0, rnd.choice(NATIONS + ["60.63%", "[2]", "  "]))
+    if rnd.random() < 0.5:
+        lines += [rnd.choice(NATIONS), f"{rnd.uniform(20, 70):.2f}"]
+    return rnd.choice(SEPS).join(lines)
+
+def _years_cell(rnd):
+    r = rnd.random()
+    if r < 0.05:
+        return float("nan")
+    if r < 0.1:
+        return rnd.choice(["present", "", "[1]", 2004])
+    y = rnd.randint(1900, 2024)
+    lines = [f"{y}–{y + rnd.randint(0, 9)}", f"1 July {y} – present"]
+    if rnd.random() < 0.3:
+        lines.insert(0, rnd.choice(["Caretaker", "(interim)", "[a]"]))
+    return _noisy(rnd, rnd.choice(SEPS).join(lines[:rnd.randint(1, len(lines))]))
+
+def coach_tables(n, rows, seed=0):
+    """(DataFrame, HLV hiện tại) — tên cột giống bảng Wikipedia (có [a], (x), MultiIndex)."""
+    import pandas as pd
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        k = rnd.randint(1, rows)
+        data = {"Name": [_coach_cell(rnd) for _ in range(k)], "From[a]": [_years_cell(rnd) for _ in range(k)],
+                "Nat.": [rnd.choice(NATIONS) for _ in range(k)], "P": [rnd.randint(1, 500) for _ in range(k)]}
+        df = pd.DataFrame(data)
+        if i % 3 == 0:
+            df.columns = pd.MultiIndex.from_tuples([("Manager", "Name"), ("Tenure", "From[a]"), ("Nat.", ""),
+                                                    ("Record", "P")])
+        elif i % 3 == 1:
+            df.columns = ["Dates", "Manager (caretaker)", "Nat.", "P"]
+        current = rnd.choice(["", _name(rnd), _coach_cell(rnd) if k else "", "Mikel Arteta[1]"])
+        out.append((df, current if isinstance(current, str) else ""))
+    return out
+
+def squad_tables(n, rows, seed=0):
+    import pandas as pd
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        k = rnd.randint(0, rows)
+        df = pd.DataFrame({
+            "No.": [rnd.randint(1, 99) for _ in range(k)],
+            "Position": [_noisy(rnd, rnd.choice(POSITIONS)) for _ in range(k)],
+            "Nation": [rnd.choice(NATIONS + [float("nan")]) for _ in range(k)],
+            "Name": [rnd.choice([_noisy(rnd, _name(rnd)), _noisy(rnd, _name(rnd)), "", "[1]", float("nan")])
+                     for _ in range(k)]})
+        if rnd.random() < 0.2:
+            df = df.drop(columns=rnd.choice(["Nation", "Position"]))
+        out.append(df)
+    return out
+
+def data_cells():
+    """Ô tên (data/nodes) / years (data/relations/coached.csv) thật."""
+    import pandas as pd
+    names, years = [], []
+    for path in glob.glob(os.path.join(DATA_DIR, "nodes", "*.csv")):
+        df = pd.read_csv(path, dtype=str)
+        if "name" in df.columns:
+            names += df["name"].tolist()
+    coached = os.path.join(DATA_DIR, "relations", "coached.csv")
+    if os.path.exists(coached):
+        years += pd.read_csv(coached, dtype=str).get("years", pd.Series(dtype=str)).tolist()
+    n = min(len(names), len(years)) if years else len(names)
+    return names[:n], (years[:n] if years else names[:n])
+
+# ---------- cách cũ (bản sao từ crawl_players.py / crawl_coaches.py trước khi vector hoá) ----------
+COUNTRY_TOKEN = re.compile(r"^[A-Z]{2,4}$")
+DATEISH = re.compile(r"\d")
+PCTISH = re.compile(r"\d+\.\d+%?$")
+
+def legacy_player_clean(s):
+    if not isinstance(s, str):
+        return ""
+    s = re.sub(r"\[.*?\]", "", s)
+    return s.replace("\xa0", " ").strip()
+
+def legacy_coach_clean(s):
+    if not isinstance(s, str):
+        return ""
+    s = re.sub(r"\[.*?\]", "", s)
+    s = re.sub(r"\(.*?\)", "", s)
+    return s.replace("\xa0", " ").strip()
+
+def _legacy_split_lines(s):
+    if not isinstance(s, str):
+        s = legacy_coach_clean(str(s))
+    parts = re.split(r"[\r\n]+|<br\s*/?>", s, flags=re.I)
+    return [legacy_coach_clean(p) for p in parts if legacy_coach_clean(p)]
+
+def _legacy_looks_like_name(token):
+    if not token:
+        return False
+    if COUNTRY_TOKEN.match(token):
+        return False
+    if PCTISH.match(token):
+        return False
+    return re.search(r"[A-Za-z]", token) is not None
+
+def legacy_first_scalar(x):
+    import pandas as pd
+    if isinstance(x, (list, tuple)):
+        return legacy_coach_clean(str(x[0])) if x else ""
+    if isinstance(x, pd.Series):
+        try:
+            return legacy_coach_clean(str(x.iloc[0]))
+        except Exception:
+            return legacy_coach_clean(str(x))
+    return legacy_coach_clean(str(x))
+
+def legacy_extract_coach_name(cell):
+    v = legacy_first_scalar(cell)
+    lines = _legacy_split_lines(v)
+    for t in lines:
+        t2 = re.sub(r"\s{2,}", " ", t).strip(" ,;")
+        if _legacy_looks_like_name(t2):
+            return t2
+    return lines[0] if lines else v
+
+def legacy_extract_years(cell):
+    v = legacy_first_scalar(cell)
+    lines = _legacy_split_lines(v)
+    for t in lines:
+        if DATEISH.search(t):
+            return t
+    return lines[0] if lines else v
+
+def legacy_squad(df, make_player_id):
+    squad = []
+    for _, row in df.iterrows():
+        name = legacy_player_clean(row.get("Name", ""))
+        nation = legacy_player_clean(row.get("Nation", ""))
+        position = legacy_player_clean(row.get("Position", ""))
+        if not name:
+            continue
+        squad.append((make_player_id(name), name, nation, position))
+    return squad
+
+def legacy_coach_rows(df, current_coach, club_id, club_name, season, make_coach_id):
+    """Bước 4–5 của parse_coach_history cũ + clean_row trước khi commit."""
+    import pandas as pd
+    name_of, years_of = legacy_extract_coach_name, legacy_extract_years
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [" ".join([legacy_coach_clean(str(x)) for x in tup if x]).strip() for tup in df.columns]
+    else:
+        df.columns = [legacy_coach_clean(str(c)) for c in df.columns]
+    name_col = next((c for c in df.columns if re.search(r"(Manager|Head coach|Coach|Name)", c, re.I)), df.columns[min(1, len(df.columns)-1)])
+    year_col = next((c for c in df.columns if re.search(r"(Year|From|To|Dates|Tenure|Period|Season)", c, re.I)), df.columns[0])
+
+    rows = []
+    for _, r in df.iterrows():
+        name = name_of(r.get(name_col, ""))
+        if not name:
+            continue
+        rows.append({"coach_id": make_coach_id(name), "name": name, "club_id": club_id, "club_name": club_name,
+                     "season": season, "years": years_of(r.get(year_col, "")), "is_current": False})
+    if rows:
+        if current_coach:
+            current_norm = name_of(current_coach).lower()
+            for r in rows:
+                if current_norm in r["name"].lower() or r["name"].lower() in current_norm:
+                    r["is_current"] = True
+                    break
+            else:
+                rows[-1]["is_current"] = True
+        else:
+            rows[-1]["is_current"] = True
+    elif current_coach:
+        name_clean = name_of(current_coach)
+        rows.append({"coach_id": make_coach_id(name_clean), "name": name_clean, "club_id": club_id,
+                     "club_name": club_name, "season": season, "years": "", "is_current": True})
+
+    def clean_row(r):
+        years = r.get("years")
+        return dict(r, name=re.sub(r"\s{2,}", " ", str(r["name"])).strip(),
+                    years="" if years is None else re.sub(r"\s{2,}", " ", str(years)).strip(),
+                    is_current=bool(r.get("is_current")))
+    return [clean_row(r) for r in rows]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark chuẩn hoá bảng đội hình / HLV theo cột")
+    ap.add_argument("--tables", type=int, default=200, help="số bảng tổng hợp mỗi loại")
+    ap.add_argument("--rows", type=int, default=60, help="số dòng tối đa mỗi bảng")
+    add_common_args(ap, os.path.join(RESULT_DIR, "normalize.json"))
+    args = parse_args(ap, argv)
+    use_etl()
+
+    import pandas as pd
+    import ids
+    import table_normalize as tn
+    import crawl_coaches as cc
+
+    def new_squad(df):
+        return [(ids.make_player_id(name), name, nation, position) for name, nation, position in tn.squad_rows(df)]
+
+    def new_coaches(df, current):
+        return cc.coach_rows(df.copy(), current, "club_x", "Club X", "2024–25")
+
+    def old_coaches(df, current):
+        return legacy_coach_rows(df, current, "club_x", "Club X", "2024–25", ids.make_coach_id)
+
+    # ---------- kiểm tra tương đương ----------
+    squads = squad_tables(args.tables, args.rows)
+    coaches = coach_tables(args.tables, args.rows)
+    names, years = data_cells()
+    if names:
+        real = pd.DataFrame({"Manager": names, "Years": years})
+        coaches += [(real.iloc[i:i + args.rows].reset_index(drop=True), names[i]) for i in range(0, len(real), args.rows)]
+        squads.append(pd.DataFrame({"Name": names, "Nation": years, "Position": names[::-1]}))
+
+    for i, df in enumerate(squads):
+        if new_squad(df) != legacy_squad(df, ids.make_player_id):
+            sys.exit(f"❌ squad_rows khác cách cũ ở bảng đội hình #{i}")
+    for i, (df, current) in enumerate(coaches):
+        if new_coaches(df, current) != old_coaches(df, current):
+            sys.exit(f"❌ coach_rows khác cách cũ ở bảng HLV #{i}")
+    cells = pd.Series([c for df, _ in coaches for c in df.iloc[:, 0].tolist() + df.iloc[:, 1].tolist()], dtype=object)
+    if tn.coach_names(cells) != [legacy_extract_coach_name(c) for c in cells] \
+            or tn.coach_years(cells) != [legacy_extract_years(c) for c in cells]:
+        sys.exit("❌ coach_names / coach_years khác cách cũ")
+    print(f"✅ Kết quả giống hệt cách cũ: {len(squads)} bảng đội hình, {len(coaches)} bảng HLV, {len(cells)} ô")
+
+    # ---------- đo chi phí mỗi bảng ----------
+    print(f"⏱️  {len(squads)} bảng đội hình / {len(coaches)} bảng HLV (≤ {args.rows} dòng)")
+    finish([
+        measure("squad_iterrows", lambda d: legacy_squad(d, ids.make_player_id), squads, args.repeat, len),
+        measure("squad_rows", new_squad, squads, args.repeat, len),
+        measure("coach_iterrows", old_coaches, coaches, args.repeat, len),
+        measure("coach_columns", new_coaches, coaches, args.repeat, len),
+    ], args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os, sys, shutil, argparse, tempfile, contextlib, io
+
+# =============================
+# Benchmark phép chiếu đồng đội B · Bᵀ theo kích thước đội hình
+#   python bench/bench_projection.py --players 1000,10000,100000
+# Dữ liệu tổng hợp: mỗi (CLB, mùa) có `--roster` cầu thủ, cầu thủ chuyển CLB ngẫu nhiên giữa các mùa.
+# Trước khi đo: kiểm tra phép chiếu HLV–cầu thủ trên data/edges thật (HLV thời 1897 không được có cầu thủ nào).
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import ROOT, DATA_DIR, RESULT_DIR, measure, add_common_args, parse_args, finish
+
+# (HLV, có cầu thủ?) — Thomas Mitchell dẫn Arsenal năm 1897, Arteta dẫn Arsenal từ 12/2019
+COACH_CHECKS = [("coach_thomas_mitchell", False), ("coach_mikel_arteta", True)]
+
+def synthetic(n_players, roster, seasons, seed=0):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    n_groups = max(1, n_players // roster)                    # số CLB mỗi mùa
+    players = np.repeat(np.arange(n_players), seasons)
+    season = np.tile(np.arange(seasons), n_players)
+    club = rng.integers(0, n_groups, size=len(players))
+    return players.astype(str), (club * seasons + season).astype(str)
+
+def check_coach_seasons(edge_dir=os.path.join(DATA_DIR, "edges")):
+    """HLV chỉ nối với cầu thủ của các (CLB, mùa) giao với nhiệm kỳ — không phải mọi đội hình hiện tại của CLB."""
+    from projection import build, Projection
+    if not os.path.exists(os.path.join(edge_dir, "coached.csv")):
+        print("⚠️  Không có data/edges/coached.csv — bỏ qua kiểm tra HLV–cầu thủ")
+        return
+    tmp = tempfile.mkdtemp(prefix="epl_proj_")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            build(edge_dir, tmp)
+        proj = Projection(tmp)
+        ok = True
+        for coach, has_players in COACH_CHECKS:
+            n = len(proj.players_of_coach(coach))
+            good = (n > 0) == has_players
+            ok &= good
+            print(f"  {'✅' if good else '❌'} {coach}: {n} cầu thủ")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if not ok:
+        sys.exit("❌ Phép chiếu HLV–cầu thủ nối HLV với đội hình ngoài nhiệm kỳ")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark phép chiếu đồng đội (scipy.sparse)")
+    ap.add_argument("--players", default="1000,10000,100000")
+    ap.add_argument("--roster", type=int, default=25)
+    ap.add_argument("--seasons", type=int, default=5)
+    add_common_args(ap, os.path.join(RESULT_DIR, "projection.json"))
+    args = parse_args(ap, argv)
+    sys.path.insert(0, ROOT)
+    from projection import incidence, teammate_matrix
+
+    check_coach_seasons()
+    results = []
+    for n in (int(x) for x in args.players.split(",")):
+        players, groups = synthetic(n, args.roster, args.seasons)
+        B, _, _ = incidence(players, groups)
+        results.append(measure(f"incidence_{n}", incidence, [(players, groups)], args.repeat))
+        results.append(measure(f"teammates_{n}", teammate_matrix, [(B,)], args.repeat, lambda W: W.nnz // 2))
+    finish(results, args)
+
+if __name__ == "__main__":
+    main()
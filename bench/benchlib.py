@@ -0,0 +1,111 @@
+import os, sys, json, time, platform, statistics, tracemalloc
+
+# =============================
+# Tiện ích chung cho các benchmark trong bench/
+# =============================
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ETL_DIR = os.path.join(ROOT, "etl")
+DATA_DIR = os.path.join(ROOT, "data")
+FIXTURE_DIR = os.path.join(ROOT, "bench", "fixtures")
+RESULT_DIR = os.path.join(ROOT, "bench", "results")
+REGRESSION_THRESHOLD = 0.20      # chậm hơn baseline > 20% → coi là regression
+
+def use_etl():
+    """Cho phép import các module etl/ (chúng dùng đường dẫn tương đối ../data nên chdir vào etl/)."""
+    if ETL_DIR not in sys.path:
+        sys.path.insert(0, ETL_DIR)
+    os.chdir(ETL_DIR)
+
+def measure(name, func, args_list, repeat=3, rows=None):
+    """Chạy func(*args) cho mọi args, lặp `repeat` lần; trả về dict số liệu.
+
+    - latency: thời gian mỗi lời gọi (mean / p50 / min, ms)
+    - throughput: lời gọi/giây (và dòng/giây nếu `rows(kết quả)` đếm được số dòng)
+    - peak_kb: bộ nhớ cấp phát đỉnh (tracemalloc) trong 1 lượt chạy toàn bộ args_list
+    """
+    args_list = [a if isinstance(a, tuple) else (a,) for a in args_list]
+    if not args_list:
+        return None
+    times, n_rows = [], 0
+    for _ in range(repeat):
+        for args in args_list:
+            t0 = time.perf_counter()
+            out = func(*args)
+            times.append(time.perf_counter() - t0)
+            if rows is not None and _ == 0:
+                n_rows += rows(out)
+
+    tracemalloc.start()
+    for args in args_list:
+        func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(times)
+    res = {
+        "name": name,
+        "calls": len(times),
+        "mean_ms": statistics.fmean(times) * 1000,
+        "p50_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "calls_per_s": len(times) / total if total else 0.0,
+        "peak_kb": peak / 1024,
+    }
+    if rows is not None:
+        res["rows"] = n_rows
+        res["rows_per_s"] = n_rows * repeat / total if total else 0.0
+    print(f"  {name:<34} {res['mean_ms']:9.2f} ms/call  p50 {res['p50_ms']:8.2f}  "
+          f"{res['calls_per_s']:9.1f} call/s  peak {res['peak_kb']:9.0f} KB"
+          + (f"  {res['rows_per_s']:10.0f} row/s" if rows is not None else ""))
+    return res
+
+def save_results(results, path):
+    payload = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {r["name"]: r for r in results if r},
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"💾 Kết quả → {path}")
+    return payload
+
+def compare(current, baseline_path, threshold=REGRESSION_THRESHOLD, key="mean_ms"):
+    """So với baseline đã lưu; trả về danh sách benchmark bị chậm đi quá ngưỡng."""
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+    regressions = []
+    print(f"\n📊 So với baseline {baseline_path} (ngưỡng +{threshold:.0%}):")
+    for name, cur in current["results"].items():
+        old = base.get(name)
+        if not old or not old.get(key):
+            print(f"  {name:<34} (mới)")
+            continue
+        ratio = cur[key] / old[key]
+        flag = "❌" if ratio > 1 + threshold else ("✅" if ratio < 1 - threshold else "  ")
+        print(f"  {flag} {name:<32} {old[key]:9.2f} → {cur[key]:9.2f} ms  ({ratio:5.2f}x)")
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+def add_common_args(ap, default_out):
+    ap.add_argument("--repeat", type=int, default=3, help="số lượt lặp mỗi benchmark")
+    ap.add_argument("--out", default=default_out, help="file JSON kết quả")
+    ap.add_argument("--baseline", help="file JSON baseline để so sánh (thoát mã 1 nếu có regression)")
+    ap.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+
+def parse_args(ap, argv=None):
+    """Parse CLI và đổi --out/--baseline thành đường dẫn tuyệt đối (trước khi use_etl() đổi cwd)."""
+    args = ap.parse_args(argv)
+    args.out = os.path.abspath(args.out)
+    if args.baseline:
+        args.baseline = os.path.abspath(args.baseline)
+    return args
+
+def finish(results, args):
+    payload = save_results(results, args.out)
+    if args.baseline and os.path.exists(args.baseline):
+        if compare(payload, args.baseline, args.threshold):
+            sys.exit(1)
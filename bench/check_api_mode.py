@@ -0,0 +1,133 @@
+import os, sys, json, shutil, argparse, tempfile, threading, subprocess
+import pandas as pd
+
+# =============================
+# So sánh chế độ --api với chế độ HTML trên fixture (không cần mạng):
+#   python bench/check_api_mode.py
+#   - api.php: bench/mediawiki_stub.py chạy thật trên cổng cục bộ (EPL_API_URL), dựng từ bench/fixtures/pages/
+#   - /wiki/<Title>: cùng các trang đó qua FixtureAdapter gắn vào http_client.SESSION
+#   - mỗi crawler (clubs / players / coaches / seasons) chạy 2 lần trong thư mục data tạm với 6 CLB fixture
+#     → CSV đầu ra phải giống hệt nhau; in số request / lỗi / byte HTTP của từng chế độ
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import DATA_DIR, ETL_DIR
+from make_fixtures import FIXTURE_PAGES, FIXTURE_SEASONS, FIXTURE_CLUBS
+
+CRAWLERS = [
+    ("crawl_clubs", ["--seasons", ",".join(FIXTURE_SEASONS), "--parsers", "0"],
+     ["nodes/clubs.csv", "relations/clubs_by_season.csv"]),
+    ("crawl_players", ["--seasons", FIXTURE_SEASONS[0], "--parsers", "0"],
+     ["nodes/players.csv", "relations/played_for.csv"]),
+    ("crawl_coaches", ["--parsers", "0"], ["nodes/coaches.csv", "relations/coached.csv"]),
+    ("crawl_seasons", ["--seasons", ",".join(FIXTURE_SEASONS)], ["nodes/seasons.csv"]),
+]
+MODES = {"html": [], "api": ["--api"]}
+
+def make_data(root):
+    """<root>/data với clubs.csv + clubs_by_season.csv chỉ gồm các CLB fixture; <root>/etl làm cwd cho crawler."""
+    ids = [cid for _, cid in FIXTURE_CLUBS]
+    for sub in ("nodes", "relations"):
+        os.makedirs(os.path.join(root, "data", sub))
+    os.makedirs(os.path.join(root, "etl"))
+    for sub, name, col in (("nodes", "clubs.csv", "club_id"), ("relations", "clubs_by_season.csv", "club_id")):
+        df = pd.read_csv(os.path.join(DATA_DIR, sub, name), dtype=str)
+        df = df[df[col].isin(ids)]
+        if name == "clubs_by_season.csv":
+            df = df[df["Season"].isin(FIXTURE_SEASONS)]
+        df.to_csv(os.path.join(root, "data", sub, name), index=False, encoding="utf-8-sig")
+
+def run_crawler(root, script, args, api_url):
+    """Chạy crawler trong process con (cwd = <root>/etl); trả về (mã thoát, số liệu HTTP, log)."""
+    env = dict(os.environ, EPL_API_URL=api_url, EPL_CACHE_DIR=os.path.join(root, "cache"),
+               EPL_PART_DIR=os.path.join(root, "data", ".parts"), PYTHONIOENCODING="utf-8")
+    for k in ("EPL_ARCHIVE", "EPL_ARCHIVE_MODE", "EPL_FETCH_MODE", "EPL_METRICS", "EPL_SEASONS"):
+        env.pop(k, None)
+    stats = os.path.join(root, f"{script}.http.json")
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", script, stats, *args],
+                          cwd=os.path.join(root, "etl"), env=env, capture_output=True, text=True,
+                          encoding="utf-8", timeout=300)
+    http = {}
+    if os.path.exists(stats):
+        with open(stats, encoding="utf-8") as f:
+            http = json.load(f)
+    return proc.returncode, http, proc.stdout + proc.stderr
+
+def child(script, stats_path, argv):
+    """Process con: gắn FixtureAdapter cho en.wikipedia.org rồi chạy main() của crawler."""
+    sys.path.insert(0, ETL_DIR)
+    from http_client import SESSION, STATS
+    from mediawiki_stub import Wiki, FixtureAdapter
+    SESSION.mount("https://en.wikipedia.org/", FixtureAdapter(Wiki.from_dir(FIXTURE_PAGES)))
+    module = __import__(script)
+    try:
+        module.main(argv)
+    finally:
+        with open(stats_path, "w", encoding="utf-8") as f:
+            json.dump(STATS.as_dict(), f)
+
+def read_outputs(root, outputs):
+    out = {}
+    for rel in outputs:
+        path = os.path.join(root, "data", rel)
+        if os.path.exists(path):
+            df = pd.read_csv(path, dtype=str).fillna("")
+            out[rel] = df.sort_values(list(df.columns)).reset_index(drop=True)
+    return out
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        return child(argv[1], argv[2], argv[3:])
+    ap = argparse.ArgumentParser(description="So sánh đầu ra crawler giữa chế độ --api và HTML trên fixture")
+    ap.add_argument("--keep", action="store_true", help="giữ thư mục tạm để xem log / CSV")
+    args = ap.parse_args(argv)
+
+    from http.server import ThreadingHTTPServer
+    from mediawiki_stub import Wiki, make_handler
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(Wiki.from_dir(FIXTURE_PAGES)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/w/api.php"
+
+    tmp = tempfile.mkdtemp(prefix="epl_api_check_")
+    ok = True
+    try:
+        print(f"{'crawler':<15} {'chế độ':<6} {'request':>8} {'lỗi':>5} {'KB':>9}  dòng")
+        for script, extra, outputs in CRAWLERS:
+            results = {}
+            for mode, flag in MODES.items():
+                root = os.path.join(tmp, f"{script}_{mode}")
+                make_data(root)
+                code, http, log = run_crawler(root, script, extra + flag, api_url)
+                results[mode] = read_outputs(root, outputs)
+                rows = sum(len(df) for df in results[mode].values())
+                print(f"{script:<15} {mode:<6} {http.get('requests', 0):>8} {http.get('errors', 0):>5} "
+                      f"{http.get('bytes', 0) / 1024:>9.1f}  {rows}")
+                # lỗi HTTP không tính là hỏng: fixture có trang 404 thật (danh sách HLV Brighton)
+                if code != 0 or not rows:
+                    ok = False
+                    print(f"  ❌ {script} {mode}: mã thoát {code}, {rows} dòng")
+                    print("\n".join("     " + line for line in log.strip().splitlines()[-15:]))
+            for rel in outputs:
+                a, b = results["html"].get(rel), results["api"].get(rel)
+                same = a is not None and b is not None and a.equals(b)
+                ok &= same
+                print(f"  {'✅' if same else '❌'} {rel}: html {0 if a is None else len(a)} dòng, "
+                      f"api {0 if b is None else len(b)} dòng")
+                if not same and a is not None and b is not None:
+                    diff = pd.concat([a.assign(_mode="html"), b.assign(_mode="api")])
+                    diff = diff.drop_duplicates(subset=list(a.columns), keep=False)
+                    print("\n".join("     " + line for line in diff.head(10).to_string().splitlines()))
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f"📁 {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    if not ok:
+        print("❌ Chế độ --api cho kết quả khác chế độ HTML")
+        sys.exit(1)
+    print("✅ Chế độ --api cho cùng kết quả với chế độ HTML")
+
+if __name__ == "__main__":
+    main()
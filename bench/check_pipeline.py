@@ -0,0 +1,98 @@
+import os, sys, time, argparse, threading, contextlib, io
+
+# =============================
+# Kiểm tra đường lỗi của etl/pipeline.py (không cần mạng):
+#   python bench/check_pipeline.py
+#   - chạy bình thường: mọi item được ghi đúng 1 lần
+#   - fetch / parse raise: lỗi được raise lại sau khi ghi xong các item khác
+#   - write raise (vd. OSError khi cp.commit ghi part) với hàng đợi nhỏ: run() phải raise lại lỗi,
+#     không được treo (thread nền kẹt trên hàng đợi đầy)
+# Mỗi tình huống chạy trong thread có hạn giờ; quá hạn → coi là treo, thoát mã 1.
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import use_etl
+
+TIMEOUT = 20
+
+def fetch(item, wanted):
+    if item == "fetch-error":
+        raise ConnectionError("fetch lỗi")
+    return {"page": item}
+
+def parse(item, pages):
+    if item == "parse-error":
+        raise ValueError("parse lỗi")
+    time.sleep(0.001)
+    return [pages["page"]]
+
+class FailingWriter:
+    def __init__(self, after):
+        self.after = after
+        self.written = []
+
+    def __call__(self, item, result):
+        if len(self.written) >= self.after:
+            raise OSError("đĩa đầy")
+        self.written.append(item)
+
+def run(items, write, **kw):
+    """Chạy Pipeline trong thread riêng → lỗi raise ra (hoặc None); treo quá TIMEOUT → thoát mã 1."""
+    from pipeline import Pipeline
+    out = {}
+
+    def target():
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                Pipeline(fetch, parse, write, engine=None, **kw).run(items)
+        except Exception as e:
+            out["error"] = e
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    t.join(TIMEOUT)
+    if t.is_alive():
+        # thread nền kẹt trên hàng đợi → process không tự thoát được (và stdout vẫn đang bị chuyển hướng)
+        print(f"❌ Pipeline treo quá {TIMEOUT}s ({kw})", file=sys.__stdout__, flush=True)
+        os._exit(1)
+    return out.get("error")
+
+def check(name, ok):
+    print(f"  {'✅' if ok else '❌'} {name}", file=sys.__stdout__, flush=True)
+    return ok
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Kiểm tra Pipeline khi fetch/parse/write raise")
+    ap.parse_args(argv)
+    use_etl()
+    items = [f"item{i}" for i in range(50)]
+    results = []
+
+    for parsers in (0, 2):
+        cfg = dict(fetchers=2, parsers=parsers, queue_size=1)
+        tag = f"parsers={parsers}"
+
+        done = []
+        err = run(items, lambda item, res: done.append(item), **cfg)
+        results.append(check(f"{tag}: chạy bình thường ghi đủ {len(items)} item",
+                             err is None and sorted(done) == sorted(items)))
+
+        done = []
+        err = run(items + ["fetch-error", "parse-error"], lambda item, res: done.append(item), **cfg)
+        results.append(check(f"{tag}: fetch/parse lỗi → raise lại, các item khác vẫn được ghi",
+                             isinstance(err, (ConnectionError, ValueError))
+                             and sorted(done) == sorted(items)))
+
+        for after in (0, 5):
+            writer = FailingWriter(after)
+            t0 = time.perf_counter()
+            err = run(items, writer, **cfg)
+            results.append(check(f"{tag}: write raise sau {after} item → OSError trong "
+                                 f"{time.perf_counter() - t0:.1f}s, không treo",
+                                 isinstance(err, OSError) and len(writer.written) == after))
+
+    if not all(results):
+        print("❌ Pipeline sai ở đường lỗi")
+        sys.exit(1)
+    print("✅ Pipeline: mọi tình huống lỗi đều kết thúc và raise đúng lỗi")
+
+if __name__ == "__main__":
+    main()
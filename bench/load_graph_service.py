@@ -0,0 +1,109 @@
+import os, sys, csv, json, time, random, asyncio, argparse, statistics
+from urllib.parse import urlencode
+
+# =============================
+# Load test cho graph_service.py (client asyncio, kết nối keep-alive)
+#   python graph_service.py &            # khởi động dịch vụ
+#   python bench/load_graph_service.py --concurrency 32 --duration 20
+# Trộn truy vấn /path, /neighbours, /roster, /coaches; in p50/p95/p99 phía client và /stats phía server.
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import DATA_DIR, RESULT_DIR
+
+def _ids(path, col=0):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = csv.reader(f)
+        next(rows)
+        return [r[col] for r in rows if r]
+
+def make_queries(rnd):
+    players = _ids(os.path.join(DATA_DIR, "nodes", "players.csv"))
+    clubs = _ids(os.path.join(DATA_DIR, "nodes", "clubs.csv"))
+    seasons = _ids(os.path.join(DATA_DIR, "nodes", "seasons.csv"))
+
+    def next_query():
+        r = rnd.random()
+        if r < 0.6:
+            return "/path", {"src": rnd.choice(players), "dst": rnd.choice(players)}
+        if r < 0.8:
+            return "/neighbours", {"id": rnd.choice(players + clubs)}
+        if r < 0.95:
+            return "/roster", {"club": rnd.choice(clubs), "season": rnd.choice(seasons)}
+        return "/coaches", {"club": rnd.choice(clubs)}
+    return next_query
+
+async def _get(reader, writer, host, target):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode("utf-8"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        if k.lower() == "content-length":
+            length = int(v)
+    return status, await reader.readexactly(length)
+
+async def client(host, port, next_query, deadline, lat, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.monotonic() < deadline:
+            path, q = next_query()
+            t0 = time.perf_counter()
+            status, _ = await _get(reader, writer, host, f"{path}?{urlencode(q)}")
+            lat.setdefault(path, []).append(time.perf_counter() - t0)
+            if status >= 500:
+                errors.append(status)
+    finally:
+        writer.close()
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))] * 1000 if xs else 0.0
+
+async def run(host, port, concurrency, duration, seed):
+    next_query = make_queries(random.Random(seed))
+    lat, errors = {}, []
+    t0 = time.monotonic()
+    await asyncio.gather(*(client(host, port, next_query, t0 + duration, lat, errors) for _ in range(concurrency)))
+    elapsed = time.monotonic() - t0
+    reader, writer = await asyncio.open_connection(host, port)
+    _, body = await _get(reader, writer, host, "/stats")
+    writer.close()
+    return lat, errors, elapsed, json.loads(body)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load test graph_service.py")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=int(os.environ.get("EPL_SERVICE_PORT", 8765)))
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=os.path.join(RESULT_DIR, "graph_service.json"))
+    args = ap.parse_args(argv)
+
+    lat, errors, elapsed, server = asyncio.run(run(args.host, args.port, args.concurrency, args.duration, args.seed))
+    total = sum(len(v) for v in lat.values())
+    print(f"📈 {total} request trong {elapsed:.1f}s → {total / elapsed:.0f} QPS "
+          f"({args.concurrency} kết nối, {len(errors)} lỗi 5xx)")
+    summary = {}
+    for path, xs in sorted(lat.items()):
+        summary[path] = {"count": len(xs), "mean_ms": statistics.fmean(xs) * 1000,
+                         "p50_ms": _pct(xs, 50), "p95_ms": _pct(xs, 95), "p99_ms": _pct(xs, 99)}
+        s = summary[path]
+        print(f"  {path:<12} {s['count']:>7}  p50 {s['p50_ms']:7.2f} ms  p95 {s['p95_ms']:7.2f} ms  "
+              f"p99 {s['p99_ms']:7.2f} ms")
+    c = server.get("cache", {})
+    print(f"🗄️  Server: {server.get('qps', 0):.0f} QPS trung bình, cache {c.get('hits', 0)} hit / "
+          f"{c.get('misses', 0)} miss")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"client": summary, "qps": total / elapsed, "errors": len(errors), "server": server},
+                  f, ensure_ascii=False, indent=2)
+    print(f"💾 Kết quả → {args.out}")
+
+if __name__ == "__main__":
+    main()
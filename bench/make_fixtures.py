@@ -0,0 +1,80 @@
+import os, sys, argparse
+from urllib.parse import unquote
+
+# =============================
+# Fixture HTML cho benchmark/kiểm tra (trang mùa giải, trang CLB, trang danh sách HLV):
+#   bench/fixtures/pages/<Title>.html  — trang đã rút gọn, cùng cấu trúc HTML Wikipedia (skin Vector 2022)
+#   bench/fixtures/pages.warc.gz       — archive ghi đúng các request mà crawler gửi (replay offline)
+#   python bench/make_fixtures.py          → dựng lại archive từ pages/ (không cần mạng)
+#   python bench/make_fixtures.py --live   → ghi từ Wikipedia thật rồi cập nhật pages/ (cần mạng)
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import FIXTURE_DIR, use_etl
+
+FIXTURE_ARCHIVE = os.path.join(FIXTURE_DIR, "pages.warc.gz")
+FIXTURE_PAGES = os.path.join(FIXTURE_DIR, "pages")
+FIXTURE_SEASONS = ["2024–25", "2023–24"]
+FIXTURE_CLUBS = [
+    ("Arsenal", "club_arsenal"),
+    ("Liverpool", "club_liverpool"),
+    ("Manchester United", "club_manchester_united"),
+    ("Brighton & Hove Albion", "club_brighton_hove_albion"),
+    ("Bournemouth", "club_bournemouth"),
+    ("Luton Town", "club_luton_town"),
+]
+WIKI_PREFIX = "https://en.wikipedia.org/wiki/"
+
+def require_fixture():
+    """Thiếu archive fixture → dừng hẳn (benchmark bỏ qua parser thì số liệu không còn so được)."""
+    if not os.path.exists(FIXTURE_ARCHIVE) or not os.path.exists(FIXTURE_ARCHIVE + ".cdx.jsonl"):
+        sys.exit(f"❌ Không có fixture {FIXTURE_ARCHIVE} — chạy python bench/make_fixtures.py để dựng lại từ "
+                 f"{FIXTURE_PAGES}")
+
+def export_pages(path=FIXTURE_ARCHIVE, out_dir=FIXTURE_PAGES):
+    """Trang /wiki/<Title> (200) trong archive → <out_dir>/<Title>.html (nguồn của mediawiki_stub.py)."""
+    from archive import WarcArchive
+    arc = WarcArchive(path, "replay")
+    os.makedirs(out_dir, exist_ok=True)
+    n = 0
+    for url in arc.urls():
+        if url.startswith(WIKI_PREFIX) and "?" not in url:
+            res = arc.get(url)
+            if res.status_code == 200:
+                title = unquote(url[len(WIKI_PREFIX):]).replace("_", " ")
+                with open(os.path.join(out_dir, title + ".html"), "wb") as f:
+                    f.write(res.content)
+                n += 1
+    print(f"📄 {n} trang → {out_dir}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Dựng archive fixture HTML cho benchmark")
+    ap.add_argument("--live", action="store_true", help="ghi từ Wikipedia thật (cần mạng) và cập nhật pages/")
+    args = ap.parse_args(argv)
+
+    # luôn ghi lại từ đầu: archive chỉ chứa đúng các request của lần dựng này
+    for p in (FIXTURE_ARCHIVE, FIXTURE_ARCHIVE + ".cdx.jsonl"):
+        if os.path.exists(p):
+            os.remove(p)
+    os.environ["EPL_ARCHIVE_MODE"] = "record"
+    os.environ["EPL_ARCHIVE"] = FIXTURE_ARCHIVE
+    use_etl()
+
+    import crawl_clubs, crawl_players, crawl_coaches, crawl_seasons
+    from http_client import SESSION, STATS
+    if not args.live:
+        # request đi qua đúng http_get/archive như crawl thật, nhưng transport trả lời bằng pages/
+        from mediawiki_stub import Wiki, FixtureAdapter
+        SESSION.mount("https://en.wikipedia.org/", FixtureAdapter(Wiki.from_dir(FIXTURE_PAGES)))
+
+    for season in FIXTURE_SEASONS:
+        crawl_clubs.get_table_for_season(season)
+        crawl_seasons.get_season_info(season)
+    for club_name, club_id in FIXTURE_CLUBS:
+        crawl_players.get_players_from_club(club_name, club_id, FIXTURE_SEASONS[0])
+        crawl_coaches.get_coach_history(club_name, club_id, FIXTURE_SEASONS[0])
+    STATS.report()
+    if args.live:
+        export_pages()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import os, re, sys, json, argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+# =============================
+# api.php giả lập cục bộ, dựng từ các trang HTML fixture (bench/fixtures/pages/<Title>.html, xem make_fixtures.py)
+#   python bench/mediawiki_stub.py --port 8089 [--redirect "Arsenal=Arsenal F.C."]
+#   EPL_API_URL=http://127.0.0.1:8089/w/api.php python crawl_players.py --api
+#   python bench/check_api_mode.py   → chạy crawler ở cả 2 chế độ trên stub, so sánh CSV + số request/byte
+# Hỗ trợ action=query (normalized / redirects / missing / revid / displaytitle) và
+# action=parse (prop=sections | text | text|sections, section=N, page= hoặc oldid= của revid hiện tại)
+# — đủ cho etl/mediawiki_api.py.
+# FixtureAdapter: cùng dữ liệu đó gắn thẳng vào requests.Session (/wiki/<Title>, api.php) để ghi archive offline.
+# =============================
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchlib import use_etl
+from make_fixtures import FIXTURE_PAGES
+WIKI_PREFIX = "https://en.wikipedia.org/wiki/"
+
+HEADING = re.compile(r'<div class="mw-heading mw-heading([23])[^"]*">\s*<h[23]\b|<h([23])\b', re.I)
+HEADING_TEXT = re.compile(r"<h[23][^>]*>(.*?)</h[23]>", re.I | re.S)
+HEADING_ID = re.compile(r'<h[23][^>]*\bid="([^"]+)"', re.I)
+H1 = re.compile(r"<h1[^>]*>(.*?)</h1>", re.I | re.S)
+CONTENT = re.compile(r'<div class="mw-content-ltr mw-parser-output"[^>]*>|<div class="mw-parser-output"[^>]*>', re.I)
+TAGS = re.compile(r"<[^>]+>")
+
+def norm_title(t):
+    t = t.replace("_", " ").strip()
+    return t[:1].upper() + t[1:]
+
+class Wiki:
+    """title → HTML đầy đủ; tách mục theo thẻ h2/h3 (hoặc div.mw-heading của skin mới)."""
+
+    def __init__(self, pages, redirects=None):
+        self.pages = pages
+        self.redirects = redirects or {}
+        self.revid = {t: 1000 + i for i, t in enumerate(sorted(pages))}
+        self._split = {}
+
+    @classmethod
+    def from_archive(cls, path, redirects=None):
+        os.environ["EPL_ARCHIVE_MODE"] = "replay"
+        os.environ["EPL_ARCHIVE"] = path
+        use_etl()
+        from archive import WarcArchive
+        arc = WarcArchive(path, "replay")
+        pages = {}
+        for url in arc.urls():
+            if url.startswith(WIKI_PREFIX) and "?" not in url:
+                res = arc.get(url)
+                if res.status_code == 200:
+                    pages[norm_title(unquote(url[len(WIKI_PREFIX):]))] = res.content.decode("utf-8", "replace")
+        return cls(pages, redirects)
+
+    @classmethod
+    def from_dir(cls, path=FIXTURE_PAGES, redirects=None):
+        pages = {}
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".html"):
+                with open(os.path.join(path, name), encoding="utf-8") as f:
+                    pages[norm_title(name[:-5])] = f.read()
+        return cls(pages, redirects)
+
+    def split(self, title):
+        """[(level, line, anchor, html)] — phần tử 0 là mục dẫn đầu."""
+        if title not in self._split:
+            html = self.pages[title]
+            m = CONTENT.search(html)
+            body = html[m.start():] if m else html
+            starts = [h.start() for h in HEADING.finditer(body)]
+            parts = [(0, "", "", body[:starts[0]] if starts else body)]
+            for a, b in zip(starts, starts[1:] + [len(body)]):
+                chunk = body[a:b]
+                h = HEADING.match(chunk)
+                text = HEADING_TEXT.search(chunk)
+                anchor = HEADING_ID.search(chunk)
+                parts.append((int(h.group(1) or h.group(2)), TAGS.sub("", text.group(1)).strip() if text else "",
+                              anchor.group(1) if anchor else "", chunk))
+            self._split[title] = parts
+        return self._split[title]
+
+    def resolve(self, title):
+        return self.redirects.get(title, title)
+
+    # ---------- action=query ----------
+    def query(self, q):
+        titles = [t for t in q.get("titles", "").split("|") if t]
+        normalized, redirects, pages = [], [], {}
+        for t in titles:
+            n = norm_title(t)
+            if n != t:
+                normalized.append({"from": t, "to": n})
+            r = self.resolve(n)
+            if r != n:
+                redirects.append({"from": n, "to": r})
+            if r in self.pages:
+                m = H1.search(self.pages[r])
+                pages[r] = {"title": r, "revisions": [{"revid": self.revid[r]}],
+                            "displaytitle": m.group(1).strip() if m else r}
+            else:
+                pages[r] = {"title": r, "missing": True}
+        out = {"pages": list(pages.values())}
+        if normalized:
+            out["normalized"] = normalized
+        if redirects:
+            out["redirects"] = redirects
+        return {"query": out}
+
+    # ---------- action=parse ----------
+    def parse(self, q):
+        if "oldid" in q:
+            # mỗi trang chỉ có 1 revision (revid của action=query)
+            title = next((t for t, r in self.revid.items() if str(r) == q["oldid"]), None)
+            if title is None:
+                return {"error": {"code": "nosuchrevid", "info": f"There is no revision with ID {q['oldid']}."}}
+        else:
+            title = self.resolve(norm_title(q.get("page", "")))
+        if title not in self.pages:
+            return {"error": {"code": "missingtitle", "info": "The page you specified doesn't exist."}}
+        parts = self.split(title)
+        props = q.get("prop", "text").split("|")
+        out = {"title": title}
+        if "sections" in props:
+            out["sections"] = [{"index": str(i), "level": str(lvl), "line": line, "anchor": anchor}
+                               for i, (lvl, line, anchor, _) in enumerate(parts) if i]
+        if "text" not in props:
+            return {"parse": out}
+        if "section" in q:
+            i = int(q["section"])
+            if i >= len(parts):
+                return {"error": {"code": "nosuchsection", "info": f"There is no section {i}."}}
+            # như MediaWiki: mục N gồm cả các mục con cấp sâu hơn ngay sau nó
+            html = parts[i][3]
+            for lvl, _, _, chunk in parts[i + 1:]:
+                if i == 0 or lvl <= parts[i][0]:
+                    break
+                html += chunk
+        else:
+            html = "".join(p[3] for p in parts)
+        out["text"] = html
+        return {"parse": out}
+
+    # ---------- trả lời 1 URL (dùng chung cho HTTP handler và FixtureAdapter) ----------
+    def respond(self, url):
+        """URL (…/w/api.php?…, …/wiki/<Title>, …/index.php?title=…&oldid=…) → (status, content-type, bytes)."""
+        u = urlsplit(url)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        if u.path.endswith("api.php"):
+            action = q.get("action")
+            body = (getattr(self, action)(q) if action in ("query", "parse")
+                    else {"error": {"code": "badvalue", "info": f"Unsupported: {url}"}})
+            return 200, "application/json; charset=utf-8", json.dumps(body, ensure_ascii=False).encode("utf-8")
+        if u.path.startswith("/wiki/"):
+            title = self.resolve(norm_title(unquote(u.path[len("/wiki/"):])))
+        else:
+            title = self.resolve(norm_title(q.get("title", "")))
+        if title in self.pages:
+            return 200, "text/html; charset=UTF-8", self.pages[title].encode("utf-8")
+        return 404, "text/html; charset=UTF-8", b"<html><body><p>Wikipedia does not have an article with this exact name.</p></body></html>"
+
+class FixtureAdapter(BaseAdapter):
+    """Transport cho requests.Session: trả lời mọi request bằng Wiki (không ra mạng)."""
+
+    def __init__(self, wiki):
+        super().__init__()
+        self.wiki = wiki
+
+    def send(self, request, **kwargs):
+        status, ctype, body = self.wiki.respond(request.url)
+        res = requests.Response()
+        res.status_code = status
+        res.reason = "OK" if status == 200 else "Not Found"
+        res.headers = CaseInsensitiveDict({"Content-Type": ctype, "Content-Length": str(len(body))})
+        res._content = body
+        res.encoding = "utf-8"
+        res.url = request.url
+        res.request = request
+        return res
+
+    def close(self):
+        pass
+
+def make_handler(wiki):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, ctype, payload = wiki.respond(self.path)
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *a):
+            pass
+    return Handler
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="api.php giả lập từ fixture HTML")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--pages-dir", default=FIXTURE_PAGES, help="thư mục <Title>.html (mặc định fixture của bench)")
+    ap.add_argument("--archive", help="dựng từ archive .warc.gz chứa trang /wiki/... (thay cho --pages-dir)")
+    ap.add_argument("--redirect", action="append", default=[], metavar="FROM=TO")
+    args = ap.parse_args(argv)
+
+    redirects = dict(r.split("=", 1) for r in args.redirect)
+    wiki = (Wiki.from_archive(os.path.abspath(args.archive), redirects) if args.archive
+            else Wiki.from_dir(args.pages_dir, redirects))
+    print(f"🧪 MediaWiki stub: {len(wiki.pages)} trang → http://{args.host}:{args.port}/w/api.php")
+    try:
+        ThreadingHTTPServer((args.host, args.port), make_handler(wiki)).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import os, sys, json, time, hashlib, argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from graph_index import open_index, index_dir_for, GraphIndex, DATA_DIR
+from metrics import timed, main_entry
+
+# =============================
+# Bảng "bao nhiêu bước giữa cầu thủ X và Y" tính sẵn cho MỌI cầu thủ
+#   python degrees.py build [--coaches] [--workers 8] [--scaling 1,2,4,8]
+#   python degrees.py query player_david_raya player_bukayo_saka
+# Lưu ở data/degrees/:
+#   dist.npy  uint8[P, N]  số cạnh từ cầu thủ thứ p tới node n (255 = không tới được)
+#   pred.npy  int32[P, N]  node đứng trước n trên 1 đường ngắn nhất từ cầu thủ p → dựng lại đường đi
+#   rows.npy  int32[P]     node id của từng cầu thủ nguồn
+#   meta.json              bộ cạnh + hash chỉ mục đã dùng → query từ chối nếu chỉ mục đã bị dựng lại khác đi
+# Chỉ mục đồ thị nằm ở data/graph_index_<cạnh> (không dùng chung data/graph_index mà graph.py dựng lại).
+# Cả 3 mở bằng mmap → tra cứu 1 cặp là O(1), không cần nạp cả ma trận vào RAM.
+# =============================
+DEGREES_DIR = os.path.join(DATA_DIR, "degrees")
+WORKERS = int(os.environ.get("EPL_WORKERS", os.cpu_count() or 1))
+CHUNK = 64                      # số nguồn BFS mỗi tác vụ
+
+# ---------- worker: mở chỉ mục + ma trận kết quả bằng mmap, mỗi tác vụ ghi các dòng riêng ----------
+_G = _DIST = _PRED = _ROWS = None
+
+def _init(index_dir, out_dir):
+    global _G, _DIST, _PRED, _ROWS
+    _G = GraphIndex.load(index_dir)
+    _DIST = np.load(os.path.join(out_dir, "dist.npy"), mmap_mode="r+")
+    _PRED = np.load(os.path.join(out_dir, "pred.npy"), mmap_mode="r+")
+    _ROWS = np.load(os.path.join(out_dir, "rows.npy"), mmap_mode="r")
+
+def _bfs_rows(lo, hi):
+    dist = np.empty(_G.n_nodes, dtype=np.uint8)
+    pred = np.empty(_G.n_nodes, dtype=np.int32)
+    for p in range(lo, hi):
+        _G.bfs(int(_ROWS[p]), dist, pred)
+        _DIST[p] = dist
+        _PRED[p] = pred
+    _DIST.flush()
+    _PRED.flush()
+    return hi - lo
+
+def player_rows(g, prefix="player_"):
+    """Node id của mọi cầu thủ (keys đã sắp xếp nên các ID 'player_*' nằm liền nhau)."""
+    lo = int(np.searchsorted(g.keys, prefix))
+    hi = int(np.searchsorted(g.keys, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+    return np.arange(lo, hi, dtype=np.int32)
+
+def index_hash(g):
+    """sha1 của keys/indptr/indices: node id trong dist/pred chỉ có nghĩa với đúng chỉ mục này."""
+    h = hashlib.sha1()
+    for arr in (g.keys, g.indptr, g.indices):
+        h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+@timed("build", name="degrees.build", rows=None)
+def build(edges, workers=WORKERS, out_dir=DEGREES_DIR, index_dir=None, verbose=True):
+    index_dir = index_dir or index_dir_for(edges)
+    g = open_index(edges, index_dir=index_dir, verbose=verbose)
+    rows = player_rows(g)
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "rows.npy"), rows)
+    shape = (len(rows), g.n_nodes)
+    # tạo file .npy rỗng đúng kích thước; worker ghi thẳng vào qua mmap
+    np.lib.format.open_memmap(os.path.join(out_dir, "dist.npy"), "w+", np.uint8, shape).flush()
+    np.lib.format.open_memmap(os.path.join(out_dir, "pred.npy"), "w+", np.int32, shape).flush()
+
+    t0 = time.perf_counter()
+    tasks = [(lo, min(lo + CHUNK, len(rows))) for lo in range(0, len(rows), CHUNK)]
+    if workers <= 1:
+        _init(index_dir, out_dir)
+        done = sum(_bfs_rows(lo, hi) for lo, hi in tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(index_dir, out_dir)) as ex:
+            done = sum(ex.map(_bfs_rows, *zip(*tasks))) if tasks else 0
+    secs = time.perf_counter() - t0
+
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"edges": list(edges), "players": len(rows), "nodes": g.n_nodes, "index_dir": index_dir,
+                   "index_hash": index_hash(g), "index": g.meta, "seconds": secs, "workers": workers}, f, ensure_ascii=False, indent=2)
+    if verbose:
+        mb = (len(rows) * g.n_nodes * 5) / 1e6
+        print(f"✅ {done} BFS ({len(rows)} cầu thủ × {g.n_nodes} node, {mb:.1f} MB) "
+              f"trong {secs:.2f}s với {workers} worker → {out_dir}")
+    return secs
+
+class Degrees:
+    """Tra cứu bảng đã tính sẵn (mọi mảng đều mmap)."""
+
+    def __init__(self, out_dir=DEGREES_DIR, index_dir=None):
+        with open(os.path.join(out_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        edges = self.meta["edges"]
+        self.g = GraphIndex.load(index_dir or index_dir_for(edges))
+        if self.g.meta.get("edges") != edges or index_hash(self.g) != self.meta.get("index_hash"):
+            raise ValueError(f"Chỉ mục đồ thị đã đổi kể từ lúc dựng bảng khoảng cách ({'+'.join(edges)}) — "
+                             f"chạy lại: python degrees.py build")
+        self.dist = np.load(os.path.join(out_dir, "dist.npy"), mmap_mode="r")
+        self.pred = np.load(os.path.join(out_dir, "pred.npy"), mmap_mode="r")
+        self.rows = np.load(os.path.join(out_dir, "rows.npy"), mmap_mode="r")
+        if self.dist.shape[1] != self.g.n_nodes:
+            raise ValueError("Bảng khoảng cách không khớp chỉ mục đồ thị — chạy lại: python degrees.py build")
+
+    def _row(self, key):
+        i = self.g.node(key)
+        p = int(np.searchsorted(self.rows, i))
+        if p >= len(self.rows) or self.rows[p] != i:
+            raise KeyError(f"{key} không phải cầu thủ nguồn")
+        return p
+
+    @timed("query", name="Degrees.distance", rows=None)
+    def distance(self, src, dst):
+        d = int(self.dist[self._row(src), self.g.node(dst)])
+        return None if d == 255 else d
+
+    @timed("query", name="Degrees.path", rows=None)
+    def path(self, src, dst):
+        p, v = self._row(src), self.g.node(dst)
+        if self.dist[p, v] == 255:
+            return None
+        out, s = [v], int(self.rows[p])
+        while v != s:
+            v = int(self.pred[p, v])
+            out.append(v)
+        return [str(self.g.keys[i]) for i in reversed(out)]
+
+def scaling(edges, counts):
+    """Thời gian dựng bảng theo số worker: tăng tốc và hiệu suất so với số worker đầu tiên trong danh sách."""
+    base = None
+    print(f"\n📊 Scaling ({', '.join(map(str, counts))} worker):")
+    for w in counts:
+        secs = build(edges, w, verbose=False)
+        base = base or secs
+        speedup = base / secs
+        print(f"  {w:>3} worker  {secs:8.2f}s  tăng tốc {speedup:5.2f}x  hiệu suất {speedup * counts[0] / w:5.0%}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bảng khoảng cách giữa mọi cặp cầu thủ")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--coaches", action="store_true", help="thêm cạnh HLV — CLB (coached)")
+    b.add_argument("--workers", type=int, default=WORKERS)
+    b.add_argument("--scaling", help="đo thời gian với nhiều số worker, vd 1,2,4,8")
+    q = sub.add_parser("query")
+    q.add_argument("src")
+    q.add_argument("dst")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        edges = ["played_for"] + (["coached"] if args.coaches else [])
+        if args.scaling:
+            scaling(edges, [int(x) for x in args.scaling.split(",")])
+        build(edges, args.workers)
+        return
+
+    t0 = time.perf_counter()
+    try:
+        deg = Degrees()
+        d, path = deg.distance(args.src, args.dst), deg.path(args.src, args.dst)
+    except (KeyError, ValueError, FileNotFoundError) as e:
+        sys.exit(f"❌ {e}")
+    ms = (time.perf_counter() - t0) * 1000
+    if d is None:
+        print(f"∞ Không có đường đi giữa {args.src} và {args.dst}")
+    else:
+        print(f"🔗 {d} cạnh ({d // 2} bước cầu thủ–cầu thủ): {' → '.join(path)}  ({ms:.2f} ms)")
+
+if __name__ == "__main__":
+    main_entry("degrees", main)
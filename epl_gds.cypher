@@ -0,0 +1,58 @@
+///////////////////////////////////////////////////////////////////////////
+// EPL GRAPH ANALYTICS (không cần plugin GDS)
+// File: epl_gds.cypher
+// Compatible: Neo4j 5.x
+//
+// Chỉ số được tính sẵn trong Python:  python analytics.py
+// rồi chép data/analytics/*.csv vào thư mục import của Neo4j (file:///analytics/...)
+///////////////////////////////////////////////////////////////////////////
+
+///////////////////////////////////////////////////////////////////////////
+// 1. PLAYER METRICS
+///////////////////////////////////////////////////////////////////////////
+
+LOAD CSV WITH HEADERS FROM "file:///analytics/player_metrics.csv" AS row
+MATCH (p:Player {id: row.id})
+SET p.degree      = toInteger(row.degree),
+    p.pagerank    = toFloat(row.pagerank),
+    p.betweenness = toFloat(row.betweenness),
+    p.component   = toInteger(row.component),
+    p.community   = toInteger(row.community);
+
+
+///////////////////////////////////////////////////////////////////////////
+// 2. CLUB METRICS
+///////////////////////////////////////////////////////////////////////////
+
+LOAD CSV WITH HEADERS FROM "file:///analytics/club_metrics.csv" AS row
+MATCH (c:Club {id: row.id})
+SET c.degree      = toInteger(row.degree),
+    c.pagerank    = toFloat(row.pagerank),
+    c.betweenness = toFloat(row.betweenness),
+    c.component   = toInteger(row.component),
+    c.community   = toInteger(row.community);
+
+
+///////////////////////////////////////////////////////////////////////////
+// 3. COACH METRICS
+///////////////////////////////////////////////////////////////////////////
+
+LOAD CSV WITH HEADERS FROM "file:///analytics/coach_metrics.csv" AS row
+MATCH (c:Coach {id: row.id})
+SET c.degree      = toInteger(row.degree),
+    c.pagerank    = toFloat(row.pagerank),
+    c.betweenness = toFloat(row.betweenness),
+    c.component   = toInteger(row.component),
+    c.community   = toInteger(row.community);
+
+
+///////////////////////////////////////////////////////////////////////////
+// 4. SUMMARY CHECK
+///////////////////////////////////////////////////////////////////////////
+
+MATCH (p:Player) WHERE p.pagerank IS NOT NULL
+RETURN p.id AS player, p.pagerank AS pagerank, p.betweenness AS betweenness
+ORDER BY pagerank DESC LIMIT 10;
+
+MATCH (n) WHERE n.community IS NOT NULL
+RETURN n.community AS community, count(*) AS size ORDER BY size DESC LIMIT 10;
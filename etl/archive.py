@@ -0,0 +1,147 @@
+import os, sys, json, gzip, uuid, hashlib, threading, time
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import fcntl
+except ImportError:          # Windows: chỉ khoá trong process
+    fcntl = None
+
+# =============================
+# Cấu hình: EPL_ARCHIVE_MODE=record|replay, EPL_ARCHIVE=đường dẫn .warc.gz
+# =============================
+ARCHIVE_MODE = os.environ.get("EPL_ARCHIVE_MODE", "").lower()
+ARCHIVE_PATH = os.environ.get("EPL_ARCHIVE", os.path.join("..", "data", "archive", "crawl.warc.gz"))
+
+# header không còn đúng sau khi requests đã giải nén body
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+class NotArchived(requests.ConnectionError):
+    """Replay: URL không có trong archive (không bao giờ ra mạng)."""
+
+def request_key(url, params=None):
+    """Khoá của 1 request = URL đầy đủ sau khi gắn params (giống URL requests thật sự gửi đi)."""
+    if not params:
+        return url
+    return requests.Request("GET", url, params=params).prepare().url
+
+class WarcArchive:
+    """Archive kiểu WARC: mỗi bản ghi là 1 gzip member nối tiếp vào file .warc.gz,
+    kèm file chỉ mục .cdx.jsonl (url → offset, length) để replay bằng cách seek thẳng tới bản ghi."""
+
+    def __init__(self, path=ARCHIVE_PATH, mode=ARCHIVE_MODE):
+        self.path = path
+        self.index_path = path + ".cdx.jsonl"
+        self.mode = mode if mode in ("record", "replay") else ""
+        self.stats = {"recorded": 0, "replayed": 0, "missing": 0}
+        self._lock = threading.Lock()
+        self._index = None
+        self._fd = None
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    # ---------- ghi ----------
+    def record(self, key, res):
+        headers = [(k, v) for k, v in res.headers.items() if k.lower() not in _DROP_HEADERS]
+        body = res.content
+        reason = res.reason or ""
+        http = (f"HTTP/1.1 {res.status_code} {reason}\r\n"
+                + "".join(f"{k}: {v}\r\n" for k, v in headers)
+                + f"Content-Length: {len(body)}\r\n\r\n").encode("utf-8") + body
+        digest = hashlib.sha1(body).hexdigest()
+        warc = (f"WARC/1.1\r\n"
+                f"WARC-Type: response\r\n"
+                f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+                f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}\r\n"
+                f"WARC-Target-URI: {key}\r\n"
+                f"WARC-Payload-Digest: sha1:{digest}\r\n"
+                f"Content-Type: application/http; msgtype=response\r\n"
+                f"Content-Length: {len(http)}\r\n\r\n").encode("utf-8") + http + b"\r\n\r\n"
+        member = gzip.compress(warc, compresslevel=6)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(self.path, "ab") as f, open(self.index_path, "a", encoding="utf-8") as idx:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)   # nhiều crawler (process) cùng ghi 1 archive
+            try:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(member)
+                f.flush()
+                idx.write(json.dumps({"url": key, "offset": offset, "length": len(member),
+                                      "status": res.status_code, "digest": digest}, ensure_ascii=False) + "\n")
+                idx.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        self.stats["recorded"] += 1
+
+    # ---------- đọc ----------
+    def _load_index(self):
+        if self._index is None:
+            index = {}
+            if os.path.exists(self.index_path):
+                with open(self.index_path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            e = json.loads(line)
+                            index[e["url"]] = e      # bản ghi sau cùng thắng
+            self._index = index
+        return self._index
+
+    def _read_member(self, entry):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY)
+        # pread: đọc ngẫu nhiên, an toàn giữa nhiều thread
+        return gzip.decompress(os.pread(self._fd, entry["length"], entry["offset"]))
+
+    def get(self, key):
+        """Trả về requests.Response dựng lại từ archive, hoặc raise NotArchived."""
+        entry = self._load_index().get(key)
+        if entry is None:
+            self.stats["missing"] += 1
+            raise NotArchived(f"Không có trong archive: {key}")
+        raw = self._read_member(entry)
+        _, _, rest = raw.partition(b"\r\n\r\n")                 # bỏ header WARC
+        head, _, body = rest.partition(b"\r\n\r\n")             # header HTTP / body
+        body = body[:-4] if body.endswith(b"\r\n\r\n") else body
+        lines = head.decode("utf-8").split("\r\n")
+        res = requests.Response()
+        res.status_code = int(lines[0].split(" ", 2)[1])
+        res.reason = lines[0].split(" ", 2)[2] if lines[0].count(" ") >= 2 else ""
+        res.headers = CaseInsensitiveDict(l.split(": ", 1) for l in lines[1:] if ": " in l)
+        res._content = body
+        res.encoding = "utf-8"
+        res.url = key
+        self.stats["replayed"] += 1
+        return res
+
+    def urls(self):
+        return list(self._load_index())
+
+    def report(self):
+        if self.mode:
+            s = self.stats
+            print(f"🗄️  Archive ({self.mode}) {self.path}: {s['recorded']} ghi, {s['replayed']} đọc lại, "
+                  f"{s['missing']} thiếu")
+
+ARCHIVE = WarcArchive()
+
+def main(argv=None):
+    """python archive.py [đường_dẫn.warc.gz] — liệt kê bản ghi trong archive."""
+    argv = sys.argv[1:] if argv is None else argv
+    arc = WarcArchive(argv[0] if argv else ARCHIVE_PATH, mode="replay")
+    total = 0
+    for e in arc._load_index().values():
+        total += e["length"]
+        print(f"{e['status']}  {e['length']:>9}  {e['url']}")
+    print(f"📦 {len(arc._load_index())} URL, {total / 1e6:.1f} MB nén")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,13 @@
-import os
+import os, sys, time, argparse
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+from metrics import timed, main_entry
+from entity_resolution import prefer_resolved
+
+try:
+    import columnar_store          # kho Arrow (tuỳ chọn): đọc từ điển ID qua memory-map thay vì parse CSV
+except ImportError:
+    columnar_store = None
 
 BASE_DIR = "../data"
 NODE_DIR = os.path.join(BASE_DIR, "nodes")
@@ -7,97 +15,159 @@ REL_DIR = os.path.join(BASE_DIR, "relations")
 EDGE_DIR = os.path.join(BASE_DIR, "edges")
 os.makedirs(EDGE_DIR, exist_ok=True)
 
-# ===============================================================
-# 1️⃣ QUAN HỆ: PART_OF (Club → Season)
-# ===============================================================
-def build_part_of():
-    src = os.path.join(REL_DIR, "clubs_by_season.csv")
-    if not os.path.exists(src):
-        print("⚠️  Thiếu file clubs_by_season.csv")
-        return
-
-    df = pd.read_csv(src)
-    df[":START_ID(Club)"] = df["club_id"]
-    # ID mùa giải phải trùng với season_id trong seasons.csv: EPL-2024–25
-    df[":END_ID(Season)"] = df["Season"].apply(lambda s: f"EPL-{s}")
-    df = df[[":START_ID(Club)", ":END_ID(Season)", "Season"]]
-    df[":TYPE"] = "PART_OF"
-
-    out = os.path.join(EDGE_DIR, "part_of.csv")
-    df.to_csv(out, index=False, encoding="utf-8-sig")
-    print(f"✅ PART_OF → {len(df)} dòng được xuất.")
-
+# giữ BOM như các file edges hiện có (import.cypher / Excel đọc được tiếng Việt, dấu "–")
+ENCODING = "utf-8-sig"
+CHUNKSIZE = int(os.environ.get("EPL_EDGE_CHUNKSIZE", 0)) or None   # None = đọc cả file 1 lần
 
 # ===============================================================
-# 2️⃣ QUAN HỆ: PLAYED_FOR (Player → Club)
+# Node: nhãn → (file, cột ID) — dùng để kiểm tra toàn vẹn tham chiếu
 # ===============================================================
-def build_played_for():
-    src = os.path.join(REL_DIR, "played_for.csv")
-    if not os.path.exists(src):
-        print("⚠️  Thiếu file played_for.csv")
-        return
-
-    df = pd.read_csv(src)
-
-    # Đảm bảo có đủ cột
-    for col in ["player_id", "club_id", "season"]:
-        if col not in df.columns:
-            raise ValueError(f"❌ Thiếu cột '{col}' trong played_for.csv")
-
-    df[":START_ID(Player)"] = df["player_id"]
-    df[":END_ID(Club)"] = df["club_id"]
-
-    # Chuyển season → season_id khớp với node Season
-    df["season_id"] = df["season"].apply(lambda s: f"EPL-{s}" if isinstance(s, str) else None)
-
-    df = df[[":START_ID(Player)", ":END_ID(Club)", "season_id", "position"]]
-    df[":TYPE"] = "PLAYED_FOR"
-
-    out = os.path.join(EDGE_DIR, "played_for.csv")
-    df.to_csv(out, index=False, encoding="utf-8-sig")
-    print(f"✅ PLAYED_FOR → {len(df)} dòng được xuất.")
-
+NODE_FILES = {
+    "Club": ("clubs.csv", "club_id"),
+    "Player": ("players.csv", "player_id"),
+    "Coach": ("coaches.csv", "coach_id"),
+    "Season": ("seasons.csv", "season_id"),
+}
 
 # ===============================================================
-# 3️⃣ QUAN HỆ: COACHED (Coach → Club)
+# Mô tả các quan hệ: file nguồn, 2 đầu mút (cột, nhãn), cột mùa giải và thuộc tính giữ lại
+#   season_id = "EPL-" + season  (khớp với season_id trong seasons.csv: EPL-2024–25)
 # ===============================================================
-def build_coached():
-    src = os.path.join(REL_DIR, "coached.csv")
+EDGE_SPECS = {
+    # 1️⃣ PART_OF (Club → Season)
+    "part_of": {"src": "clubs_by_season.csv", "type": "PART_OF", "season": "Season",
+                "start": ("club_id", "Club"), "end": ("season_id", "Season"),
+                "props": ["Season"]},
+    # 2️⃣ PLAYED_FOR (Player → Club)
+    "played_for": {"src": "played_for.csv", "type": "PLAYED_FOR", "season": "season",
+                   "start": ("player_id", "Player"), "end": ("club_id", "Club"),
+                   "props": ["season_id", "position"]},
+    # 3️⃣ COACHED (Coach → Club)
+    "coached": {"src": "coached.csv", "type": "COACHED", "season": "season",
+                "start": ("coach_id", "Coach"), "end": ("club_id", "Club"),
+                "props": ["season_id", "years", "is_current"]},
+}
+
+def load_node_ids():
+    """Đọc cột ID của mọi file node 1 lần → pd.Index (tra cứu bằng bảng băm)."""
+    if columnar_store is not None and columnar_store.is_fresh(BASE_DIR, kinds=("nodes",)):
+        return {label: pd.Index(columnar_store.node_keys(label).to_numpy(zero_copy_only=False))
+                for label in NODE_FILES if columnar_store.has_ids(label)}
+    ids = {}
+    for label, (fname, col) in NODE_FILES.items():
+        path = prefer_resolved(os.path.join(NODE_DIR, fname))
+        if os.path.exists(path):
+            ids[label] = pd.Index(pd.read_csv(path, usecols=[col], dtype=str)[col].dropna().unique())
+    return ids
+
+def _edge_frame(df, spec):
+    """Chuyển 1 khối dòng quan hệ → khối dòng edge (toàn bộ là phép toán vector)."""
+    (s_col, s_label), (e_col, e_label) = spec["start"], spec["end"]
+    df["season_id"] = "EPL-" + df[spec["season"]]          # NaN giữ nguyên NaN → ô trống
+    out = pd.DataFrame({f":START_ID({s_label})": df[s_col], f":END_ID({e_label})": df[e_col]})
+    for col in spec["props"]:
+        out[col] = df[col] if col in df.columns else None
+    out[":TYPE"] = spec["type"]
+    return out
+
+def _dangling(out, spec, node_ids):
+    """Đếm đầu mút (và season_id) không tồn tại trong data/nodes."""
+    checks = [(f":START_ID({spec['start'][1]})", spec["start"][1]),
+              (f":END_ID({spec['end'][1]})", spec["end"][1])]
+    if "season_id" in out.columns:
+        checks.append(("season_id", "Season"))
+    bad = {}
+    for col, label in checks:
+        if label not in node_ids:
+            continue
+        mask = ~out[col].isin(node_ids[label]) & out[col].notna()
+        if mask.any():
+            bad[col] = mask
+    return bad
+
+@timed("build")
+def build_edges(name, node_ids=None, chunksize=CHUNKSIZE, drop_dangling=False):
+    """Tạo 1 file edge; đọc/ghi theo từng khối `chunksize` dòng để bộ nhớ không phụ thuộc kích thước file."""
+    spec = EDGE_SPECS[name]
+    src = prefer_resolved(os.path.join(REL_DIR, spec["src"]))
     if not os.path.exists(src):
-        print("⚠️  Thiếu file coached.csv")
-        return
-
-    df = pd.read_csv(src)
+        print(f"⚠️  Thiếu file {spec['src']}")
+        return None
+    node_ids = load_node_ids() if node_ids is None else node_ids
+
+    need = [spec["start"][0], spec["season"]] + ([spec["end"][0]] if spec["end"][0] != "season_id" else [])
+    header = pd.read_csv(src, nrows=0).columns
+    for col in need:
+        if col not in header:
+            raise ValueError(f"❌ Thiếu cột '{col}' trong {spec['src']}")
+
+    out_path = os.path.join(EDGE_DIR, f"{name}.csv")
+    tmp = out_path + ".tmp"
+    reader = pd.read_csv(src, dtype=str, chunksize=chunksize)
+    chunks = [reader] if chunksize is None else reader
+    rows, dangling, examples = 0, {}, {}
+    with open(tmp, "w", encoding=ENCODING, newline="") as f:
+        for i, chunk in enumerate(chunks):
+            out = _edge_frame(chunk, spec)
+            bad = _dangling(out, spec, node_ids)
+            for col, mask in bad.items():
+                dangling[col] = dangling.get(col, 0) + int(mask.sum())
+                examples.setdefault(col, out.loc[mask, col].iloc[0])
+            if drop_dangling and bad:
+                keep = pd.Series(True, index=out.index)
+                for mask in bad.values():
+                    keep &= ~mask
+                out = out[keep]
+            out.to_csv(f, index=False, header=(i == 0))
+            rows += len(out)
+    os.replace(tmp, out_path)
+
+    for col, n in dangling.items():
+        action = "đã bỏ" if drop_dangling else "giữ lại"
+        print(f"⚠️  {spec['type']}: {n} dòng có {col} không tồn tại trong nodes ({action}), vd: {examples[col]}")
+    print(f"✅ {spec['type']} → {rows} dòng được xuất.")
+    return {"edge": name, "rows": rows, "dangling": sum(dangling.values())}
 
-    # Đảm bảo có đủ cột
-    for col in ["coach_id", "club_id", "season"]:
-        if col not in df.columns:
-            raise ValueError(f"❌ Thiếu cột '{col}' trong coached.csv")
-
-    df[":START_ID(Coach)"] = df["coach_id"]
-    df[":END_ID(Club)"] = df["club_id"]
-
-    # Chuẩn hóa season_id
-    df["season_id"] = df["season"].apply(lambda s: f"EPL-{s}" if isinstance(s, str) else None)
+def build_part_of():
+    return build_edges("part_of")
 
-    df = df[[":START_ID(Coach)", ":END_ID(Club)", "season_id", "years", "is_current"]]
-    df[":TYPE"] = "COACHED"
+def build_played_for():
+    return build_edges("played_for")
 
-    out = os.path.join(EDGE_DIR, "coached.csv")
-    df.to_csv(out, index=False, encoding="utf-8-sig")
-    print(f"✅ COACHED → {len(df)} dòng được xuất.")
+def build_coached():
+    return build_edges("coached")
 
+def build_all(names=None, chunksize=CHUNKSIZE, drop_dangling=False, workers=None):
+    """Đọc node 1 lần rồi xuất mọi file edge song song (mỗi file 1 thread, pandas nhả GIL khi parse/ghi CSV)."""
+    names = list(names or EDGE_SPECS)
+    node_ids = load_node_ids()
+    with ThreadPoolExecutor(max_workers=workers or len(names)) as ex:
+        futures = [ex.submit(build_edges, n, node_ids, chunksize, drop_dangling) for n in names]
+        return [f.result() for f in futures]
 
 # ===============================================================
 # MAIN ENTRY
 # ===============================================================
-def main():
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tạo các file quan hệ (edges) cho Neo4j")
+    ap.add_argument("edges", nargs="*", help=f"một số trong {', '.join(EDGE_SPECS)} (mặc định: tất cả)")
+    ap.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="số dòng mỗi khối khi đọc/ghi")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--drop-dangling", action="store_true", help="bỏ cạnh trỏ tới node không tồn tại")
+    ap.add_argument("--strict", action="store_true", help="thoát mã 1 nếu có cạnh trỏ tới node không tồn tại")
+    args = ap.parse_args(argv)
+    unknown = [e for e in args.edges if e not in EDGE_SPECS]
+    if unknown:
+        ap.error(f"không có quan hệ: {', '.join(unknown)}")
+
     print("\n🏗️  Bắt đầu tạo các file quan hệ cho Neo4j...")
-    build_part_of()
-    build_played_for()
-    build_coached()
-    print("\n🎯 Tất cả file edges được tạo thành công trong thư mục ../data/edges/\n")
+    t0 = time.perf_counter()
+    results = [r for r in build_all(args.edges, args.chunksize, args.drop_dangling, args.workers) if r]
+    print(f"\n🎯 Tất cả file edges được tạo thành công trong thư mục {EDGE_DIR}/ "
+          f"({time.perf_counter() - t0:.2f}s)\n")
+    if args.strict and not args.drop_dangling and any(r["dangling"] for r in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
+    main_entry("build_relations", main)
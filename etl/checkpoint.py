@@ -0,0 +1,182 @@
+import os, csv, json, time, heapq, shutil, hashlib, tempfile
+from revisions import table_hash
+
+# =============================
+# Output crawler dạng append-only, commit nguyên tử theo từng đơn vị công việc (CLB / trang)
+#   ../data/.parts/<scope>/parts/<sha1(key)>.csv   1 file / đơn vị, ghi tmp → fsync → os.replace
+#   ../data/.parts/<scope>/commits.log             JSONL {key, part, rows, digest}, append + fsync sau mỗi part
+#   ../data/.parts/<scope>/run.json                id của kế hoạch; đổi kế hoạch → làm lại từ đầu
+# Crash giữa chừng → chạy lại chỉ tải các key chưa có trong commit log.
+# Mỗi part được sắp theo cột id → gộp cuối bằng heap-merge (bộ nhớ ~ số part, không theo số dòng).
+# =============================
+PART_ROOT = os.environ.get("EPL_PART_DIR", os.path.join("..", "data", ".parts"))
+MAX_OPEN = int(os.environ.get("EPL_MERGE_FANIN", 128))     # số part mở cùng lúc khi merge
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:          # Windows: không mở được thư mục
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class Checkpoint:
+    def __init__(self, scope, columns, plan_keys, sort_key=None, root=PART_ROOT, resume=True):
+        self.dir = os.path.join(root, scope)
+        self.part_dir = os.path.join(self.dir, "parts")
+        self.log_path = os.path.join(self.dir, "commits.log")
+        self.columns = list(columns)
+        self.sort_key = sort_key
+        self.plan = [str(k) for k in plan_keys]
+        self.run_id = hashlib.sha1(json.dumps([self.plan, self.columns, sort_key]).encode("utf-8")).hexdigest()
+
+        meta_path = os.path.join(self.dir, "run.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                same = json.load(f).get("run_id") == self.run_id
+            if not (resume and same):
+                self.clear()
+        os.makedirs(self.part_dir, exist_ok=True)
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"run_id": self.run_id, "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                           "keys": len(self.plan)}, f)
+        self.committed = self._read_log()
+
+    def _read_log(self):
+        done = {}
+        if os.path.exists(self.log_path):
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:          # dòng cuối ghi dở khi crash
+                        continue
+                    if os.path.exists(os.path.join(self.part_dir, e["part"])):
+                        done[e["key"]] = e
+            with open(self.log_path, "rb+") as f:
+                # dòng ghi dở không có "\n" → bổ sung để commit tiếp theo không dính vào nó
+                f.seek(0, os.SEEK_END)
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+        return done
+
+    def _part_name(self, key):
+        return hashlib.sha1(str(key).encode("utf-8")).hexdigest()[:20] + ".csv"
+
+    # ---------- ghi ----------
+    def done(self, key):
+        return str(key) in self.committed
+
+    def pending(self):
+        return [k for k in self.plan if k not in self.committed]
+
+    def commit(self, key, rows):
+        """Ghi nguyên tử 1 part (đã sắp theo sort_key) rồi ghi nhận vào commit log."""
+        key = str(key)
+        rows = list(rows)
+        if self.sort_key:
+            rows.sort(key=lambda r: str(r[self.sort_key]))
+        name = self._part_name(key)
+        fd, tmp = tempfile.mkstemp(dir=self.part_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=self.columns, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.part_dir, name))
+        _fsync_dir(self.part_dir)
+        entry = {"key": key, "part": name, "rows": len(rows), "digest": table_hash(rows),
+                 "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.committed[key] = entry
+
+    def digest(self, key):
+        e = self.committed.get(str(key))
+        return e["digest"] if e else None
+
+    # ---------- đọc ----------
+    def _paths(self, keys=None):
+        keys = self.plan if keys is None else [str(k) for k in keys]
+        return [os.path.join(self.part_dir, self.committed[k]["part"]) for k in keys if k in self.committed]
+
+    def rows(self, keys=None):
+        """Duyệt mọi dòng theo thứ tự kế hoạch (mỗi lần chỉ mở 1 part)."""
+        for path in self._paths(keys):
+            with open(path, encoding="utf-8", newline="") as f:
+                yield from csv.DictReader(f)
+
+    def merged(self, keys=None):
+        """Mọi dòng sắp theo sort_key; cùng khoá thì theo thứ tự kế hoạch (giống drop_duplicates keep='first')."""
+        paths = self._paths(keys)
+        tmp_dir = None
+        try:
+            # quá nhiều part → gộp trước từng lô MAX_OPEN thành run trung gian
+            while len(paths) > MAX_OPEN:
+                tmp_dir = tmp_dir or tempfile.mkdtemp(dir=self.dir, prefix="merge-")
+                runs = []
+                for i in range(0, len(paths), MAX_OPEN):
+                    out = os.path.join(tmp_dir, f"run-{len(os.listdir(tmp_dir))}.csv")
+                    with open(out, "w", encoding="utf-8", newline="") as f:
+                        w = csv.DictWriter(f, fieldnames=self.columns)
+                        w.writeheader()
+                        w.writerows(self._merge(paths[i:i + MAX_OPEN]))
+                    runs.append(out)
+                paths = runs
+            yield from self._merge(paths)
+        finally:
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _keyed(self, i, f):
+        # (khoá, thứ tự part, thứ tự dòng) → hoà khoá thì giữ thứ tự kế hoạch
+        for j, r in enumerate(csv.DictReader(f)):
+            yield r[self.sort_key], i, j, r
+
+    def _merge(self, paths):
+        files = [open(p, encoding="utf-8", newline="") for p in paths]
+        try:
+            streams = [self._keyed(i, f) for i, f in enumerate(files)]
+            for *_, row in heapq.merge(*streams, key=lambda t: t[:3]):
+                yield row
+        finally:
+            for f in files:
+                f.close()
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+class AtomicCSV:
+    """Ghi CSV ra file tạm cạnh đích, chỉ thay file đích khi ghi xong (không bao giờ để lại file dở)."""
+
+    def __init__(self, path, columns, encoding="utf-8-sig"):
+        self.path, self.columns, self.encoding = path, list(columns), encoding
+        self.rows = 0
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.tmp = self.path + ".tmp"
+        self._f = open(self.tmp, "w", encoding=self.encoding, newline="")
+        self._w = csv.DictWriter(self._f, fieldnames=self.columns, extrasaction="ignore")
+        self._w.writeheader()
+        return self
+
+    def write(self, row):
+        self._w.writerow(row)
+        self.rows += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._f.close()
+        if exc_type is None:
+            os.replace(self.tmp, self.path)
+        else:
+            os.remove(self.tmp)
+        return False
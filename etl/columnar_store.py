@@ -0,0 +1,248 @@
+import os, re, csv, json, time, argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from metrics import timed, main_entry
+from entity_resolution import prefer_resolved
+
+# =============================
+# Kho dữ liệu dạng cột (Arrow IPC, tuỳ chọn Parquet) cho data/nodes + data/edges
+#   - mỗi nhãn (Player, Club, Coach, Season) có 1 từ điển ID: chuỗi "player_bukayo_saka" ↔ số nguyên dày 0..n-1
+#   - cạnh lưu src/dst là int32, cột season/position... là cột dictionary (categorical)
+#   - file .arrow không nén → memory-map, đọc zero-copy gần như tức thì
+#   - CSV cho Neo4j vẫn sinh lại được bất cứ lúc nào: python columnar_store.py csv
+# =============================
+BASE_DIR = "../data"
+STORE_DIR = os.environ.get("EPL_STORE_DIR", os.path.join(BASE_DIR, "columnar"))
+NODE_FILES = {
+    "Club": ("clubs.csv", "club_id"),
+    "Player": ("players.csv", "player_id"),
+    "Coach": ("coaches.csv", "coach_id"),
+    "Season": ("seasons.csv", "season_id"),
+}
+EDGE_FILES = ["part_of.csv", "played_for.csv", "coached.csv"]
+CATEGORICAL = {"season_id", "Season", "position", "nation", "is_current", ":TYPE"}
+CSV_ENCODING = "utf-8-sig"
+
+ENDPOINT = re.compile(r"^:(START|END)_ID\((\w+)\)$")
+
+def _path(*parts):
+    return os.path.join(STORE_DIR, *parts)
+
+# ---------- ghi / đọc Arrow ----------
+def _write_arrow(table, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+def read_table(path):
+    """Memory-map file .arrow: buffer trỏ thẳng vào page cache của OS, không copy."""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+def _to_arrow(df, meta):
+    cols = {}
+    for c in df.columns:
+        s = df[c]
+        if c in CATEGORICAL and s.dtype == object:
+            s = s.astype("category")
+        cols[c] = s
+    table = pa.Table.from_pandas(pd.DataFrame(cols), preserve_index=False)
+    return table.replace_schema_metadata({"epl": json.dumps(meta, ensure_ascii=False)})
+
+def table_meta(table):
+    return json.loads((table.schema.metadata or {}).get(b"epl", b"{}"))
+
+def _read_csv(path):
+    """Đọc CSV giữ nguyên văn bản (dtype=str) và header gốc (clubs.csv có 2 cột 'Location')."""
+    with open(path, encoding=CSV_ENCODING, newline="") as f:
+        header = next(csv.reader(f))
+    return pd.read_csv(path, dtype=str, encoding=CSV_ENCODING), header
+
+# ---------- build ----------
+@timed("build", rows=None)
+def build_store(node_dir=os.path.join(BASE_DIR, "nodes"), edge_dir=os.path.join(BASE_DIR, "edges"),
+                parquet=False):
+    """CSV → kho cột. Từ điển ID mỗi nhãn = ID node (theo thứ tự file) + ID chỉ xuất hiện ở cạnh (nối thêm cuối)."""
+    t0 = time.perf_counter()
+    keys, nodes = {}, {}
+    for label, (fname, id_col) in NODE_FILES.items():
+        path = prefer_resolved(os.path.join(node_dir, fname))
+        if not os.path.exists(path):
+            continue
+        df, header = _read_csv(path)
+        df = df.drop_duplicates(subset=[id_col], keep="first").reset_index(drop=True)
+        keys[label] = pd.Index(df[id_col])
+        nodes[label] = (df, header, id_col)
+
+    edges = {}
+    for fname in EDGE_FILES:
+        path = os.path.join(edge_dir, fname)
+        if not os.path.exists(path):
+            continue
+        df, header = _read_csv(path)
+        ends = {}
+        for col in df.columns:
+            m = ENDPOINT.match(col)
+            if m:
+                ends[m.group(1)] = (col, m.group(2))
+        for col, label in ends.values():
+            known = keys.get(label, pd.Index([], dtype=object))
+            extra = pd.Index(df[col].dropna().unique()).difference(known, sort=False)
+            if len(extra):
+                print(f"⚠️  {fname}: {len(extra)} ID {label} không có trong nodes (vd: {extra[0]}) → thêm vào từ điển")
+                keys[label] = known.append(extra)
+        edges[fname] = (df, header, ends)
+
+    # từ điển ID
+    for label, idx in keys.items():
+        n_nodes = len(nodes[label][0]) if label in nodes else 0
+        table = pa.table({"key": pa.array(idx.to_numpy(dtype=object), pa.string())})
+        _write_arrow(table.replace_schema_metadata({"epl": json.dumps({"label": label, "nodes": n_nodes})}),
+                     _path("ids", f"{label}.arrow"))
+
+    # node: cột id (int32) + thuộc tính
+    for label, (df, header, id_col) in nodes.items():
+        out = df.drop(columns=[id_col])
+        out.insert(0, "id", keys[label].get_indexer(df[id_col]).astype(np.int32))
+        meta = {"label": label, "id_col": id_col, "csv": os.path.basename(NODE_FILES[label][0]),
+                "header": header, "columns": list(df.columns)}
+        _save(_to_arrow(out, meta), os.path.join("nodes", label), parquet)
+
+    # cạnh: src/dst (int32) + thuộc tính
+    for fname, (df, header, ends) in edges.items():
+        s_col, s_label = ends["START"]
+        e_col, e_label = ends["END"]
+        out = df.drop(columns=[s_col, e_col])
+        out.insert(0, "src", keys[s_label].get_indexer(df[s_col]).astype(np.int32))
+        out.insert(1, "dst", keys[e_label].get_indexer(df[e_col]).astype(np.int32))
+        meta = {"csv": fname, "start": s_label, "end": e_label, "start_col": s_col, "end_col": e_col,
+                "header": header, "columns": list(df.columns)}
+        _save(_to_arrow(out, meta), os.path.join("edges", fname[:-4]), parquet)
+
+    print(f"✅ Kho cột → {STORE_DIR}: {len(nodes)} nhãn node, {len(edges)} file cạnh "
+          f"({time.perf_counter() - t0:.2f}s)")
+
+def _save(table, stem, parquet):
+    _write_arrow(table, _path(stem + ".arrow"))
+    if parquet:
+        import pyarrow.parquet as pq     # Parquet: nén zstd để lưu trữ/trao đổi, không memory-map được
+        pq.write_table(table, _path(stem + ".parquet"), compression="zstd")
+
+# ---------- đọc ----------
+def available():
+    return os.path.isdir(_path("ids"))
+
+def has_ids(label):
+    return os.path.exists(_path("ids", f"{label}.arrow"))
+
+def is_fresh(csv_dir=BASE_DIR, kinds=("nodes", "edges")):
+    """Kho còn mới hơn mọi CSV nguồn không (để consumer quyết định dùng kho hay đọc CSV)?"""
+    if not available():
+        return False
+    built = min((os.path.getmtime(_path("ids", f)) for f in os.listdir(_path("ids"))), default=0)
+    sources = []
+    if "nodes" in kinds:
+        sources += [prefer_resolved(os.path.join(csv_dir, "nodes", f)) for f, _ in NODE_FILES.values()]
+    if "edges" in kinds:
+        sources += [os.path.join(csv_dir, "edges", f) for f in EDGE_FILES]
+    return all(os.path.getmtime(p) <= built for p in sources if os.path.exists(p))
+
+def id_keys(label):
+    """Mảng chuỗi ID theo số nguyên: id_keys('Player')[i] là ID gốc của node i."""
+    return read_table(_path("ids", f"{label}.arrow")).column("key")
+
+def node_keys(label):
+    """Chỉ các ID có node thật (bỏ các ID chỉ xuất hiện ở cạnh)."""
+    table = read_table(_path("ids", f"{label}.arrow"))
+    return table.column("key").slice(0, table_meta(table)["nodes"])
+
+def decode_ids(label, codes):
+    """Số nguyên → chuỗi ID gốc (mã -1 = ô trống)."""
+    codes = np.asarray(codes)
+    out = id_keys(label).to_numpy(zero_copy_only=False)[np.where(codes < 0, 0, codes)]
+    out[codes < 0] = None
+    return out
+
+def id_index(label):
+    """pd.Index chuỗi → số nguyên (dùng get_indexer để mã hoá hàng loạt)."""
+    return pd.Index(id_keys(label).to_numpy(zero_copy_only=False))
+
+def load_nodes(label):
+    return read_table(_path("nodes", f"{label}.arrow"))
+
+def load_edges(name):
+    return read_table(_path("edges", f"{name}.arrow"))
+
+def edge_arrays(name):
+    """(src, dst) dạng numpy int32 zero-copy — đầu vào cho các chỉ mục đồ thị."""
+    t = load_edges(name)
+    return (t.column("src").to_numpy(), t.column("dst").to_numpy())
+
+# ---------- xuất CSV cho Neo4j ----------
+def _decode(table):
+    df = table.to_pandas()
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype(object)
+    return df
+
+def export_csv(out_dir=BASE_DIR):
+    """Kho cột → CSV (utf-8-sig, header gốc) đúng định dạng nodes/ và edges/ mà import.cypher đọc."""
+    for label in NODE_FILES:
+        path = _path("nodes", f"{label}.arrow")
+        if not os.path.exists(path):
+            continue
+        table = read_table(path)
+        meta = table_meta(table)
+        df = _decode(table)
+        df.insert(0, meta["id_col"], decode_ids(label, df.pop("id").to_numpy()))
+        _write_csv(df[meta["columns"]], meta["header"], os.path.join(out_dir, "nodes", meta["csv"]))
+
+    for fname in EDGE_FILES:
+        path = _path("edges", fname[:-4] + ".arrow")
+        if not os.path.exists(path):
+            continue
+        table = read_table(path)
+        meta = table_meta(table)
+        df = _decode(table)
+        df[meta["start_col"]] = decode_ids(meta["start"], df.pop("src").to_numpy())
+        df[meta["end_col"]] = decode_ids(meta["end"], df.pop("dst").to_numpy())
+        _write_csv(df[meta["columns"]], meta["header"], os.path.join(out_dir, "edges", meta["csv"]))
+
+def _write_csv(df, header, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_csv(path, index=False, header=header, encoding=CSV_ENCODING)
+    print(f"✅ {path} → {len(df)} dòng")
+
+def info():
+    for sub in ("ids", "nodes", "edges"):
+        d = _path(sub)
+        if not os.path.isdir(d):
+            continue
+        for f in sorted(os.listdir(d)):
+            if f.endswith(".arrow"):
+                t = read_table(os.path.join(d, f))
+                print(f"{sub + '/' + f:<28} {t.num_rows:>9} dòng  {os.path.getsize(os.path.join(d, f)) / 1024:8.1f} KB  "
+                      f"{', '.join(f'{n}:{ty}' for n, ty in zip(t.schema.names, t.schema.types))}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Kho dữ liệu dạng cột (Arrow/Parquet) cho nodes + edges")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="CSV → kho cột")
+    b.add_argument("--parquet", action="store_true", help="ghi thêm bản Parquet (zstd)")
+    c = sub.add_parser("csv", help="kho cột → CSV cho Neo4j")
+    c.add_argument("--out", default=BASE_DIR)
+    sub.add_parser("info", help="liệt kê bảng trong kho")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        build_store(parquet=args.parquet)
+    elif args.cmd == "csv":
+        export_csv(args.out)
+    else:
+        info()
+
+if __name__ == "__main__":
+    main_entry("columnar", main)
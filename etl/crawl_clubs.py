@@ -1,10 +1,16 @@
-import os, re, time
-import requests
+import os, re, argparse
 import pandas as pd
-from bs4 import BeautifulSoup
-from io import StringIO
-import unidecode
-from requests.adapters import HTTPAdapter, Retry
+from page_cache import CACHE
+from http_client import STATS as HTTP_STATS
+from fetch_engine import get_page
+from pipeline import Pipeline, FETCHERS, PARSERS, QUEUE_SIZE
+from html_tables import parse_html, has_class, get_text, find_next, table_to_frame
+from revisions import Manifest, table_hash, patch_csv, upsert_csv
+from mediawiki_api import api_mode, use_api, page_url, section_html, sections_html
+from fetch_plan import parse_seasons, season_title
+from metrics import timed, main_entry
+from table_normalize import clean_series
+from ids import make_ids
 
 def clean_text(s):
     if not isinstance(s, str):
@@ -22,63 +28,63 @@ def season_start_year(s):
     m = re.match(r"(\d{4})-(\d{2})", s)
     return int(m.group(1)) if m else -1
 
-def last_5_seasons():
-    y = 2024
-    return [f"{y - i}–{(y - i + 1) % 100:02d}" for i in range(5)]
+STADIA_ID = re.compile(r"Stadia_and_locations|Stadiums_and_locations", re.I)
 
-def make_club_id(name):
-    if not isinstance(name, str):
-        return None
-    s = unidecode.unidecode(name)
-    s = re.sub(r"[^a-zA-Z0-9\s]", " ", s)
-    s = re.sub(r"\s+", "_", s.strip().lower())
-    return f"club_{s}"
-
-def _http_session():
-    s = requests.Session()
-    retries = Retry(total=5, backoff_factor=0.8, status_forcelist=[429,500,502,503,504])
-    s.mount("https://", HTTPAdapter(max_retries=retries))
-    s.headers.update({"User-Agent": "Mozilla/5.0"})
-    return s
-
-SESSION = _http_session()
-BASE_URL = "https://en.wikipedia.org/wiki/{}"
-
-def _find_stadia_table(soup):
-    h = soup.find(id=re.compile(r"Stadia_and_locations|Stadiums_and_locations", re.I))
-    if h:
-        sec = h.find_parent(["h2","h3"])
-        if sec:
-            tbl = sec.find_next("table", class_="wikitable")
-            if tbl:
+def _find_stadia_table(root):
+    h = next((el for el in root.xpath("//*[@id]") if STADIA_ID.search(el.get("id"))), None)
+    if h is not None:
+        sec = next(iter(h.xpath("ancestor::*[self::h2 or self::h3][1]")), None)
+        if sec is not None:
+            tbl = find_next(sec, "table", lambda t: has_class(t, "wikitable"))
+            if tbl is not None:
                 return tbl
-    for t in soup.find_all("table", class_="wikitable"):
-        text = t.get_text(" ", strip=True)
+    for t in root.iter("table"):
+        if not has_class(t, "wikitable"):
+            continue
+        text = get_text(t, " ", strip=True)
         if re.search(r"(Club|Team|Participant)", text, re.I) and re.search(r"(Stadium|Ground)", text, re.I):
             return t
     return None
 
-def get_table_for_season(season):
-    season_std = normalize_dash(season).replace("-", "–")
-    url = BASE_URL.format(f"{season_std}_Premier_League")
+def season_url(season):
+    return page_url(season_title(normalize_dash(season).replace("-", "–")))
+
+def fetch_season_page(season):
     try:
-        res = SESSION.get(url, timeout=20)
+        if api_mode():
+            # chỉ mục "Stadia and locations"; không thấy mục → cả bài
+            title = season_title(normalize_dash(season).replace("-", "–"))
+            return sections_html(title, STADIA_ID.pattern.replace("_", " ")) or section_html(title)
+        res = get_page(season_url(season), timeout=20)
         if res.status_code == 404:
             return None
         res.raise_for_status()
     except:
         return None
+    return res.content
 
-    soup = BeautifulSoup(res.text, "html.parser")
-    table = _find_stadia_table(soup)
-    if not table:
+@timed("fetch")
+def get_table_for_season(season):
+    content = fetch_season_page(season)
+    if content is None:
+        return None
+    return parse_stadia_table(content, season)
+
+def parse_stadia_table(content, season):
+    root = parse_html(content)
+    table = _find_stadia_table(root)
+    if table is None:
         return None
 
     try:
-        df = pd.read_html(StringIO(str(table)), flavor="lxml")[0]
+        df = table_to_frame(table)
     except:
         return None
+    return stadia_frame(df, season)
 
+def stadia_frame(df, season):
+    """Bảng sân (DataFrame thô) → cột Club / Stadium / Location đã làm sạch + Season."""
+    season_std = normalize_dash(season).replace("-", "–")
     if isinstance(df.columns, pd.MultiIndex):
         df.columns = [" ".join(clean_text(str(c)) for c in tup if c) for tup in df.columns]
     else:
@@ -103,7 +109,10 @@ def get_table_for_season(season):
 
     for col in ["Club", "Stadium", "Location"]:
         if col in df.columns:
-            df[col] = df[col].astype(str).apply(clean_text)
+            cells = df[col].astype(str)
+            # tên cột trùng (vd. "Capacity" cũng khớp Location) → DataFrame: giữ nguyên như trước
+            # (clean_text cũ qua DataFrame.apply nhận cả cột, không phải chuỗi → trả lại không đổi)
+            df[col] = clean_series(cells, parens=True) if isinstance(cells, pd.Series) else cells
 
     df["Season"] = season_std
     return df
@@ -115,22 +124,74 @@ def basic_club_filter(df):
     df = df[~df["Club"].str.contains(banned, na=False)]
     return df
 
-def main():
-    seasons = last_5_seasons()
+def club_outputs(all_dfs):
+    """Bảng sân các mùa → (mọi dòng CLB × mùa, mỗi CLB 1 dòng theo mùa mới nhất), đã có club_id."""
+    merged = pd.concat(all_dfs, ignore_index=True)
+    merged["Club"] = merged["Club"].astype(str).str.strip()
+    merged["club_id"] = make_ids("club", merged["Club"])
+    latest = merged.sort_values(by="Season", key=lambda s: s.map(season_start_year), ascending=False)
+    return merged, latest.drop_duplicates(subset=["Club"], keep="first")
+
+# ---------- các tầng của Pipeline (top-level để pickle sang process worker) ----------
+def _fetch_stage(season, wanted):
+    return {"season": fetch_season_page(season)}
+
+def _parse_stage(season, pages):
+    if pages["season"] is None:
+        return None
+    return parse_stadia_table(pages["season"], season)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Crawl CLB + sân theo mùa")
+    ap.add_argument("--incremental", action="store_true",
+                    help="chỉ crawl lại các trang mùa giải có revision mới, vá output tại chỗ")
+    ap.add_argument("--fetchers", type=int, default=FETCHERS, help="số thread tải trang")
+    ap.add_argument("--parsers", type=int, default=PARSERS, help="số process parse (0 = parse tại chỗ)")
+    ap.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="giới hạn hàng đợi giữa các tầng")
+    ap.add_argument("--api", action="store_true", help="tải qua MediaWiki API, chỉ lấy mục sân vận động")
+    ap.add_argument("--seasons", default=None, help='khoảng mùa: "last5" (mặc định), "all", "2010-2024", "2019–20,2020–21"')
+    ap.add_argument("--dump", help="đọc từ dump Wikipedia (pages-articles*.xml.bz2) thay vì crawl, xem ingest_dump.py")
+    args = ap.parse_args(argv)
+    use_api(args.api)
+
+    seasons = parse_seasons(args.seasons)
+    if args.dump:
+        import ingest_dump
+        return ingest_dump.ingest(args.dump, ["clubs"], seasons)
     all_dfs = []
 
+    manifest = Manifest()
+    urls = {s: season_url(s) for s in seasons}
+    if args.incremental:
+        changed = set(manifest.changed("clubs", list(urls.values())))
+        seasons = [s for s in seasons if urls[s] in changed]
+        for u in changed:
+            CACHE.expire(u)
+        print(f"🔁 Incremental: {len(seasons)}/{len(urls)} trang mùa giải có revision mới")
+    else:
+        manifest.check(list(urls.values()), strict=False)
+
+    changed_seasons = []
+    tables = {}
+    Pipeline(_fetch_stage, _parse_stage, tables.__setitem__,
+             fetchers=args.fetchers, parsers=args.parsers, queue_size=args.queue_size).run(seasons)
     for season in seasons:
-        df = get_table_for_season(season)
-        if df is not None:
+        df = tables.get(season)
+        digest = table_hash(df) if df is not None else None
+        unchanged = manifest.same_table("clubs", urls[season], digest)
+        manifest.record("clubs", urls[season], digest)
+        if df is not None and not (args.incremental and unchanged):
             df = basic_club_filter(df)
             all_dfs.append(df)
-        time.sleep(1)
+            changed_seasons.append(df["Season"].iloc[0] if len(df) else season)
 
+    CACHE.report()
+    HTTP_STATS.report()
+    manifest.save()
     if not all_dfs:
         return
 
-    merged = pd.concat(all_dfs, ignore_index=True)
-    merged["Club"] = merged["Club"].astype(str).str.strip()
+    merged, final_df = club_outputs(all_dfs)
 
     base_dir = os.path.join("..", "data")
     node_dir = os.path.join(base_dir, "nodes")
@@ -138,19 +199,24 @@ def main():
     os.makedirs(node_dir, exist_ok=True)
     os.makedirs(rel_dir, exist_ok=True)
 
-    merged["club_id"] = merged["Club"].apply(make_club_id)
     rel_path = os.path.join(rel_dir, "clubs_by_season.csv")
-    merged[["club_id", "Club", "Season"]].to_csv(rel_path, index=False, encoding="utf-8-sig")
-
-    latest = merged.sort_values(by="Season", key=lambda s: s.map(season_start_year), ascending=False)
-    final_df = latest.drop_duplicates(subset=["Club"], keep="first")
-    final_df["club_id"] = final_df["Club"].apply(make_club_id)
+    if args.incremental:
+        rel_all = patch_csv(rel_path, merged[["club_id", "Club", "Season"]], "Season", changed_seasons)
+    else:
+        merged[["club_id", "Club", "Season"]].to_csv(rel_path, index=False, encoding="utf-8-sig")
 
     node_cols = ["club_id", "Club", "Location", "Stadium"]
     node_df = final_df[node_cols]
 
     node_path = os.path.join(node_dir, "clubs.csv")
-    node_df.to_csv(node_path, index=False, encoding="utf-8-sig")
+    if args.incremental:
+        # chỉ ghi đè CLB mà mùa vừa crawl lại là mùa mới nhất của CLB đó
+        latest_season = rel_all.groupby("club_id")["Season"].agg(lambda s: max(s, key=season_start_year))
+        is_latest = (final_df["club_id"].map(latest_season) == final_df["Season"]).values
+        upsert_csv(node_path, node_df[is_latest], "club_id", keep_ids=rel_all["club_id"])
+        print(f"🩹 Vá {len(changed_seasons)} mùa trong clubs_by_season.csv / clubs.csv")
+    else:
+        node_df.to_csv(node_path, index=False, encoding="utf-8-sig")
 
 if __name__ == "__main__":
-    main()
+    main_entry("clubs", main)
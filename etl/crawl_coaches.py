@@ -1,15 +1,23 @@
-import os, re, time
-import requests
+import os, re, time, argparse
+from itertools import groupby
+from operator import itemgetter
 import pandas as pd
-from bs4 import BeautifulSoup
-from io import StringIO
-import unidecode
+from page_cache import CACHE
+from http_client import STATS as HTTP_STATS
+from fetch_engine import get_page
+from pipeline import Pipeline, More, FETCHERS, PARSERS, QUEUE_SIZE
+from html_tables import parse_html, has_class, get_text, find_heading, find_next, table_to_frame
+from revisions import Manifest, patch_csv, upsert_csv
+from checkpoint import Checkpoint, AtomicCSV
+from ids import make_coach_id
+from mediawiki_api import api_mode, use_api, club_title, prefetch_club_titles, page_url, section_html, sections_html
+from metrics import timed, main_entry
+import table_normalize as tn
 
 # =============================
 # Cấu hình
 # =============================
 HEADERS = {"User-Agent": "Mozilla/5.0"}
-BASE_URL = "https://en.wikipedia.org/wiki/{}"
 
 BASE_DIR = "../data"
 NODE_DIR = os.path.join(BASE_DIR, "nodes")
@@ -21,25 +29,9 @@ def now():
     return time.strftime("[%H:%M:%S]")
 
 def clean_text(s):
-    if not isinstance(s, str):
-        return ""
-    s = re.sub(r"\[.*?\]", "", s)
-    s = re.sub(r"\(.*?\)", "", s)
-    s = s.replace("\xa0", " ").strip()
-    return s
-
-def make_id(prefix, name):
-    if not name:
-        return None
-    s = unidecode.unidecode(name)
-    s = re.sub(r"[^a-zA-Z0-9\s-]", " ", s)
-    s = re.sub(r"\s+", "_", s.strip().lower())
-    return f"{prefix}_{s}"
-
-# ---------- Helpers để bóc tách tên/years từ ô nhiều dòng ----------
-COUNTRY_TOKEN = re.compile(r"^[A-Z]{2,4}$")  # ENG, IRE, SCO, etc.
-DATEISH = re.compile(r"\d")                  # chứa số: ngày/tháng/năm
-PCTISH = re.compile(r"\d+\.\d+%?$")          # 44.34, 60.63, v.v.
+    return tn.clean_text(s, parens=True)
+
+# ---------- Helpers để bóc tách tên/years từ ô nhiều dòng (logic nằm ở table_normalize) ----------
 
 def _first_scalar(x):
     """Trả về một scalar string từ nhiều kiểu khác nhau (Series/list/scalar)."""
@@ -53,132 +45,132 @@ def _first_scalar(x):
             return clean_text(str(x))
     return clean_text(str(x))
 
-def _split_lines(s):
-    """Tách theo xuống dòng/br; lọc rỗng."""
-    if not isinstance(s, str):
-        s = clean_text(str(s))
-    parts = re.split(r"[\r\n]+|<br\s*/?>", s, flags=re.I)
-    return [clean_text(p) for p in parts if clean_text(p)]
-
-def _looks_like_name(token):
-    """Heuristic: coi token là tên nếu có chữ cái và không phải mã quốc tịch/thuần số."""
-    if not token: 
-        return False
-    if COUNTRY_TOKEN.match(token): 
-        return False
-    # loại bỏ dòng toàn số liệu hoặc phần trăm
-    if PCTISH.match(token): 
-        return False
-    # có ít nhất 1 chữ cái
-    return re.search(r"[A-Za-z]", token) is not None
-
 def extract_coach_name(cell):
     """Lấy đúng 'tên' từ ô có thể chứa nhiều dòng (tên + quốc tịch + ngày + stats)."""
-    v = _first_scalar(cell)
-    lines = _split_lines(v)
-    # Ưu tiên dòng đầu thỏa điều kiện name
-    for t in lines:
-        t2 = re.sub(r"\s{2,}", " ", t).strip(" ,;")
-        if _looks_like_name(t2):
-            return t2
-    # fallback: toàn bộ chuỗi nhưng rút gọn tới trước 2 dòng đầu
-    return lines[0] if lines else v
+    return tn.pick_name(_first_scalar(cell))
 
 def extract_years(cell):
     """Lấy trường years (thường là cột 'Years/Dates/Tenure' hoặc ghép ô)."""
-    v = _first_scalar(cell)
-    lines = _split_lines(v)
-    # chọn dòng chứa số (thường là ngày/tháng/năm hoặc mốc năm)
-    for t in lines:
-        if DATEISH.search(t):
-            return t
-    # fallback: trả về chuỗi rút gọn 1 dòng
-    return lines[0] if lines else v
+    return tn.pick_years(_first_scalar(cell))
 
 # =============================
 # Lấy thông tin HLV
 # =============================
+INFOBOX = re.compile("infobox", re.I)
+MANAGER_SECTION = r"Managerial|Managers"
+WIKITABLE = re.compile("wikitable", re.I)
+
+def club_base_title(club_name):
+    return club_title(club_name).replace(" ", "_")
+
+def club_pages(club_name):
+    """(URL trang CLB, URL trang 'List of ... managers') — hai trang mà get_coach_history có thể đọc."""
+    base_title = club_base_title(club_name)
+    return page_url(base_title), page_url(f"List_of_{base_title}_managers")
+
+def _fetch(url):
+    res = get_page(url, headers=HEADERS, timeout=20)
+    res.raise_for_status()
+    return res.content
+
+def _fetch_club(club_name):
+    # chế độ API: mục dẫn đầu (infobox → HLV hiện tại) + mục lịch sử HLV nếu có, thay vì cả trang
+    if api_mode():
+        title = club_title(club_name)
+        return b"\n".join([section_html(title, 0), sections_html(title, MANAGER_SECTION) or b""])
+    return _fetch(club_pages(club_name)[0])
+
+def _fetch_list(club_name):
+    if api_mode():
+        return section_html(f"List of {club_title(club_name)} managers")
+    return _fetch(club_pages(club_name)[1])
+
+@timed("fetch")
 def get_coach_history(club_name, club_id, season):
-    special_cases = {
-        "Bournemouth": "AFC_Bournemouth",
-        "Brighton & Hove Albion": "Brighton_&_Hove_Albion_F.C.",
-        "Wolverhampton Wanderers": "Wolverhampton_Wanderers_F.C.",
-        "Newcastle United": "Newcastle_United_F.C.",
-        "Luton Town": "Luton_Town_F.C.",
-        "West Ham United": "West_Ham_United_F.C."
-    }
-
-    name_for_url = special_cases.get(club_name, club_name)
-    base_title = name_for_url.replace(" ", "_")
-    if not base_title.endswith("_F.C.") and "AFC" not in base_title:
-        base_title += "_F.C."
-    url = BASE_URL.format(base_title)
-
     try:
-        res = requests.get(url, headers=HEADERS, timeout=20)
-        res.raise_for_status()
+        pages = {"club": _fetch_club(club_name)}
     except Exception as e:
         print(f"{now()} ⚠️ Không tải được {club_name}: {e}")
         return []
 
-    soup = BeautifulSoup(res.text, "html.parser")
+    rows = parse_coach_history(pages, club_name, club_id, season)
+    if isinstance(rows, More):
+        try:
+            pages["list"] = _fetch_list(club_name)
+        except Exception:
+            pages["list"] = None
+        rows = parse_coach_history(pages, club_name, club_id, season)
+    return rows
+
+def parse_coach_history(pages, club_name, club_id, season):
+    """Bóc lịch sử HLV từ HTML đã tải: pages = {"club": bytes, "list": bytes|None (nếu đã tải)}.
+
+    Trả về More(["list"]) khi trang CLB không có bảng HLV và chưa có trang 'List of ... managers'.
+    """
+    root = parse_html(pages["club"])
 
     # 1) Lấy HLV hiện tại từ infobox
-    infobox = soup.find("table", class_=re.compile("infobox", re.I))
+    infobox = find_next(root, "table", lambda t: has_class(t, INFOBOX))
     current_coach = None
-    if infobox:
-        for tr in infobox.find_all("tr"):
-            th = tr.find("th")
-            if th and ("manager" in th.text.lower() or "head coach" in th.text.lower()):
-                td = tr.find("td")
-                if td:
-                    current_coach = clean_text(td.get_text("\n"))
+    if infobox is not None:
+        for tr in infobox.iter("tr"):
+            th = tr.find(".//th")
+            if th is not None and ("manager" in th.text_content().lower() or "head coach" in th.text_content().lower()):
+                td = tr.find(".//td")
+                if td is not None:
+                    current_coach = clean_text(get_text(td, "\n"))
                 break
 
     # 2) Tìm bảng danh sách HLV
-    header = soup.find(["h2", "h3"], string=re.compile(r"Managerial|Managers", re.I))
+    header = find_heading(root, string=re.compile(r"Managerial|Managers", re.I))
     table = None
-    if header:
-        table = header.find_next("table", class_=re.compile("wikitable", re.I))
+    if header is not None:
+        table = find_next(header, "table", lambda t: has_class(t, WIKITABLE))
 
-    if not table:
-        list_title = f"List_of_{base_title}_managers"
-        list_url = BASE_URL.format(list_title)
+    if table is None:
+        if "list" not in pages:
+            return More(["list"])
         try:
-            res2 = requests.get(list_url, headers=HEADERS, timeout=20)
-            res2.raise_for_status()
-            soup2 = BeautifulSoup(res2.text, "html.parser")
-            tables = soup2.find_all("table", class_=re.compile("wikitable", re.I))
+            root2 = parse_html(pages["list"])
+            tables = [t for t in root2.iter("table") if has_class(t, WIKITABLE)]
+            n_rows = lambda t: len(t.xpath(".//tr"))
             for t in tables:
-                text = t.get_text(" ", strip=True)
+                text = get_text(t, " ", strip=True)
                 if re.search(r"Manager|Head coach|Name", text, re.I):
-                    if table is None or len(t.find_all("tr")) > len(table.find_all("tr")):
+                    if table is None or n_rows(t) > n_rows(table):
                         table = t
-            if not table and tables:
-                table = max(tables, key=lambda t: len(t.find_all("tr")))
+            if table is None and tables:
+                table = max(tables, key=n_rows)
         except:
             pass
 
     # 3) Nếu không có bảng thì chỉ lưu HLV hiện tại (nếu có)
-    if not table:
-        if current_coach:
-            name_clean = extract_coach_name(current_coach)
-            return [{
-                "coach_id": make_id("coach", name_clean),
-                "name": name_clean,
-                "club_id": club_id,
-                "club_name": club_name,
-                "season": season,
-                "years": "",
-                "is_current": True
-            }]
-        return []
+    if table is None:
+        return coach_rows(pd.DataFrame(), current_coach, club_id, club_name, season)
 
     # 4) Đọc bảng
     try:
-        df = pd.read_html(StringIO(str(table)), flavor="lxml")[0]
+        df = table_to_frame(table)
     except Exception:
         return []
+    return coach_rows(df, current_coach, club_id, club_name, season)
+
+def coach_rows(df, current_coach, club_id, club_name, season):
+    """Bảng HLV (DataFrame) → dòng coach đã làm sạch; bảng không bóc được tên nào → chỉ HLV hiện tại."""
+    def current_only():
+        name_clean = extract_coach_name(current_coach)
+        return [{
+            "coach_id": make_coach_id(name_clean),
+            "name": tn.collapse_spaces(name_clean),
+            "club_id": club_id,
+            "club_name": club_name,
+            "season": season,
+            "years": "",
+            "is_current": True
+        }]
+
+    if df.empty and not len(df.columns):
+        return current_only() if current_coach else []
 
     # Nếu MultiIndex columns → flatten
     if isinstance(df.columns, pd.MultiIndex):
@@ -190,97 +182,155 @@ def get_coach_history(club_name, club_id, season):
     name_col = next((c for c in df.columns if re.search(r"(Manager|Head coach|Coach|Name)", c, re.I)), df.columns[min(1, len(df.columns)-1)])
     year_col = next((c for c in df.columns if re.search(r"(Year|From|To|Dates|Tenure|Period|Season)", c, re.I)), df.columns[0])
 
-    rows = []
-    for _, r in df.iterrows():
-        raw_name = r.get(name_col, "")
-        raw_years = r.get(year_col, "")
-
-        name = extract_coach_name(raw_name)
-        if not name:
-            continue
-        years = extract_years(raw_years)
-
-        rows.append({
-            "coach_id": make_id("coach", name),
-            "name": name,
-            "club_id": club_id,
-            "club_name": club_name,
-            "season": season,
-            "years": years,
-            "is_current": False
-        })
-
-    # 5) Gắn cờ is_current
-    if rows:
-        if current_coach:
-            current_norm = extract_coach_name(current_coach).lower()
-            matched = False
-            for r in rows:
-                if current_norm in r["name"].lower() or r["name"].lower() in current_norm:
-                    r["is_current"] = True
-                    matched = True
-                    break
-            if not matched:
-                # nếu không match tên thì mặc định đánh dấu người cuối cùng
-                rows[-1]["is_current"] = True
-        else:
-            rows[-1]["is_current"] = True
-    elif current_coach:
-        name_clean = extract_coach_name(current_coach)
-        rows.append({
-            "coach_id": make_id("coach", name_clean),
-            "name": name_clean,
-            "club_id": club_id,
-            "club_name": club_name,
-            "season": season,
-            "years": "",
-            "is_current": True
-        })
+    # chuẩn hoá theo cột (table_normalize), bỏ dòng không bóc được tên
+    rows = [(name, years) for name, years in zip(tn.coach_names(tn.column(df, name_col)),
+                                                 tn.coach_years(tn.column(df, year_col))) if name]
+    if not rows:
+        return current_only() if current_coach else []
+
+    # Gắn cờ is_current: HLV infobox khớp tên (chứa nhau) → dòng khớp đầu tiên; không khớp → dòng cuối
+    current = len(rows) - 1
+    if current_coach:
+        current_norm = extract_coach_name(current_coach).lower()
+        current = next((i for i, (name, _) in enumerate(rows)
+                        if current_norm in name.lower() or name.lower() in current_norm), current)
+
+    return [{
+        "coach_id": make_coach_id(name),
+        "name": tn.collapse_spaces(name),
+        "club_id": club_id,
+        "club_name": club_name,
+        "season": season,
+        "years": tn.collapse_spaces(years),
+        "is_current": i == current
+    } for i, (name, years) in enumerate(rows)]
+
+# ---------- commit theo CLB + gộp part thành output ----------
+COACH_COLS = ["coach_id", "name", "club_id", "club_name", "season", "years", "is_current"]
+COACH_NODE_COLS = ["coach_id", "name"]
+COACHED_COLS = ["coach_id", "club_id", "season", "years", "is_current"]
+
+def merge_outputs(cp, write_coach, write_coached, keys=None):
+    """coaches: heap-merge các part theo coach_id, giữ dòng đầu tiên (như drop_duplicates);
+    coached: duyệt part theo thứ tự CLB."""
+    for _, group in groupby(cp.merged(keys), key=itemgetter("coach_id")):
+        write_coach(next(group))
+    for r in cp.rows(keys):
+        write_coached(r)
+
+# ---------- các tầng của Pipeline (top-level để pickle sang process worker) ----------
+def _fetch_stage(item, wanted):
+    club_name, _, _ = item
+    if wanted is None:
+        try:
+            return {"club": _fetch_club(club_name)}
+        except Exception as e:
+            print(f"{now()} ⚠️ Không tải được {club_name}: {e}")
+            return {"club": None}
+    try:
+        return {"list": _fetch_list(club_name)}
+    except Exception:
+        return {"list": None}
 
-    return rows
+def _parse_stage(item, pages):
+    club_name, club_id, season = item
+    if pages["club"] is None:
+        return []
+    return parse_coach_history(pages, club_name, club_id, season)
 
 # =============================
 # Main
 # =============================
-def main():
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Crawl lịch sử HLV theo CLB")
+    ap.add_argument("--incremental", action="store_true",
+                    help="chỉ crawl lại các CLB có trang (hoặc trang danh sách HLV) đổi revision")
+    ap.add_argument("--fetchers", type=int, default=FETCHERS, help="số thread tải trang")
+    ap.add_argument("--parsers", type=int, default=PARSERS, help="số process parse (0 = parse tại chỗ)")
+    ap.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="giới hạn hàng đợi giữa các tầng")
+    ap.add_argument("--api", action="store_true", help="tải qua MediaWiki API, chỉ lấy infobox + mục HLV")
+    ap.add_argument("--restart", action="store_true", help="bỏ checkpoint của lần chạy dở trước, crawl lại từ đầu")
+    ap.add_argument("--dump", help="đọc từ dump Wikipedia (pages-articles*.xml.bz2) thay vì crawl, xem ingest_dump.py")
+    args = ap.parse_args(argv)
+    use_api(args.api)
+    if args.dump:
+        import ingest_dump
+        return ingest_dump.ingest(args.dump, ["coaches"])
+
     clubs_csv = os.path.join(NODE_DIR, "clubs.csv")
     if not os.path.exists(clubs_csv):
         raise FileNotFoundError("⚠️ Thiếu file clubs.csv")
 
     clubs_df = pd.read_csv(clubs_csv)
-    all_rows = []
-
-    print(f"\n🏟️  Bắt đầu crawl danh sách HLV cho {len(clubs_df)} CLB...\n")
-    for _, row in clubs_df.iterrows():
-        club_name = row["Club"]
-        club_id = row["club_id"]
-        print(f"{now()} ⏳ {club_name}")
-        coaches = get_coach_history(club_name, club_id, "2024–25")
-        all_rows.extend(coaches)
-        time.sleep(1)
-
-    if not all_rows:
-        print("❌ Không có dữ liệu HLV nào được lấy!")
-        return
-
-    df = pd.DataFrame(all_rows)
 
-    # Làm sạch cuối:
-    df["name"] = df["name"].astype(str).apply(lambda s: re.sub(r"\s{2,}", " ", s).strip())
-    df["years"] = df["years"].fillna("").astype(str).apply(lambda s: re.sub(r"\s{2,}", " ", s).strip())
-    df["is_current"] = df["is_current"].fillna(False).astype(bool)
+    manifest = Manifest()
+    prefetch_club_titles(clubs_df["Club"])
+    pages = {row["club_id"]: club_pages(row["Club"]) for _, row in clubs_df.iterrows()}
+    all_urls = [u for pair in pages.values() for u in pair]
+    if args.incremental:
+        changed = set(manifest.changed("coaches", all_urls))
+        clubs_df = clubs_df[[bool(changed & set(pages[c])) for c in clubs_df["club_id"]]]
+        for u in changed:
+            CACHE.expire(u)
+        print(f"🔁 Incremental: {len(clubs_df)}/{len(pages)} CLB có trang HLV thay đổi")
+    else:
+        manifest.check(all_urls, strict=False)
+
+    # mỗi CLB xong là commit ngay thành 1 part (crash → chạy lại tiếp từ CLB chưa commit)
+    jobs = [(row["Club"], row["club_id"], "2024–25") for _, row in clubs_df.iterrows()]
+    cp = Checkpoint("coaches", COACH_COLS, [j[1] for j in jobs], sort_key="coach_id", resume=not args.restart)
+    todo = [j for j in jobs if not cp.done(j[1])]
+    if len(todo) < len(jobs):
+        print(f"♻️  Tiếp tục từ checkpoint: {len(jobs) - len(todo)}/{len(jobs)} CLB đã commit")
+    print(f"\n🏟️  Bắt đầu crawl danh sách HLV cho {len(todo)} CLB...\n")
+    def write(item, coaches):
+        print(f"{now()} ✔️ {item[0]}: {len(coaches)} HLV")
+        cp.commit(item[1], coaches)
+
+    Pipeline(_fetch_stage, _parse_stage, write,
+             fetchers=args.fetchers, parsers=args.parsers, queue_size=args.queue_size).run(todo)
+
+    CACHE.report()
+    HTTP_STATS.report()
+
+    # bảng giống hệt lần trước (revision đổi ở phần khác của trang) → không cần vá
+    changed_clubs = []
+    for club_id in clubs_df["club_id"]:
+        club_url, list_url = pages[club_id]
+        digest = cp.digest(club_id)
+        if not manifest.same_table("coaches", club_url, digest):
+            changed_clubs.append(club_id)
+        manifest.record("coaches", club_url, digest)
+        manifest.record("coaches", list_url, None)
+    keys = changed_clubs if args.incremental else None
+
+    if not any(cp.committed[k]["rows"] for k in (keys if keys is not None else cp.committed)):
+        manifest.save()
+        cp.clear()
+        if args.incremental:
+            print("✅ Không có bảng HLV nào thay đổi.")
+        else:
+            print("❌ Không có dữ liệu HLV nào được lấy!")
+        return
 
-    # Node: coaches.csv
-    coaches_df = df.drop_duplicates(subset=["coach_id"])[["coach_id", "name"]]
+    # Node: coaches.csv — Edge: coached.csv
     coaches_path = os.path.join(NODE_DIR, "coaches.csv")
-    coaches_df.to_csv(coaches_path, index=False, encoding="utf-8-sig")
-
-    # Edge: coached.csv
-    coached_df = df[["coach_id", "club_id", "season", "years", "is_current"]]
     coached_path = os.path.join(REL_DIR, "coached.csv")
-    coached_df.to_csv(coached_path, index=False, encoding="utf-8-sig")
+    if args.incremental:
+        coaches, coached = [], []
+        merge_outputs(cp, coaches.append, coached.append, keys)
+        # Edge trước, node sau: bỏ các HLV không còn cạnh nào
+        coached_df = patch_csv(coached_path, pd.DataFrame(coached, columns=COACHED_COLS), "club_id", changed_clubs)
+        upsert_csv(coaches_path, pd.DataFrame(coaches, columns=COACH_NODE_COLS), "coach_id",
+                   keep_ids=coached_df["coach_id"])
+        print(f"🩹 Vá {len(changed_clubs)} CLB trong coached.csv / coaches.csv")
+    else:
+        with AtomicCSV(coaches_path, COACH_NODE_COLS) as cw, AtomicCSV(coached_path, COACHED_COLS) as ew:
+            merge_outputs(cp, cw.write, ew.write)
+    manifest.save()
+    cp.clear()
 
     print(f"\n✅ coaches.csv & coached.csv được tạo thành công!\n")
 
 if __name__ == "__main__":
-    main()
+    main_entry("coaches", main)
@@ -1,13 +1,22 @@
-import os, re, time
-import requests
+import os, re, argparse
+from itertools import groupby
+from operator import itemgetter
 import pandas as pd
-from bs4 import BeautifulSoup
-from io import StringIO
-import unidecode
+from page_cache import CACHE
+from http_client import STATS as HTTP_STATS
+from fetch_engine import get_page
+from pipeline import Pipeline, FETCHERS, PARSERS, QUEUE_SIZE
+from html_tables import parse_html, has_class, find_heading, find_next, iter_next, find_previous, table_to_frame
+from revisions import Manifest, patch_csv, upsert_csv
+from ids import make_player_id, resolve_collisions
+from checkpoint import Checkpoint, AtomicCSV
+from fetch_plan import parse_seasons, build_plan
+from mediawiki_api import api_mode, use_api, club_title, page_url, sections, find_section, section_html
+from metrics import timed, main_entry
+from table_normalize import squad_rows
 
 HEADERS = {"User-Agent": "Mozilla/5.0"}
-BASE_URL = "https://en.wikipedia.org/wiki/{}"
-SEASONS = ["2024–25", "2023–24", "2022–23", "2021–22", "2020–21"]
+SEASONS = parse_seasons()
 
 BASE_DIR = "../data"
 NODE_DIR = os.path.join(BASE_DIR, "nodes")
@@ -15,65 +24,70 @@ REL_DIR = os.path.join(BASE_DIR, "relations")
 os.makedirs(NODE_DIR, exist_ok=True)
 os.makedirs(REL_DIR, exist_ok=True)
 
-def clean_text(s):
-    if not isinstance(s, str):
-        return ""
-    s = re.sub(r"\[.*?\]", "", s)
-    return s.replace("\xa0", " ").strip()
+SQUAD_HEADING = re.compile(r"(First[- ]?team|Current) squad", re.I)
+FIRST_TEAM_HEADING = re.compile(r"First[- ]?Team", re.I)
+FIRST_TEAM_ID = re.compile(r"First[\-_ ]?team[\-_ ]?(squad)?", re.I)
+SQUAD_TABLE = re.compile(r"(football-squad|wikitable)")
+OUT_HEADING = re.compile(r"Out|loan|academy", re.I)
+SEASON_SQUAD_HEADING = re.compile(r"^\s*(Squad( information)?|Players|First[- ]?team)\s*$", re.I)   # bài "<mùa> <CLB> season"
+SQUAD_HEADINGS = (SQUAD_HEADING, FIRST_TEAM_HEADING, SEASON_SQUAD_HEADING)
 
-def make_player_id(name):
-    s = unidecode.unidecode(name)
-    s = re.sub(r"[^a-zA-Z0-9\s]", " ", s)
-    s = re.sub(r"\s+", "_", s.strip().lower())
-    return f"player_{s}"
-
-def get_players_from_club(club_name, club_id, season):
-    special_cases = {
-        "Bournemouth": "AFC Bournemouth",
-        "Brighton & Hove Albion": "Brighton_&_Hove_Albion_F.C.",
-        "Wolverhampton Wanderers": "Wolverhampton_Wanderers_F.C.",
-        "Newcastle United": "Newcastle_United_F.C.",
-        "Luton Town": "Luton_Town_F.C.",
-        "West Ham United": "West_Ham_United_F.C."
-    }
-    name_for_url = special_cases.get(club_name, club_name)
-    url = BASE_URL.format(name_for_url.replace(" ", "_") + ("" if "AFC" in name_for_url else "_F.C."))
+def club_page_url(club_name):
+    return page_url(club_title(club_name))
 
+def fetch_squad_page(title, url, oldid=None):
+    """Tải 1 trang đội hình (trang CLB, bài mùa giải hoặc revision ghim bằng oldid); trả về bytes hoặc None.
+    Chế độ API chỉ lấy mục đội hình (fallback cả bài nếu không thấy mục)."""
     try:
-        res = requests.get(url, headers=HEADERS, timeout=20)
-        if res.status_code == 404 and "_F.C." in url:
-            alt_url = url.replace("_F.C.", "")
-            res = requests.get(alt_url, headers=HEADERS, timeout=20)
+        if api_mode():
+            toc = sections(title, oldid)
+            idx = next((i for i in (find_section(title, p, toc) for p in SQUAD_HEADINGS) if i is not None), None)
+            return section_html(title, idx, oldid)
+        res = get_page(url, headers=HEADERS, timeout=20)
         res.raise_for_status()
     except:
+        return None
+    return res.content
+
+def fetch_club_page(club_name):
+    return fetch_squad_page(club_title(club_name), club_page_url(club_name))
+
+@timed("fetch")
+def get_players_from_club(club_name, club_id, season):
+    content = fetch_club_page(club_name)
+    if content is None:
         return []
+    return parse_players(content, club_id, [season])
 
-    soup = BeautifulSoup(res.text, "html.parser")
-    header = (
-        soup.find(["h2", "h3"], string=re.compile(r"(First[- ]?team|Current) squad", re.I))
-        or soup.find(["h2", "h3"], string=re.compile(r"First[- ]?Team", re.I))
-        or soup.find(["h2", "h3"], id=re.compile(r"First[\-_ ]?team[\-_ ]?(squad)?", re.I))
-    )
-    if not header:
+def parse_players(content, club_id, seasons):
+    """Bóc đội hình từ HTML trang CLB (1 lần parse) và sinh dòng cho từng mùa trong `seasons`."""
+    root = parse_html(content)
+    header = None
+    for kw in ({"string": SQUAD_HEADING}, {"string": FIRST_TEAM_HEADING}, {"id": FIRST_TEAM_ID},
+               {"string": SEASON_SQUAD_HEADING}):
+        header = find_heading(root, **kw)
+        if header is not None:
+            break
+    if header is None:
         return []
 
     tables = []
-    presentation_table = header.find_next("table", {"role": "presentation"})
-    if presentation_table:
-        inner_tables = presentation_table.find_all("table", class_=re.compile(r"(football-squad|wikitable)"))
+    presentation_table = find_next(header, "table", lambda t: t.get("role") == "presentation")
+    if presentation_table is not None:
+        inner_tables = [t for t in presentation_table.iterdescendants("table") if has_class(t, SQUAD_TABLE)]
         if inner_tables:
             tables.extend(inner_tables)
 
     if not tables:
-        for t in header.find_all_next("table", class_=re.compile(r"(football-squad|wikitable)")):
-            prev_header = t.find_previous(
-                lambda tag: tag.name in ["h2", "h3"] and re.search(r"Out|loan|academy", tag.text, re.I)
-            )
-            if prev_header:
+        for t in iter_next(header, "table"):
+            if not has_class(t, SQUAD_TABLE):
+                continue
+            prev_header = find_previous(t, ["h2", "h3"], lambda tag: OUT_HEADING.search(tag.text_content()))
+            if prev_header is not None:
                 break
             tables.append(t)
-            nxt = t.find_next_sibling("table")
-            if not (nxt and re.search(r"(football-squad|wikitable)", " ".join(nxt.get("class", [])), re.I)):
+            nxt = next(iter(t.xpath("following-sibling::table[1]")), None)
+            if not (nxt is not None and re.search(r"(football-squad|wikitable)", nxt.get("class", ""), re.I)):
                 break
 
     if not tables:
@@ -82,7 +96,7 @@ def get_players_from_club(club_name, club_id, season):
     dfs = []
     for t in tables:
         try:
-            df = pd.read_html(StringIO(str(t)))[0]
+            df = table_to_frame(t)
             df.columns = [c.strip() for c in df.columns]
             dfs.append(df)
         except:
@@ -90,12 +104,15 @@ def get_players_from_club(club_name, club_id, season):
     if not dfs:
         return []
 
-    df = pd.concat(dfs, ignore_index=True)
+    return players_from_frame(pd.concat(dfs, ignore_index=True), club_id, seasons)
+
+def players_from_frame(df, club_id, seasons):
+    """Bảng đội hình (cột Player/Name, Nat, Pos…) → dòng cầu thủ cho từng mùa trong `seasons`."""
     rename_map = {}
     for c in df.columns:
         if "Player" in c or "Name" in c:
             rename_map[c] = "Name"
-        elif "Nation" in c:
+        elif "Nat" in c:        # "Nation" (trang CLB) / "Nat." (bài mùa giải)
             rename_map[c] = "Nation"
         elif "Pos" in c or "Position" in c:
             rename_map[c] = "Position"
@@ -103,48 +120,161 @@ def get_players_from_club(club_name, club_id, season):
     keep_cols = ["Name", "Nation", "Position"]
     df = df[[c for c in keep_cols if c in df.columns]].copy()
 
+    squad = [(make_player_id(name), name, nation, position) for name, nation, position in squad_rows(df)]
+
     players = []
-    for _, row in df.iterrows():
-        name = clean_text(row.get("Name", ""))
-        nation = clean_text(row.get("Nation", ""))
-        position = clean_text(row.get("Position", ""))
-        if not name:
-            continue
-        players.append({
-            "player_id": make_player_id(name),
-            "name": name,
-            "nation": nation,
-            "position": position,
-            "club_id": club_id,
-            "season": season
-        })
+    for season in seasons:
+        for player_id, name, nation, position in squad:
+            players.append({
+                "player_id": player_id,
+                "name": name,
+                "nation": nation,
+                "position": position,
+                "club_id": club_id,
+                "season": season
+            })
     return players
 
-def main():
+# ---------- gộp part thành output (luồng, bộ nhớ không phụ thuộc số dòng) ----------
+PLAYER_COLS = ["player_id", "name", "nation", "position", "club_id", "season"]
+PLAYER_NODE_COLS = ["player_id", "name", "nation", "position"]
+REL_COLS = ["player_id", "club_id", "season", "position"]
+
+def _split_collisions(group, known, existing):
+    # 2 cầu thủ trùng tên (khác quốc tịch) không được gộp làm 1 ID — chỉ nhóm có > 1 quốc tịch mới tốn pandas
+    nations = {r["nation"] for r in group if r["nation"]} | known.get(group[0]["player_id"], set())
+    if len(nations) <= 1:
+        return group, []
+    df, changes = resolve_collisions(pd.DataFrame(group), "player_id", ["nation"], existing=existing,
+                                     label="player_id")
+    return df.to_dict("records"), changes
+
+def merge_outputs(cp, write_player, write_rel, keep=None, existing=None):
+    """players: heap-merge các part theo player_id → mỗi nhóm cùng ID xử lý va chạm rồi lấy dòng đầu tiên
+    (theo thứ tự kế hoạch, như drop_duplicates). played_for: duyệt part theo thứ tự kế hoạch, áp bảng đổi ID."""
+    known = {}
+    if existing is not None and len(existing):
+        for pid, nation in zip(existing["player_id"], existing["nation"].fillna("").astype(str)):
+            if nation:
+                known.setdefault(pid, set()).add(nation)
+    renames = {}
+    for _, group in groupby(cp.merged(), key=itemgetter("player_id")):
+        group = [r for r in group if keep is None or (r["club_id"], r["season"]) in keep]
+        if not group:
+            continue
+        group, changes = _split_collisions(group, known, existing)
+        renames.update({(i, k): n for i, k, n in changes})
+        seen = set()
+        for r in group:
+            if r["player_id"] not in seen:
+                seen.add(r["player_id"])
+                write_player(r)
+
+    seen, club = set(), None
+    for r in cp.rows():
+        if keep is not None and (r["club_id"], r["season"]) not in keep:
+            continue
+        if r["club_id"] != club:            # part được xếp theo CLB → trùng lặp chỉ có thể trong cùng CLB
+            seen, club = set(), r["club_id"]
+        rel = dict(r, player_id=renames.get((r["player_id"], r["nation"]), r["player_id"]))
+        k = tuple(rel[c] for c in REL_COLS)
+        if k not in seen:
+            seen.add(k)
+            write_rel(rel)
+
+# ---------- các tầng của Pipeline (top-level để pickle sang process worker) ----------
+# item = task của fetch_plan: (url, kind, club_name, club_id, seasons, title, oldid)
+def _fetch_stage(task, wanted):
+    url, _, _, _, _, title, oldid = task
+    return {"page": fetch_squad_page(title, url, oldid)}
+
+def _parse_stage(task, pages):
+    club_id, seasons = task[3], task[4]
+    if pages["page"] is None:
+        return []
+    return parse_players(pages["page"], club_id, seasons)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Crawl cầu thủ theo CLB")
+    ap.add_argument("--incremental", action="store_true",
+                    help="chỉ crawl lại các trang đội hình có revision mới, vá output tại chỗ")
+    ap.add_argument("--fetchers", type=int, default=FETCHERS, help="số thread tải trang")
+    ap.add_argument("--parsers", type=int, default=PARSERS, help="số process parse (0 = parse tại chỗ)")
+    ap.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="giới hạn hàng đợi giữa các tầng")
+    ap.add_argument("--api", action="store_true", help="tải qua MediaWiki API, chỉ lấy mục đội hình")
+    ap.add_argument("--seasons", default=None, help='khoảng mùa: "last5" (mặc định), "all", "2010-2024", "2019–20,2020–21"')
+    ap.add_argument("--no-pin", action="store_true",
+                    help="không dùng revision ghim cho mùa cũ thiếu bài mùa giải (bỏ qua các cặp đó)")
+    ap.add_argument("--plan-only", action="store_true", help="chỉ in kích thước kế hoạch tải rồi thoát")
+    ap.add_argument("--restart", action="store_true", help="bỏ checkpoint của lần chạy dở trước, crawl lại từ đầu")
+    ap.add_argument("--dump", help="đọc từ dump Wikipedia (pages-articles*.xml.bz2) thay vì crawl, xem ingest_dump.py")
+    args = ap.parse_args(argv)
+    use_api(args.api)
+    if args.dump:
+        import ingest_dump
+        return ingest_dump.ingest(args.dump, ["players"], parse_seasons(args.seasons) if args.seasons else SEASONS)
+
     clubs_csv = os.path.join(NODE_DIR, "clubs.csv")
     if not os.path.exists(clubs_csv):
         raise FileNotFoundError("Missing clubs.csv")
 
     clubs_df = pd.read_csv(clubs_csv)
-    all_players = []
-    for _, row in clubs_df.iterrows():
-        club_name = row["Club"]
-        club_id = row["club_id"]
-        for season in SEASONS:
-            players = get_players_from_club(club_name, club_id, season)
-            if players:
-                all_players.extend(players)
-        time.sleep(1)
-
-    if not all_players:
+    manifest = Manifest()
+    seasons = parse_seasons(args.seasons) if args.seasons else SEASONS
+    plan = build_plan(clubs_df, seasons, pin=not args.no_pin)
+    if args.plan_only:
         return
+    urls = [t[0] for t in plan]
+    if args.incremental:
+        changed = set(manifest.changed("players", urls))
+        plan = [t for t in plan if t[0] in changed]
+        for u in changed:
+            CACHE.expire(u)
+        print(f"🔁 Incremental: {len(plan)}/{len(urls)} trang đội hình có revision mới")
+    else:
+        manifest.check(urls, strict=False)
+
+    # mỗi trang khác nhau tải + parse đúng 1 lần; kết quả commit ngay thành part (crash → chạy lại tiếp từ đây)
+    cp = Checkpoint("players", PLAYER_COLS, [t[0] for t in plan], sort_key="player_id", resume=not args.restart)
+    todo = [t for t in plan if not cp.done(t[0])]
+    if len(todo) < len(plan):
+        print(f"♻️  Tiếp tục từ checkpoint: {len(plan) - len(todo)}/{len(plan)} trang đã commit")
+    Pipeline(_fetch_stage, _parse_stage, lambda task, players: cp.commit(task[0], players),
+             fetchers=args.fetchers, parsers=args.parsers, queue_size=args.queue_size).run(todo)
 
-    df = pd.DataFrame(all_players)
-    players_df = df.drop_duplicates(subset=["player_id"])[["player_id", "name", "nation", "position"]]
-    rel_df = df[["player_id", "club_id", "season", "position"]].drop_duplicates()
+    CACHE.report()
+    HTTP_STATS.report()
+
+    # chỉ các cặp (CLB, mùa) có bảng thay đổi thật sự mới phải vá output
+    changed_pairs = []
+    for task in plan:
+        digest = cp.digest(task[0])
+        if not manifest.same_table("players", task[0], digest):
+            changed_pairs.extend((task[3], s) for s in task[4])
+        manifest.record("players", task[0], digest)
+    keep = set(changed_pairs) if args.incremental else None
+    if not args.incremental and not any(e["rows"] for e in cp.committed.values()):
+        print("❗ Không có cầu thủ nào được crawl.")
+        return
 
-    players_df.to_csv(os.path.join(NODE_DIR, "players.csv"), index=False, encoding="utf-8-sig")
-    rel_df.to_csv(os.path.join(REL_DIR, "played_for.csv"), index=False, encoding="utf-8-sig")
+    players_path = os.path.join(NODE_DIR, "players.csv")
+    rel_path = os.path.join(REL_DIR, "played_for.csv")
+    if args.incremental:
+        # incremental: phần thay đổi nhỏ → gom lại rồi vá như cũ
+        # so cả với cầu thủ đã có trong players.csv (các CLB không crawl lại)
+        existing = pd.read_csv(players_path) if os.path.exists(players_path) else None
+        players, rels = [], []
+        merge_outputs(cp, players.append, rels.append, keep=keep, existing=existing)
+        rel_df = patch_csv(rel_path, pd.DataFrame(rels, columns=REL_COLS), ["club_id", "season"], changed_pairs)
+        upsert_csv(players_path, pd.DataFrame(players, columns=PLAYER_NODE_COLS), "player_id",
+                   keep_ids=rel_df["player_id"])
+        print(f"🩹 Vá {len(changed_pairs)} cặp (CLB, mùa) trong played_for.csv / players.csv")
+    else:
+        with AtomicCSV(players_path, PLAYER_NODE_COLS) as pw, AtomicCSV(rel_path, REL_COLS) as rw:
+            merge_outputs(cp, pw.write, rw.write)
+        print(f"✅ players.csv → {pw.rows} cầu thủ, played_for.csv → {rw.rows} dòng")
+    manifest.save()
+    cp.clear()
 
 if __name__ == "__main__":
-    main()
+    main_entry("players", main)
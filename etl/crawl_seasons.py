@@ -1,52 +1,63 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import os, re, time, requests, pandas as pd
-from bs4 import BeautifulSoup
+import os, re, time, argparse, pandas as pd
+from page_cache import CACHE
+from http_client import STATS as HTTP_STATS
+from fetch_engine import ENGINE, get_page
+from html_tables import parse_html
+from revisions import Manifest, table_hash, patch_csv
+from mediawiki_api import api_mode, use_api, page_url, display_title, prefetch_display_titles
+from fetch_plan import parse_seasons, season_title
+from metrics import timed, main_entry
 
 # =========================
 # Cấu hình
 # =========================
-DATA_DIR = "../data/node"
+DATA_DIR = "../data/nodes"
 OUTPUT_CSV = os.path.join(DATA_DIR, "seasons.csv")
 os.makedirs(DATA_DIR, exist_ok=True)
 
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 
-# Danh sách 5 mùa gần nhất (hoặc có thể mở rộng)
-SEASONS = [
-    "2024–25",
-    "2023–24",
-    "2022–23",
-    "2021–22",
-    "2020–21",
-]
-
-BASE_URL = "https://en.wikipedia.org/wiki/{}"
+# Mặc định 5 mùa gần nhất; --seasons / EPL_SEASONS mở rộng tới mọi mùa từ 1992–93 (xem fetch_plan.py)
+SEASONS = parse_seasons()
 
 def now(): return time.strftime("[%H:%M:%S]")
 
 # =========================
 # Crawl thông tin mùa giải
 # =========================
+@timed("fetch", rows=None)
 def get_season_info(season_str):
     """Lấy thông tin 1 mùa EPL từ Wikipedia"""
-    url = BASE_URL.format(f"{season_str}_Premier_League")
+    url = page_url(season_title(season_str))
     print(f"\n🟦─── {season_str} ────────────────────────────────────────────────")
     print(f"{now()} 🌐 URL: {url}")
 
-    try:
-        res = requests.get(url, headers=HEADERS, timeout=20)
-        res.raise_for_status()
-    except Exception as e:
-        print(f"{now()} ⚠️ Không tải được {season_str}: {e}")
-        return None
-
-    soup = BeautifulSoup(res.text, "html.parser")
-
-    # Lấy tiêu đề
-    title_tag = soup.find("h1")
-    title = title_tag.text.strip() if title_tag else f"{season_str} Premier League"
+    if api_mode():
+        # chỉ cần tiêu đề → lấy displaytitle qua query (đã gom lô ở main), không tải trang
+        try:
+            title = display_title(season_title(season_str))
+        except Exception as e:
+            print(f"{now()} ⚠️ Không tải được {season_str}: {e}")
+            return None
+        if title is None:
+            print(f"{now()} ⚠️ Không có trang {season_str}")
+            return None
+    else:
+        try:
+            res = get_page(url, headers=HEADERS, timeout=20)
+            res.raise_for_status()
+        except Exception as e:
+            print(f"{now()} ⚠️ Không tải được {season_str}: {e}")
+            return None
+
+        root = parse_html(res.content)
+
+        # Lấy tiêu đề
+        title_tag = root.find(".//h1")
+        title = title_tag.text_content().strip() if title_tag is not None else season_title(season_str)
 
     # Tách năm
     years = re.findall(r"(\d{4})", season_str)
@@ -72,24 +83,51 @@ def get_season_info(season_str):
 # =========================
 # Main
 # =========================
-def main():
-    print(f"\n📘 Crawl thông tin {len(SEASONS)} mùa EPL gần nhất...\n")
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Crawl thông tin mùa giải EPL")
+    ap.add_argument("--incremental", action="store_true",
+                    help="chỉ crawl lại các trang mùa giải có revision mới, vá seasons.csv tại chỗ")
+    ap.add_argument("--api", action="store_true", help="lấy tiêu đề qua MediaWiki API (1 request cho mọi mùa)")
+    ap.add_argument("--seasons", default=None, help='khoảng mùa: "last5" (mặc định), "all", "2010-2024", "2019–20,2020–21"')
+    args = ap.parse_args(argv)
+    use_api(args.api)
+
+    seasons = parse_seasons(args.seasons) if args.seasons else SEASONS
+    print(f"\n📘 Crawl thông tin {len(seasons)} mùa EPL ({seasons[-1]} → {seasons[0]})...\n")
     all_seasons = []
 
-    for s in SEASONS:
-        info = get_season_info(s)
+    manifest = Manifest()
+    urls = {s: page_url(season_title(s)) for s in seasons}
+    if args.incremental:
+        changed = set(manifest.changed("seasons", list(urls.values())))
+        seasons = [s for s in seasons if urls[s] in changed]
+        for u in changed:
+            CACHE.expire(u)
+        print(f"🔁 Incremental: {len(seasons)}/{len(urls)} trang mùa giải có revision mới")
+    else:
+        manifest.check(list(urls.values()), strict=False)
+
+    if api_mode():
+        prefetch_display_titles([season_title(s) for s in seasons])
+    for s, info in zip(seasons, ENGINE.run(get_season_info, seasons)):
+        manifest.record("seasons", urls[s], table_hash([info]) if info else None)
         if info:
             all_seasons.append(info)
-        time.sleep(1)
 
+    CACHE.report()
+    HTTP_STATS.report()
+    manifest.save()
     if not all_seasons:
         print("❗ Không có dữ liệu mùa nào được crawl.")
         return
 
     df = pd.DataFrame(all_seasons)
-    df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig")
+    if args.incremental:
+        df = patch_csv(OUTPUT_CSV, df, "season_id", df["season_id"])
+    else:
+        df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8-sig")
 
     print(f"\n✅ seasons.csv → {len(df)} mùa được xuất thành công!\n")
 
 if __name__ == "__main__":
-    main()
+    main_entry("seasons", main)
@@ -0,0 +1,418 @@
+import os, re, csv, time, argparse
+from collections import defaultdict, Counter
+from itertools import combinations
+from bisect import bisect_right
+import unidecode
+from metrics import timed, main_entry
+
+# =============================
+# Hợp nhất thực thể (cầu thủ / HLV) giữa crawler và build_relations
+#   ID sinh từ tên → biến thể chính tả ("Son Heung-min" / "Heung-min Son", lỗi gõ, viết tắt "B. Saka",
+#   tên đệm) thành nhiều node, còn dòng rác ("Unknown †", "Vacant") thành node giả.
+#   1. lọc rác    : tên rỗng / chỉ gồm từ rác → bỏ node + quan hệ
+#   2. blocking   : mỗi bản ghi sinh vài khoá chặn, chỉ so các cặp chung khoá (gần tuyến tính, không O(n²)):
+#                     ph   : soundex(họ) + chữ cái đầu tên
+#                     g    : từng cặp trong GRAM_KEYS trigram hiếm nhất của tên (chỉ mục đảo n-gram; bỏ trigram
+#                            chỉ 1 bản ghi có)
+#                     nat  : quốc tịch + vị trí + chữ cái đầu (cầu thủ)
+#                     club : CLB từng thi đấu / dẫn dắt + chữ cái đầu tên + 2 chữ đầu của họ
+#                   khối lớn hơn MAX_BLOCK bị bỏ (quá chung chung, không phân biệt được gì)
+#   3. chấm điểm  : Jaro-Winkler trên tên chuẩn hoá (+ đảo thứ tự từ, viết tắt, tên đệm) và bằng chứng phụ
+#                   (cùng quốc tịch / cùng CLB); khác quốc tịch → không bao giờ gộp
+#   4. gộp        : union-find theo điểm giảm dần, không nối 2 cụm khác quốc tịch; ID chuẩn = bản ghi có
+#                   nhiều lần ra sân / dẫn dắt nhất
+# Ghi ra ../data/resolved/ (dữ liệu crawler giữ nguyên để crawl tăng dần vẫn vá đúng chỗ):
+#   nodes/{players,coaches}.csv, relations/{played_for,coached}.csv  — đã đổi sang ID chuẩn
+#   aliases.csv  label, alias_id, alias_name, canonical_id, canonical_name, score, reason (match | junk)
+# build_relations / load_neo4j / columnar_store đọc bản resolved qua prefer_resolved() nếu nó mới hơn bản gốc.
+# =============================
+BASE_DIR = "../data"
+NODE_DIR = os.path.join(BASE_DIR, "nodes")
+REL_DIR = os.path.join(BASE_DIR, "relations")
+RESOLVED_DIR = os.path.join(BASE_DIR, "resolved")
+USE_RESOLVED = os.environ.get("EPL_USE_RESOLVED", "1") != "0"
+THRESHOLD = float(os.environ.get("EPL_ER_THRESHOLD", 0.93))
+MAX_BLOCK = int(os.environ.get("EPL_ER_MAX_BLOCK", 100))
+GRAM_KEYS = int(os.environ.get("EPL_ER_GRAM_KEYS", 4))
+CSV_ENCODING = "utf-8-sig"
+
+# nhãn → (file node, cột ID, file quan hệ, thuộc tính dùng làm bằng chứng)
+ENTITIES = {
+    "Player": ("players.csv", "player_id", "played_for.csv", ("nation", "position")),
+    "Coach": ("coaches.csv", "coach_id", "coached.csv", ()),
+}
+
+# ---------- chuẩn hoá tên ----------
+_NOTE = re.compile(r"[†‡*^]|\[[^\]]*\]|\([^)]*\)")      # chú thích Wikipedia: † (đã mất), [1], (caretaker)
+_APOS = re.compile(r"['’`]")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+JUNK_WORDS = {"unknown", "vacant", "tba", "tbc", "tbd", "none", "n", "a", "na", "caretaker", "interim",
+              "manager", "managers", "coach", "head", "assistant", "player", "various", "see", "below", "list",
+              "of", "under", "team", "first", "reserve", "reserves", "youth", "academy", "staff"}
+SUFFIXES = {"sr", "snr", "jr", "jnr", "ii", "iii"}
+
+def normalize(name):
+    """"Martin Ødegaard †" → "martin odegaard"; "Smith-Rowe" → "smith rowe"; "O'Brien" → "obrien"."""
+    if not isinstance(name, str):
+        return ""
+    s = unidecode.unidecode(_NOTE.sub(" ", name)).lower()
+    return _NON_ALNUM.sub(" ", _APOS.sub("", s)).strip()
+
+def is_junk(norm):
+    tokens = norm.split()
+    # tên người không chứa chữ số: "Under-21s Head Coach" là chức danh, không phải người
+    return not tokens or all(t in JUNK_WORDS for t in tokens) or any(c.isdigit() for c in norm)
+
+_SOUNDEX = str.maketrans("bfpvcgjkqsxzdtlmnr", "111122222222334556")
+
+def soundex(word):
+    """Soundex kinh điển (R163 ...): khoá phát âm, chịu được lỗi gõ nguyên âm / phụ âm cùng nhóm."""
+    if not word:
+        return ""
+    codes = word.translate(_SOUNDEX)
+    out, last = [word[0]], codes[0]
+    for ch, c in zip(word[1:], codes[1:]):
+        if c.isdigit() and c != last:
+            out.append(c)
+        if ch not in "hw":          # h/w không ngắt 2 phụ âm cùng mã; nguyên âm thì có
+            last = c
+    return ("".join(out) + "000")[:4]
+
+def trigrams(norm):
+    """Trigram theo từng từ (đệm khoảng trắng) → không phụ thuộc thứ tự từ."""
+    grams = set()
+    for t in norm.split():
+        t = f" {t} "
+        grams.update(t[i:i + 3] for i in range(len(t) - 2))
+    return grams
+
+# ---------- độ giống tên ----------
+def jaro(s, t):
+    if s == t:
+        return 1.0
+    ls, lt = len(s), len(t)
+    if not ls or not lt:
+        return 0.0
+    window = max(0, max(ls, lt) // 2 - 1)
+    used = [False] * lt
+    s_m = []
+    for i, c in enumerate(s):
+        for j in range(max(0, i - window), min(lt, i + window + 1)):
+            if not used[j] and t[j] == c:
+                used[j] = True
+                s_m.append(c)
+                break
+    m = len(s_m)
+    if not m:
+        return 0.0
+    t_m = [t[j] for j in range(lt) if used[j]]
+    half_trans = sum(a != b for a, b in zip(s_m, t_m)) / 2
+    return (m / ls + m / lt + (m - half_trans) / m) / 3
+
+def jaro_winkler(s, t, p=0.1):
+    j = jaro(s, t)
+    prefix = 0
+    for a, b in zip(s[:4], t[:4]):
+        if a != b:
+            break
+        prefix += 1
+    return j + prefix * p * (1 - j)
+
+def name_similarity(a, b):
+    """a, b: tên đã chuẩn hoá. JW cả tên, kéo xuống theo từ kém giống nhất (tên / họ) để "Aaron Ramsey" không
+    ăn theo phần chung với "Aaron Ramsdale"; thêm luật đảo thứ tự từ, viết tắt và tên đệm."""
+    if a == b:
+        return 1.0
+    ta, tb = a.split(), b.split()
+    sa, sb = {t for t in ta if t in SUFFIXES}, {t for t in tb if t in SUFFIXES}
+    if sa != sb:                                         # "Bill Dodgin Sr." ≠ "Bill Dodgin Jr."
+        return 0.0
+    ta, tb = [t for t in ta if t not in sa] or ta, [t for t in tb if t not in sb] or tb
+    if sorted(ta) == sorted(tb):                         # "son heung min" ~ "heung min son"
+        return 0.99
+    s = jaro_winkler(" ".join(ta), " ".join(tb))
+    if len(ta) > 1 and len(tb) > 1:
+        s = (s + min(jaro_winkler(ta[0], tb[0]), jaro_winkler(ta[-1], tb[-1]))) / 2
+        if ta[-1] == tb[-1] and ta[0][0] == tb[0][0]:
+            if len(ta[0]) == 1 or len(tb[0]) == 1:      # "b saka" ~ "bukayo saka"
+                s = max(s, 0.95)
+            elif ta[0] == tb[0] and (set(ta) <= set(tb) or set(tb) <= set(ta)):
+                s = max(s, 0.96)                         # thêm / bớt tên đệm
+    return s
+
+# ---------- bản ghi ----------
+class Record:
+    __slots__ = ("id", "name", "norm", "attrs", "clubs", "n", "row")
+
+    def __init__(self, id, name, attrs, row):
+        self.id, self.name, self.row = id, name, row
+        self.norm = normalize(name)
+        self.attrs = attrs
+        self.clubs = set()
+        self.n = 0              # số dòng quan hệ (lần ra sân / dẫn dắt theo mùa)
+
+def make_records(label, node_rows, rel_rows=()):
+    """Dòng node (dict) + dòng quan hệ (dict) → [Record]; ID trùng trong file node chỉ giữ dòng đầu."""
+    _, id_col, _, attr_cols = ENTITIES[label]
+    records, by_id = [], {}
+    for row in node_rows:
+        rid = row.get(id_col)
+        if not rid or rid in by_id:
+            continue
+        rec = Record(rid, row.get("name", ""), {c: (row.get(c) or "").strip() for c in attr_cols}, row)
+        by_id[rid] = rec
+        records.append(rec)
+    for row in rel_rows:
+        rec = by_id.get(row.get(id_col))
+        if rec is not None:
+            rec.n += 1
+            if row.get("club_id"):
+                rec.clubs.add(row["club_id"])
+    return records
+
+def _read_csv(path):
+    with open(path, encoding=CSV_ENCODING, newline="") as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+def load_records(label, node_dir=NODE_DIR, rel_dir=REL_DIR):
+    node_file, _, rel_file, _ = ENTITIES[label]
+    header, nodes = _read_csv(os.path.join(node_dir, node_file))
+    rel_path = os.path.join(rel_dir, rel_file)
+    rel_header, rels = _read_csv(rel_path) if os.path.exists(rel_path) else ([], [])
+    return make_records(label, nodes, rels), (header, nodes), (rel_header, rels)
+
+# ---------- blocking ----------
+def block_keys(rec, gram_df, grams=None):
+    tokens = rec.norm.split()
+    first, last = tokens[0], tokens[-1]
+    keys = [("ph", soundex(last), first[0] if len(tokens) > 1 else "")]
+    # 1 trigram hiếm vẫn có thể chung cho hàng trăm tên → khoá là từng cặp trong GRAM_KEYS trigram hiếm nhất
+    rare = sorted((g for g in (grams or trigrams(rec.norm)) if gram_df[g] > 1), key=lambda g: (gram_df[g], g))[:GRAM_KEYS]
+    keys += [("g",) + pair for pair in combinations(sorted(rare), 2)]
+    nation, position = rec.attrs.get("nation"), rec.attrs.get("position")
+    if nation:
+        keys.append(("nat", nation, position or "", first[0] + last[0]))
+    keys += [("club", c, first[0], last[:2]) for c in rec.clubs]
+    return keys
+
+def candidate_pairs(records, max_block=MAX_BLOCK, stats=None):
+    """Sinh lần lượt các cặp (i, j), i < j, chung ít nhất 1 khoá chặn — mỗi cặp đúng 1 lần, theo từng bản ghi
+    (không giữ tập mọi cặp trong bộ nhớ). `stats` (dict) nhận số khối / cặp."""
+    grams = [trigrams(r.norm) for r in records]
+    gram_df = Counter(g for gs in grams for g in gs)
+    keys_of = [block_keys(r, gram_df, gs) for r, gs in zip(records, grams)]
+    del grams
+    blocks = defaultdict(list)
+    for i, keys in enumerate(keys_of):
+        for k in keys:
+            blocks[k].append(i)                    # tăng dần theo i
+    usable = {k: m for k, m in blocks.items() if 2 <= len(m) <= max_block}
+    n, pairs = len(records), 0
+    for i, keys in enumerate(keys_of):
+        near = set()
+        for k in keys:
+            m = usable.get(k)
+            if m is not None:
+                near.update(m[bisect_right(m, i):])
+        pairs += len(near)
+        for j in sorted(near):
+            yield i, j
+    if stats is not None:
+        stats.update({"blocks": len(blocks), "skipped_blocks": sum(len(m) > max_block for m in blocks.values()),
+                      "pairs": pairs, "naive_pairs": n * (n - 1) // 2})
+
+# ---------- chấm điểm + gộp ----------
+def score_pair(a, b):
+    """Điểm ∈ [0, 1] = độ giống tên, với điều kiện có bằng chứng độc lập (cùng quốc tịch / cùng CLB) nếu tên
+    chuẩn hoá không trùng hẳn; 0 nếu mâu thuẫn (khác quốc tịch)."""
+    na, nb = a.attrs.get("nation"), b.attrs.get("nation")
+    if na and nb and na != nb:
+        return 0.0
+    s = name_similarity(a.norm, b.norm)
+    if s < THRESHOLD or a.norm == b.norm:
+        return s
+    if not (na and na == nb) and not (a.clubs & b.clubs):
+        return min(s, THRESHOLD - 0.01)
+    return s
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:               # nén đường đi
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[rj] = ri
+        return ri
+
+def _canonical(members):
+    # nhiều lần xuất hiện nhất → tên đầy đủ nhất → ID nhỏ nhất (tất định)
+    return min(members, key=lambda r: (-r.n, -len(r.norm.split()), r.id))
+
+@timed("build", name="er.resolve")
+def resolve(records, threshold=THRESHOLD, max_block=MAX_BLOCK):
+    """Trả về (mapping id → id chuẩn | None nếu rác, danh sách alias, thống kê)."""
+    t0 = time.perf_counter()
+    junk = [r for r in records if is_junk(r.norm)]
+    live = [r for r in records if not is_junk(r.norm)]
+    stats = {}
+    scored = []
+    for i, j in candidate_pairs(live, max_block, stats):
+        s = score_pair(live[i], live[j])
+        if s >= threshold:
+            scored.append((s, i, j))
+    scored.sort(key=lambda x: (-x[0], x[1], x[2]))
+    t_score = time.perf_counter()
+
+    uf = UnionFind(len(live))
+    nations = {i: {r.attrs["nation"]} if r.attrs.get("nation") else set() for i, r in enumerate(live)}
+    best = {}
+    rejected = 0
+    for s, i, j in scored:
+        ri, rj = uf.find(i), uf.find(j)
+        if ri == rj:
+            continue
+        if len(nations[ri] | nations[rj]) > 1:      # nối 2 cụm khác quốc tịch qua bản ghi trung gian
+            rejected += 1
+            continue
+        root = uf.union(ri, rj)
+        nations[root] = nations.pop(ri) | nations.pop(rj)
+        for k in (i, j):
+            best[live[k].id] = max(best.get(live[k].id, 0.0), s)
+
+    clusters = defaultdict(list)
+    for i, r in enumerate(live):
+        clusters[uf.find(i)].append(r)
+    mapping, aliases = {}, []
+    for members in clusters.values():
+        canon = _canonical(members)
+        for r in members:
+            mapping[r.id] = canon.id
+            if r is not canon:
+                aliases.append({"alias_id": r.id, "alias_name": r.name, "canonical_id": canon.id,
+                                "canonical_name": canon.name, "score": f"{best.get(r.id, 0.0):.3f}",
+                                "reason": "match"})
+    for r in junk:
+        mapping[r.id] = None
+        aliases.append({"alias_id": r.id, "alias_name": r.name, "canonical_id": "", "canonical_name": "",
+                        "score": "", "reason": "junk"})
+
+    secs = time.perf_counter() - t0
+    stats.update({"records": len(records), "junk": len(junk), "matches": len(scored), "rejected": rejected,
+                  "entities": len(clusters), "merged": len(live) - len(clusters),
+                  "match_s": t_score - t0, "seconds": secs,
+                  "records_per_s": len(records) / secs if secs else 0.0})
+    return mapping, aliases, stats
+
+# ---------- ghi ----------
+def canonical_nodes(records, mapping):
+    """Dòng node chuẩn: dòng của bản ghi chuẩn, ô trống lấy từ các alias (vd. quốc tịch)."""
+    by_id = {r.id: r for r in records}
+    rows = {}
+    for r in records:
+        cid = mapping.get(r.id)
+        if cid is None:
+            continue
+        if cid not in rows:
+            rows[cid] = dict(by_id[cid].row)
+        row = rows[cid]
+        for k, v in r.row.items():
+            if v and not row.get(k):
+                row[k] = v
+    return list(rows.values())
+
+def remap_relations(rows, id_col, mapping):
+    """Đổi ID sang ID chuẩn, bỏ dòng trỏ tới rác và dòng trùng sau khi gộp."""
+    out, seen = [], set()
+    for row in rows:
+        rid = row.get(id_col)
+        cid = mapping.get(rid, rid)
+        if cid is None:
+            continue
+        row = {**row, id_col: cid}
+        key = tuple(row.values())
+        if key not in seen:
+            seen.add(key)
+            out.append(row)
+    return out
+
+def _write_csv(path, header, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding=CSV_ENCODING, newline="") as f:
+        w = csv.DictWriter(f, fieldnames=header, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+    os.replace(tmp, path)
+
+def prefer_resolved(path):
+    """<base>/nodes|relations/x.csv → <base>/resolved/nodes|relations/x.csv nếu có và không cũ hơn bản gốc."""
+    if not USE_RESOLVED:
+        return path
+    kind_dir, fname = os.path.split(path)
+    base, kind = os.path.split(kind_dir)
+    alt = os.path.join(base, "resolved", kind, fname)
+    if not os.path.exists(alt):
+        return path
+    if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(alt):
+        print(f"⚠️  {alt} cũ hơn {path} → dùng bản gốc (chạy lại entity_resolution.py)")
+        return path
+    return alt
+
+def run(labels=tuple(ENTITIES), threshold=THRESHOLD, max_block=MAX_BLOCK, node_dir=NODE_DIR, rel_dir=REL_DIR,
+        out_dir=RESOLVED_DIR, dry_run=False):
+    all_aliases = []
+    for label in labels:
+        node_file, id_col, rel_file, _ = ENTITIES[label]
+        if not os.path.exists(os.path.join(node_dir, node_file)):
+            print(f"⚠️  Thiếu {node_file} → bỏ qua {label}")
+            continue
+        records, (header, _), (rel_header, rels) = load_records(label, node_dir, rel_dir)
+        mapping, aliases, st = resolve(records, threshold, max_block)
+        print(f"🧩 {label}: {st['records']} bản ghi → {st['entities']} thực thể "
+              f"({st['merged']} gộp, {st['junk']} rác, {st['rejected']} cặp bị chặn vì khác quốc tịch)")
+        print(f"   blocking: {st['blocks']} khối ({st['skipped_blocks']} khối quá lớn bị bỏ), "
+              f"{st['pairs']} cặp ứng viên thay vì {st['naive_pairs']} — "
+              f"{st['seconds']:.2f}s ({st['records_per_s']:.0f} bản ghi/s)")
+        for a in aliases[:10]:
+            arrow = f"→ {a['canonical_id']} ({a['score']})" if a["reason"] == "match" else "→ (rác, bỏ)"
+            print(f"   {a['alias_id']} [{a['alias_name']}] {arrow}")
+        if len(aliases) > 10:
+            print(f"   … và {len(aliases) - 10} alias khác")
+        all_aliases += [{"label": label, **a} for a in aliases]
+        if dry_run:
+            continue
+        _write_csv(os.path.join(out_dir, "nodes", node_file), header, canonical_nodes(records, mapping))
+        if rel_header:
+            _write_csv(os.path.join(out_dir, "relations", rel_file), rel_header,
+                       remap_relations(rels, id_col, mapping))
+    if not dry_run:
+        _write_csv(os.path.join(out_dir, "aliases.csv"),
+                   ["label", "alias_id", "alias_name", "canonical_id", "canonical_name", "score", "reason"],
+                   all_aliases)
+        print(f"💾 Kết quả → {out_dir}/ (nodes, relations, aliases.csv)")
+    return all_aliases
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Hợp nhất thực thể cầu thủ / HLV (blocking + Jaro-Winkler + union-find)")
+    ap.add_argument("labels", nargs="*", help=f"một số trong {', '.join(ENTITIES)} (mặc định: tất cả)")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="điểm tối thiểu để gộp 2 bản ghi")
+    ap.add_argument("--max-block", type=int, default=MAX_BLOCK, help="bỏ khối chặn lớn hơn ngưỡng này")
+    ap.add_argument("--dry-run", action="store_true", help="chỉ in alias, không ghi ../data/resolved/")
+    args = ap.parse_args(argv)
+    unknown = [l for l in args.labels if l not in ENTITIES]
+    if unknown:
+        ap.error(f"không có nhãn: {', '.join(unknown)}")
+    run(args.labels or list(ENTITIES), args.threshold, args.max_block, dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    main_entry("resolve", main)
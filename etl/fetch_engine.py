@@ -0,0 +1,161 @@
+import os, time, asyncio, threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from page_cache import CACHE
+from archive import ARCHIVE
+
+# =============================
+# Cấu hình
+# =============================
+CONCURRENCY = int(os.environ.get("EPL_CONCURRENCY", 8))
+RATE_PER_HOST = float(os.environ.get("EPL_RATE", 2.0))      # request/giây cho mỗi host
+BURST_PER_HOST = int(os.environ.get("EPL_BURST", 4))
+
+_current = threading.local()
+
+class TokenBucket:
+    """Giới hạn tốc độ kiểu token bucket: `rate` token/giây, tối đa `burst` token."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                t = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (t - self.updated) * self.rate)
+                self.updated = t
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class FetchEngine:
+    """Engine tải trang bằng asyncio.
+
+    - Mỗi host có một TokenBucket riêng; trang còn hạn trong cache không tốn token.
+    - `concurrency` giới hạn số request mạng chạy song song.
+    - Single-flight: nhiều lời gọi cùng URL khi đang tải chỉ tạo ra 1 request.
+    - Hàm crawl (đồng bộ) chạy trong thread pool qua `run()`, và gọi `get_page()` như bình thường.
+    """
+
+    def __init__(self, concurrency=CONCURRENCY, rate=RATE_PER_HOST, burst=BURST_PER_HOST, cache=CACHE):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.cache = cache
+        self.loop = None
+        self.stats = {"requests": 0, "network": 0, "cache": 0, "coalesced": 0}
+        self._buckets = {}
+        self._inflight = {}
+        self._sem = None
+        self._pool = None
+        self._thread = None
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    async def _fetch(self, url, session, headers, timeout):
+        if ARCHIVE.replaying or await self.loop.run_in_executor(self._pool, self.cache.is_fresh, url):
+            self.stats["cache"] += 1
+        else:
+            async with self._sem:
+                await self._bucket(url).acquire()
+                self.stats["network"] += 1
+                return await self.loop.run_in_executor(
+                    self._pool, lambda: self.cache.get(url, session=session, headers=headers, timeout=timeout))
+        return await self.loop.run_in_executor(
+            self._pool, lambda: self.cache.get(url, session=session, headers=headers, timeout=timeout))
+
+    async def fetch(self, url, session=None, headers=None, timeout=20):
+        self.stats["requests"] += 1
+        task = self._inflight.get(url)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(url, session, headers, timeout))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    def fetch_threadsafe(self, url, session=None, headers=None, timeout=20):
+        """Gọi từ thread worker: đẩy việc tải sang event loop và chờ kết quả."""
+        fut = asyncio.run_coroutine_threadsafe(self.fetch(url, session, headers, timeout), self.loop)
+        return fut.result()
+
+    def _call(self, func, args):
+        _current.engine = self
+        try:
+            return func(*args)
+        finally:
+            _current.engine = None
+
+    def _setup(self, loop):
+        self.loop = loop
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._buckets, self._inflight = {}, {}   # primitive asyncio gắn với loop hiện tại
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency + 2, thread_name_prefix="fetch")
+
+    def start(self):
+        """Chạy event loop ở thread nền, để thread bất kỳ (sau `bind()`) tải qua engine."""
+        loop = asyncio.new_event_loop()
+        self._setup(loop)
+        self._thread = threading.Thread(target=loop.run_forever, name="fetch-engine", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+        self.loop.close()
+        self._pool.shutdown(wait=False)
+
+    def bind(self):
+        """Gắn engine cho thread hiện tại: get_page() trong thread này sẽ đi qua engine."""
+        _current.engine = self
+
+    async def _run(self, func, jobs):
+        self._setup(asyncio.get_running_loop())
+        # thread cho job + thread cho I/O cache/mạng, tránh job chiếm hết pool rồi chờ nhau
+        job_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawl")
+        try:
+            return await asyncio.gather(*[self.loop.run_in_executor(job_pool, self._call, func, args)
+                                          for args in jobs])
+        finally:
+            job_pool.shutdown(wait=False)
+            self._pool.shutdown(wait=False)
+
+    def run(self, func, jobs):
+        """Chạy func(*args) cho mọi args trong jobs; trả về list kết quả theo đúng thứ tự."""
+        jobs = [tuple(j) if isinstance(j, (list, tuple)) else (j,) for j in jobs]
+        t0 = time.time()
+        results = asyncio.run(self._run(func, jobs))
+        self.report(time.time() - t0)
+        return results
+
+    def report(self, elapsed=None):
+        s = self.stats
+        took = f" trong {elapsed:.1f}s" if elapsed is not None else ""
+        print(f"🚦 Engine: {s['requests']} lượt tải{took} — {s['network']} qua mạng, {s['cache']} từ cache, "
+              f"{s['coalesced']} gộp (single-flight); concurrency={self.concurrency}, rate={self.rate}/s/host")
+
+def get_page(url, session=None, headers=None, timeout=20):
+    """Điểm tải trang chung của các crawler: qua engine nếu đang chạy trong engine, ngược lại đọc thẳng cache."""
+    engine = getattr(_current, "engine", None)
+    if engine is not None:
+        return engine.fetch_threadsafe(url, session=session, headers=headers, timeout=timeout)
+    return CACHE.get(url, session=session, headers=headers, timeout=timeout)
+
+ENGINE = FetchEngine()
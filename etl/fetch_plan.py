@@ -0,0 +1,140 @@
+import os, re
+from collections import Counter
+import pandas as pd
+from mediawiki_api import query_pages, revision_at, club_title, prefetch_club_titles, page_url
+from fetch_engine import ENGINE
+
+# =============================
+# Kế hoạch tải đội hình theo mùa
+#   - khoảng mùa cấu hình được (EPL_SEASONS / --seasons):
+#       "last5" (mặc định, như trước), "all" (từ 1992–93), "2010-2024", "2019–20,2020–21"
+#   - mỗi cặp (CLB, mùa) CLB thật sự đá EPL (relations/clubs_by_season.csv) → đúng 1 trang:
+#       season  : bài "<mùa> <CLB> season" nếu tồn tại
+#       pinned  : không có bài mùa → trang CLB ghim revision cuối mùa (oldid); 1 request API mỗi cặp,
+#                 chạy song song qua ENGINE (rate limit theo host như lúc tải trang)
+#       current : mùa mới nhất → trang CLB hiện tại
+#   - gộp trùng theo URL: nhiều mùa cùng 1 revision (trang CLB không sửa giữa 2 mùa) → tải 1 lần
+# Chi phí tăng theo số trang khác nhau thật sự, không theo CLB × mùa.
+# =============================
+FIRST_SEASON = 1992
+LATEST_SEASON = int(os.environ.get("EPL_LATEST_SEASON", 2024))
+SEASONS_SPEC = os.environ.get("EPL_SEASONS", "last5")
+INDEX_URL = "https://en.wikipedia.org/w/index.php"
+SEASON_END = "{year}-06-01T00:00:00Z"          # bản sửa cuối cùng trước 1/6 của năm kết thúc mùa
+CLUBS_BY_SEASON = os.path.join("..", "data", "relations", "clubs_by_season.csv")
+
+# ---------- mùa giải ----------
+def season_name(start):
+    return f"{start}–{(start + 1) % 100:02d}"
+
+def season_start(season):
+    m = re.match(r"(\d{4})", str(season))
+    return int(m.group(1)) if m else -1
+
+def season_title(season):
+    """Tên bài mùa giải: trước 2007–08 giải còn tên "FA Premier League"."""
+    return f"{season} {'FA ' if season_start(season) < 2007 else ''}Premier League"
+
+def season_range(first=FIRST_SEASON, last=LATEST_SEASON):
+    """Các mùa từ `first` tới `last`, mới nhất trước (cùng thứ tự với danh sách SEASONS cũ)."""
+    return [season_name(y) for y in range(last, first - 1, -1)]
+
+def parse_seasons(spec=None):
+    spec = (spec or SEASONS_SPEC).strip().lower()
+    seasons = _parse_seasons(spec)
+    if not seasons:
+        raise ValueError(f"Khoảng mùa rỗng: {spec!r} (hỗ trợ {season_name(FIRST_SEASON)} → "
+                         f"{season_name(LATEST_SEASON)})")
+    return seasons
+
+def _parse_seasons(spec):
+    if spec == "all":
+        return season_range()
+    m = re.fullmatch(r"last(\d+)", spec)
+    if m:
+        return season_range(max(FIRST_SEASON, LATEST_SEASON - int(m.group(1)) + 1))
+    m = re.fullmatch(r"(\d{4})\s*[-:]\s*(\d{4})", spec)
+    if m:
+        a, b = sorted(int(x) for x in m.groups())
+        return season_range(max(a, FIRST_SEASON), min(b, LATEST_SEASON))
+    starts = set()
+    for part in spec.split(","):
+        y = season_start(part.strip())
+        if not FIRST_SEASON <= y <= LATEST_SEASON:
+            raise ValueError(f"Mùa không hợp lệ: {part!r} (hỗ trợ {season_name(FIRST_SEASON)} → "
+                             f"{season_name(LATEST_SEASON)})")
+        starts.add(y)
+    return [season_name(y) for y in sorted(starts, reverse=True)]
+
+# ---------- kế hoạch ----------
+def participants(clubs_df, seasons, path=CLUBS_BY_SEASON):
+    """[(club_name, club_id, season)] — chỉ các mùa CLB có mặt ở EPL; thiếu file → mọi CLB × mọi mùa."""
+    names = dict(zip(clubs_df["club_id"], clubs_df["Club"]))
+    if os.path.exists(path):
+        cbs = pd.read_csv(path, dtype=str)
+        cbs = cbs[cbs["club_id"].isin(names) & cbs["Season"].isin(seasons)].drop_duplicates(["club_id", "Season"])
+        missing = [s for s in seasons if s not in set(cbs["Season"])]
+        if missing:
+            print(f"⚠️  {len(missing)} mùa chưa có trong clubs_by_season.csv ({missing[-1]} → {missing[0]}) "
+                  f"→ chạy crawl_clubs.py --seasons … trước")
+        order = {s: i for i, s in enumerate(seasons)}
+        cbs = cbs.assign(_o=cbs["Season"].map(order)).sort_values(["club_id", "_o"])
+        return [(names[c], c, s) for c, s in zip(cbs["club_id"], cbs["Season"])]
+    return [(names[c], c, s) for c in names for s in seasons]
+
+def pinned_url(title, oldid):
+    return f"{INDEX_URL}?title={title.replace(' ', '_')}&oldid={oldid}"
+
+def build_plan(clubs_df, seasons, pin=True, verbose=True):
+    """Danh sách task (url, kind, club_name, club_id, seasons, title, oldid), mỗi URL đúng 1 task."""
+    pairs = participants(clubs_df, seasons)
+    prefetch_club_titles(sorted({name for name, _, _ in pairs}))
+    latest = season_name(LATEST_SEASON)
+
+    old = [p for p in pairs if p[2] != latest]
+    article = {p: f"{p[2]} {club_title(p[0])} season" for p in old}
+    info = query_pages(list(article.values())) if article else {}
+
+    # mùa cũ không có bài mùa giải → revision cuối mùa của trang CLB (mỗi cặp 1 request, chạy song song)
+    unpinned = [p for p in old if info[article[p]]["missing"]] if pin else []
+    if unpinned and verbose:
+        print(f"📌 {len(unpinned)} cặp (CLB, mùa) không có bài mùa giải → tìm revision cuối mùa "
+              f"({len(unpinned)} request API)...")
+    jobs = [(club_title(name), SEASON_END.format(year=season_start(season) + 1)) for name, _, season in unpinned]
+    pins = dict(zip(unpinned, ENGINE.run(revision_at, jobs))) if jobs else {}
+
+    tasks, skipped = {}, []
+    def add(url, kind, pair, title, oldid=None):
+        name, club_id, season = pair
+        t = tasks.setdefault(url, [url, kind, name, club_id, [], title, oldid])
+        t[4].append(season)
+
+    for pair in pairs:
+        name, _, season = pair
+        title = club_title(name)
+        if season == latest:
+            add(page_url(title), "current", pair, title)
+            continue
+        page = info[article[pair]]
+        if not page["missing"]:
+            add(page_url(page["title"]), "season", pair, page["title"])
+            continue
+        oldid = pins.get(pair)
+        if oldid:
+            add(pinned_url(title, oldid), "pinned", pair, title, oldid)
+        else:
+            skipped.append(pair)
+
+    plan = [(url, kind, name, club_id, tuple(ss), title, oldid)
+            for url, kind, name, club_id, ss, title, oldid in tasks.values()]
+    if verbose:
+        report(plan, pairs, clubs_df, seasons, skipped)
+    return plan
+
+def report(plan, pairs, clubs_df, seasons, skipped=()):
+    kinds = Counter(t[1] for t in plan)
+    naive = len(clubs_df) * len(seasons)
+    print(f"🗺️  Kế hoạch: {len(seasons)} mùa, {len(pairs)} cặp (CLB, mùa) → {len(plan)} trang cần tải "
+          f"({', '.join(f'{k} {v}' for k, v in sorted(kinds.items()))}) thay vì {naive} lượt CLB × mùa")
+    if skipped:
+        print(f"⚠️  {len(skipped)} cặp (CLB, mùa) không có bài mùa lẫn revision cũ → bỏ qua")
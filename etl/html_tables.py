@@ -0,0 +1,223 @@
+import re, sys, time
+from lxml import html as lxml_html
+from pandas.io.parsers import TextParser
+
+# =============================
+# Bóc bảng HTML bằng lxml (parse 1 lần, không qua BeautifulSoup → str() → read_html)
+# =============================
+_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")   # giống pandas.io.html._remove_whitespace
+_SKIP_TEXT = ("script", "style", "template")
+
+def parse_html(content):
+    """Parse bytes (hoặc str) thành cây lxml."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return lxml_html.document_fromstring(content, parser=_PARSER)
+
+def classes(el):
+    return (el.get("class") or "").split()
+
+def has_class(el, pattern):
+    """Giống class_=... của BeautifulSoup: so regex với từng class và với cả chuỗi class."""
+    if isinstance(pattern, str):
+        return pattern in classes(el)
+    full = el.get("class") or ""
+    return bool(full) and (any(pattern.search(c) for c in classes(el)) or bool(pattern.search(full)))
+
+def get_text(el, sep="", strip=False):
+    """Giống Tag.get_text(sep, strip) của BeautifulSoup (bỏ comment/script/style)."""
+    parts = []
+    def walk(node):
+        if node.text and node.tag not in _SKIP_TEXT and isinstance(node.tag, str):
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+    walk(el)
+    if strip:
+        parts = [p.strip() for p in parts if p.strip()]
+    return sep.join(parts)
+
+def single_string(el):
+    """Giống Tag.string: chỉ có giá trị khi thẻ có đúng 1 node con (đệ quy)."""
+    children = list(el)
+    if not children:
+        return el.text or None
+    if len(children) == 1 and not el.text and not children[0].tail and isinstance(children[0].tag, str):
+        return single_string(children[0])
+    return None
+
+def find_heading(root, tags=("h2", "h3"), string=None, id=None):
+    """Heading đầu tiên khớp regex theo nội dung (.string) hoặc theo id."""
+    for el in root.iter(*tags):
+        if string is not None:
+            s = single_string(el)
+            if s is not None and string.search(s):
+                return el
+        if id is not None and id.search(el.get("id") or ""):
+            return el
+    return None
+
+def find_next(el, tag, pred=None):
+    """Giống Tag.find_next(tag): phần tử đầu tiên sau `el` theo thứ tự tài liệu (kể cả con của el)."""
+    for cand in iter_next(el, tag):
+        if pred is None or pred(cand):
+            return cand
+    return None
+
+def iter_next(el, tag):
+    return el.xpath(f"descendant::{tag} | following::{tag}")
+
+def find_previous(el, tags, pred=None):
+    """Giống Tag.find_previous: duyệt ngược theo thứ tự tài liệu (kể cả tổ tiên)."""
+    cond = " or ".join(f"self::{t}" for t in tags)
+    cands = el.xpath(f"preceding::*[{cond}] | ancestor::*[{cond}]")
+    for cand in reversed(cands):
+        if pred is None or pred(cand):
+            return cand
+    return None
+
+# =============================
+# Bảng → DataFrame (cùng quy tắc với pandas.read_html)
+# =============================
+def _strip_hidden(table):
+    for el in table.xpath(".//style"):
+        el.drop_tree()
+    for el in table.xpath(".//*[@style]"):
+        if "display:none" in el.get("style", "").replace(" ", ""):
+            el.drop_tree()
+
+def _cell_text(td):
+    return _RE_WHITESPACE.sub(" ", td.text_content().strip())
+
+def _span(td, attr):
+    m = re.match(r"\s*(\d+)", td.get(attr) or "")
+    return int(m.group(1)) if m and int(m.group(1)) > 0 else 1
+
+def _expand_spans(rows):
+    """Trải rowspan/colspan thành lưới chữ nhật (thuật toán như pandas _expand_colspan_rowspan)."""
+    all_texts = []
+    remainder = []   # (cột, text, số dòng còn lại)
+    for tr in rows:
+        texts, next_remainder, index = [], [], 0
+        for td in tr.xpath("./td|./th"):
+            while remainder and remainder[0][0] <= index:
+                prev_i, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+                index += 1
+            text = _cell_text(td)
+            rowspan, colspan = _span(td, "rowspan"), _span(td, "colspan")
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+    while remainder:
+        next_remainder, texts = [], []
+        for prev_i, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_i, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+    return all_texts
+
+def table_sections(table):
+    """(header, body, footer) dạng lưới text; dòng toàn <th> ở đầu bảng được coi là header."""
+    _strip_hidden(table)
+    head = []
+    for thead in table.xpath(".//thead"):
+        head.extend(thead.xpath("./tr"))
+        if thead.xpath("./td|./th"):
+            head.append(thead)
+    body = table.xpath(".//tbody//tr") + table.xpath("./tr")
+    foot = table.xpath(".//tfoot//tr")
+    if not head:
+        while body and all(td.tag == "th" for td in body[0].xpath("./td|./th")):
+            head.append(body.pop(0))
+    return _expand_spans(head), _expand_spans(body), _expand_spans(foot)
+
+def table_to_frame(table):
+    """DataFrame có kiểu dữ liệu như pd.read_html(str(table))[0] (header nhiều tầng → MultiIndex)."""
+    head, body, foot = table_sections(table)
+    header = None
+    if head:
+        body = head + body
+        header = 0 if len(head) == 1 else [i for i, row in enumerate(head) if any(row)]
+    if foot:
+        body += foot
+    with TextParser(body, header=header, thousands=",") as tp:
+        return tp.read()
+
+# =============================
+# Kiểm tra tương đương với đường cũ (BeautifulSoup + read_html)
+# =============================
+def verify(pages):
+    """So sánh từng bảng wikitable/football-squad giữa đường cũ và table_to_frame; in tốc độ."""
+    import pandas as pd
+    from io import StringIO
+    from bs4 import BeautifulSoup
+
+    pattern = re.compile(r"(football-squad|wikitable)")
+    n_tables = n_diff = 0
+    t_old = t_new = 0.0
+    for name, content in pages:
+        t0 = time.perf_counter()
+        soup = BeautifulSoup(content.decode("utf-8", errors="replace"), "html.parser")
+        old = []
+        for t in soup.find_all("table", class_=pattern):
+            try:
+                old.append(pd.read_html(StringIO(str(t)), flavor="lxml")[0])
+            except Exception:
+                old.append(None)
+        t1 = time.perf_counter()
+        root = parse_html(content)
+        new = []
+        for t in [t for t in root.iter("table") if has_class(t, pattern)]:
+            try:
+                new.append(table_to_frame(t))
+            except Exception:
+                new.append(None)
+        t2 = time.perf_counter()
+        t_old += t1 - t0
+        t_new += t2 - t1
+
+        for i, (a, b) in enumerate(zip(old, new)):
+            n_tables += 1
+            same = (a is None and b is None) or (a is not None and b is not None and a.equals(b))
+            if not same:
+                n_diff += 1
+                print(f"⚠️ {name}: bảng #{i} khác nhau")
+        if len(old) != len(new):
+            n_diff += 1
+            print(f"⚠️ {name}: {len(old)} bảng (cũ) vs {len(new)} bảng (mới)")
+
+    speedup = t_old / t_new if t_new else float("inf")
+    print(f"🔎 {n_tables} bảng, {n_diff} khác biệt — cũ {t_old:.2f}s, lxml {t_new:.2f}s (nhanh hơn {speedup:.1f}x)")
+    return n_diff == 0
+
+def main(argv=None):
+    """python html_tables.py [file.html ...] — mặc định kiểm tra mọi trang 200 đang có trong page cache."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        pages = [(p, open(p, "rb").read()) for p in argv]
+    else:
+        from page_cache import CACHE
+        db = CACHE._conn()
+        rows = db.execute("SELECT url, digest FROM pages WHERE status = 200").fetchall()
+        pages = [(url, CACHE._read_blob(digest)) for url, digest in rows]
+    ok = verify(pages)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
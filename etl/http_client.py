@@ -0,0 +1,184 @@
+import os, time, threading
+import requests
+from requests.adapters import HTTPAdapter, Retry
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from archive import ARCHIVE, request_key
+from metrics import REGISTRY
+
+# =============================
+# Cấu hình transport
+# =============================
+POOL_SIZE = int(os.environ.get("EPL_POOL_SIZE", 16))
+MIN_DELAY = float(os.environ.get("EPL_MIN_DELAY", 0.0))     # giây giữa 2 request cùng host khi server khoẻ
+MAX_DELAY = float(os.environ.get("EPL_MAX_DELAY", 60.0))
+MAX_ATTEMPTS = int(os.environ.get("EPL_MAX_ATTEMPTS", 6))
+MAXLAG = int(os.environ.get("EPL_MAXLAG", 5))               # tham số maxlag cho MediaWiki API
+THROTTLE_STATUS = (429, 503)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+try:
+    import brotli  # noqa: F401 — urllib3 tự giải nén "br" khi có brotli
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+HEADERS = {"User-Agent": "Mozilla/5.0", "Accept-Encoding": ACCEPT_ENCODING}
+
+def _retry_after_seconds(value):
+    """Retry-After có thể là số giây hoặc một HTTP-date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveThrottle:
+    """Điều tiết theo từng host: gặp 429/503/maxlag thì giãn nhịp (x2), server khoẻ thì rút ngắn dần (x0.8)."""
+
+    def __init__(self, min_delay=MIN_DELAY, max_delay=MAX_DELAY):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._delay = {}
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def delay(self, host):
+        return self._delay.get(host, self.min_delay)
+
+    def wait(self, host):
+        with self._lock:
+            t = time.monotonic()
+            start = max(t, self._next.get(host, t))
+            self._next[host] = start + self.delay(host)
+        if start > t:
+            time.sleep(start - t)
+
+    def slow_down(self, host, retry_after=None):
+        with self._lock:
+            d = min(self.max_delay, max(self.delay(host) * 2, 0.5))
+            self._delay[host] = d
+            t = time.monotonic()
+            self._next[host] = max(self._next.get(host, t), t + max(d, retry_after or 0))
+
+    def speed_up(self, host):
+        with self._lock:
+            self._delay[host] = max(self.min_delay, self.delay(host) * 0.8)
+
+class TransportStats:
+    """Số liệu mỗi request: độ trễ, số byte (giải nén / trên dây), số lần retry."""
+
+    def __init__(self):
+        self.latencies = []
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.bytes = 0
+        self.wire_bytes = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, body_bytes, wire_bytes, retries, ok):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.bytes += body_bytes
+            self.wire_bytes += wire_bytes
+            self.retries += retries
+            self.errors += 0 if ok else 1
+        REGISTRY.inc("http_requests_total", ok=ok)
+        REGISTRY.inc("http_bytes_total", body_bytes)
+        REGISTRY.inc("http_wire_bytes_total", wire_bytes)
+        if retries:
+            REGISTRY.inc("http_retries_total", retries)
+        if latency:
+            REGISTRY.observe("http_request_seconds", latency)
+
+    def percentile(self, p):
+        data = sorted(self.latencies)
+        if not data:
+            return 0.0
+        return data[min(len(data) - 1, int(round(p / 100 * (len(data) - 1))))]
+
+    def as_dict(self):
+        return {"requests": self.requests, "retries": self.retries, "throttled": self.throttled,
+                "errors": self.errors, "bytes": self.bytes, "wire_bytes": self.wire_bytes,
+                "latency_p50": self.percentile(50), "latency_p95": self.percentile(95),
+                "latency_max": max(self.latencies, default=0.0)}
+
+    def report(self):
+        d = self.as_dict()
+        print(f"🌐 HTTP: {d['requests']} request, {d['retries']} retry ({d['throttled']} bị throttle), "
+              f"{d['errors']} lỗi, {d['bytes'] / 1e6:.1f} MB ({d['wire_bytes'] / 1e6:.1f} MB trên dây), "
+              f"latency p50 {d['latency_p50'] * 1000:.0f} ms / p95 {d['latency_p95'] * 1000:.0f} ms")
+        ARCHIVE.report()
+
+def _http_session(pool_size=POOL_SIZE):
+    s = requests.Session()
+    # chỉ retry lỗi kết nối ở tầng urllib3; 429/5xx do http_get tự xử lý để throttle biết
+    retries = Retry(total=3, connect=3, read=2, status=0, backoff_factor=0.5)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update(HEADERS)
+    return s
+
+SESSION = _http_session()
+THROTTLE = AdaptiveThrottle()
+STATS = TransportStats()
+
+def _is_maxlag(res):
+    return res.headers.get("MediaWiki-API-Error") == "maxlag"
+
+def http_get(url, headers=None, timeout=20, params=None, session=None):
+    """GET qua session dùng chung (keep-alive, gzip/br), tự điều tiết và retry 429/5xx/maxlag."""
+    sess = session or SESSION
+    host = urlparse(url).netloc
+    if params is not None and "api.php" in url:
+        params = dict(params)
+        params.setdefault("maxlag", MAXLAG)
+
+    key = request_key(url, params)
+    if ARCHIVE.replaying:
+        # replay: chỉ đọc từ archive, không bao giờ ra mạng
+        res = ARCHIVE.get(key)
+        STATS.record(0.0, len(res.content), len(res.content), 0, res.status_code < 400)
+        return res
+
+    retries = 0
+    t0 = time.monotonic()
+    while True:
+        THROTTLE.wait(host)
+        try:
+            res = sess.get(url, headers=headers, timeout=timeout, params=params)
+        except requests.RequestException:
+            if retries + 1 >= MAX_ATTEMPTS:
+                STATS.record(time.monotonic() - t0, 0, 0, retries, False)
+                raise
+            retries += 1
+            THROTTLE.slow_down(host)
+            continue
+
+        throttled = res.status_code in THROTTLE_STATUS or _is_maxlag(res)
+        if throttled:
+            STATS.throttled += 1
+            THROTTLE.slow_down(host, _retry_after_seconds(res.headers.get("Retry-After")))
+        elif res.status_code < 500:
+            THROTTLE.speed_up(host)
+
+        if (throttled or res.status_code in RETRY_STATUS) and retries + 1 < MAX_ATTEMPTS:
+            retries += 1
+            if not throttled:
+                time.sleep(min(MAX_DELAY, 0.5 * 2 ** retries))
+            continue
+
+        wire = int(res.headers.get("Content-Length") or len(res.content))
+        STATS.record(time.monotonic() - t0, len(res.content), wire, retries, res.status_code < 400)
+        if ARCHIVE.recording:
+            ARCHIVE.record(key, res)
+        return res
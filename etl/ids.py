@@ -0,0 +1,88 @@
+import os, re, hashlib
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import unidecode
+
+# =============================
+# Chuẩn hoá ID dùng chung cho mọi crawler: "Bukayo Saka" → player_bukayo_saka
+#   - regex biên dịch sẵn, memo (lru_cache) theo tên → tên lặp lại qua các mùa/CLB gần như miễn phí
+#   - API hàng loạt trên pandas Series: mỗi tên khác nhau chỉ chuẩn hoá 1 lần
+#   - phát hiện va chạm (2 thực thể khác nhau cùng 1 ID) và tách bằng hậu tố băm tất định
+# =============================
+ID_CACHE_SIZE = int(os.environ.get("EPL_ID_CACHE", 1 << 16))
+
+_NON_ALNUM = re.compile(r"[^a-zA-Z0-9\s]")
+_NON_ALNUM_DASH = re.compile(r"[^a-zA-Z0-9\s-]")     # HLV: giữ dấu "-" như trước
+_SPACES = re.compile(r"\s+")
+
+@lru_cache(maxsize=ID_CACHE_SIZE)
+def slug(name, keep_dash=False):
+    s = unidecode.unidecode(name)
+    s = (_NON_ALNUM_DASH if keep_dash else _NON_ALNUM).sub(" ", s)
+    return _SPACES.sub("_", s.strip().lower())
+
+def make_id(prefix, name, keep_dash=False):
+    if not isinstance(name, str) or not name:
+        return None
+    return f"{prefix}_{slug(name, keep_dash)}"
+
+def make_club_id(name):
+    return make_id("club", name)
+
+def make_player_id(name):
+    return make_id("player", name)
+
+def make_coach_id(name):
+    return make_id("coach", name, keep_dash=True)
+
+def make_ids(prefix, names, keep_dash=False):
+    """Bản hàng loạt của make_id cho pandas Series (giữ index): factorize → chuẩn hoá mỗi tên duy nhất 1 lần."""
+    names = pd.Series(names)
+    codes, uniques = pd.factorize(names)
+    table = np.array([make_id(prefix, u, keep_dash) for u in uniques] + [None], dtype=object)
+    return pd.Series(table[codes], index=names.index, dtype=object)     # mã -1 (NaN) → None
+
+def id_cache_info():
+    return slug.cache_info()
+
+# ---------- va chạm ID ----------
+def _suffix(key):
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:6]
+
+def resolve_collisions(df, id_col, key_cols, existing=None, label=None):
+    """Tách các ID bị dùng chung bởi nhiều thực thể khác nhau.
+
+    Thực thể được nhận diện bằng `key_cols` (vd. cầu thủ: quốc tịch). Trong mỗi nhóm cùng ID có > 1 khoá khác
+    nhau: khoá đã có trong `existing` (file node hiện tại) giữ ID gốc, nếu không thì khoá nhỏ nhất theo thứ tự
+    chữ cái; các khoá còn lại nhận ID `<id>_<sha1(khoá)[:6]>` — tất định, không phụ thuộc thứ tự crawl.
+    Dòng có khoá rỗng không phân biệt được nên gán theo ID gốc.
+    Trả về (df đã sửa ID, danh sách (id gốc, khoá, id mới)).
+    """
+    def keys_of(frame):
+        return frame[key_cols].fillna("").astype(str).agg("|".join, axis=1).str.strip("|")
+
+    key = keys_of(df)
+    pairs = pd.DataFrame({"id": df[id_col], "key": key, "known": False})
+    if existing is not None and len(existing) and all(c in existing.columns for c in key_cols):
+        pairs = pd.concat([pd.DataFrame({"id": existing[id_col], "key": keys_of(existing), "known": True}), pairs])
+    pairs = pairs[(pairs["key"] != "") & pairs["id"].notna()]
+    pairs = pairs.groupby(["id", "key"], as_index=False)["known"].max()
+    counts = pairs.groupby("id")["key"].transform("size")
+    clash = pairs[counts > 1]
+    if clash.empty:
+        return df, []
+
+    # khoá giữ ID gốc: ưu tiên khoá đã có trong file node, sau đó khoá nhỏ nhất
+    clash = clash.sort_values(["id", "known", "key"], ascending=[True, False, True])
+    keepers = clash.groupby("id").head(1)
+    renamed = clash.drop(keepers.index)
+    changes = [(i, k, f"{i}_{_suffix(k)}") for i, k in zip(renamed["id"], renamed["key"])]
+
+    new_ids = {(i, k): n for i, k, n in changes}
+    out = df.copy()
+    out[id_col] = [new_ids.get((i, k), i) for i, k in zip(df[id_col], key)]
+    what = label or id_col
+    for i, k, n in changes:
+        print(f"⚠️  Va chạm {what}: '{i}' dùng chung bởi nhiều thực thể → khoá [{k}] dùng '{n}'")
+    return out, changes
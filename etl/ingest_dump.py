@@ -0,0 +1,357 @@
+import os, re, bz2, gzip, json, time, hashlib, argparse
+import xml.etree.ElementTree as ET
+import pandas as pd
+import wikitext as wt
+import table_normalize as tn
+from checkpoint import Checkpoint, AtomicCSV
+from fetch_plan import parse_seasons, season_name, participants, LATEST_SEASON
+from metrics import timed, main_entry
+import crawl_clubs, crawl_players, crawl_coaches
+
+# =============================
+# Nạp offline từ dump Wikipedia (pages-articles*.xml.bz2 / .xml.gz / .xml) thay cho crawl HTML
+#   python ingest_dump.py enwiki-latest-pages-articles.xml.bz2 [--seasons all] [--only clubs players]
+#   (hoặc crawl_clubs.py / crawl_players.py / crawl_coaches.py --dump <file>, orchestrate.py --dump <file>)
+# - 1 lượt đọc: giải nén + iterparse theo luồng, <page> nào xong là clear → bộ nhớ không theo kích thước dump
+# - chỉ giữ trang liên quan, và chỉ giữ phần đã bóc (bảng sân, đội hình, infobox HLV, bảng HLV):
+#     "<mùa> (FA )Premier League", "<mùa> <CLB> season", trang CLB (Infobox football club), "List of <CLB> managers",
+#     redirect tới các trang đó
+# - kết quả bóc lưu ở ../data/.dump/<khoá dump>.json.gz → các stage sau (players, coaches) không đọc lại dump
+# - bảng wikitext → html_tables.table_to_frame, rồi đi qua đúng các hàm của crawler (stadia_frame, players_from_frame,
+#   coach_rows, merge_outputs) → data/nodes + data/relations cùng định dạng với crawl HTML
+# Dump pages-articles chỉ có revision mới nhất: mùa cũ không có bài "<mùa> <CLB> season" bị bỏ qua
+# (crawler HTML dùng revision ghim cho trường hợp này).
+# =============================
+BASE_DIR = os.path.join("..", "data")
+KINDS = ("clubs", "players", "coaches")
+EXTRACT_VERSION = 1                 # đổi cách bóc → tăng để bỏ kết quả bóc cũ
+PROGRESS_EVERY = int(os.environ.get("EPL_DUMP_PROGRESS", 500_000))
+
+SEASON_PAGE = re.compile(r"^(\d{4}–\d{2}) (?:FA )?Premier League$")
+CLUB_SEASON = re.compile(r"^\d{4}–\d{2} .+ season$")
+MANAGER_LIST = re.compile(r"^List of .+ managers$")
+CLUB_INFOBOX = re.compile(r"\{\{\s*Infobox[ _]football[ _]club\b", re.I)
+CLUB_LIKE = re.compile(r"(\bA?F\.?C\.?|Football Club)$|^A?FC\b")         # đích redirect đáng giữ
+EPL = "Premier League"
+SQUAD_TEMPLATE = re.compile(r"^(nat )?(fs|football squad)\d? ([gr] )?player\d?$")
+MANAGER_HEADING = re.compile(crawl_coaches.MANAGER_SECTION, re.I)
+MANAGER_TABLE = re.compile(r"Manager|Head coach|Name", re.I)
+STADIA_HEADING = re.compile(crawl_clubs.STADIA_ID.pattern.replace("_", " "), re.I)
+STADIA_TEXT = (re.compile(r"(Club|Team|Participant)", re.I), re.compile(r"(Stadium|Ground)", re.I))
+
+# ---------- đọc dump ----------
+def open_dump(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")          # đọc được cả dump multistream
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+def _local(tag):
+    return tag.rpartition("}")[2]
+
+def iter_pages(path):
+    """(title, ns, đích redirect | None, wikitext) cho từng <page>; page xử lý xong bị xoá khỏi cây."""
+    with open_dump(path) as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event != "end" or _local(elem.tag) != "page":
+                continue
+            title = ns = redirect = None
+            text = ""
+            for child in elem:
+                tag = _local(child.tag)
+                if tag == "title":
+                    title = child.text
+                elif tag == "ns":
+                    ns = child.text
+                elif tag == "redirect":
+                    redirect = child.get("title")
+                elif tag == "revision":
+                    text = next((c.text or "" for c in child if _local(c.tag) == "text"), "")
+            yield title, ns, redirect, text
+            root.clear()
+
+# ---------- bóc từng loại trang ----------
+def stadia_table(text):
+    """Bảng sân của bài mùa giải (như crawl_clubs._find_stadia_table) → (HTML bảng, {tên hiển thị: title CLB})."""
+    table = None
+    for _, end, _, title in wt.headings(text):
+        if STADIA_HEADING.search(title):
+            table = next((t for _, t in wt.tables(text, end)), None)
+            break
+    if table is None:
+        table = next((t for _, t in wt.tables(text) if all(p.search(wt.plain(t)) for p in STADIA_TEXT)), None)
+    if table is None:
+        return None
+    return {"table": wt.table_html(table), "links": wt.table_links(table)}
+
+def squad(text):
+    """Đội hình 1 mục (như crawl_players.parse_players): {{Fs player}} → dòng; không có → các wikitable của mục."""
+    body = wt.section_body(text, crawl_players.SQUAD_HEADINGS)
+    if body is None:
+        return None
+    rows = []
+    for _, _, p in wt.find_templates(body, SQUAD_TEMPLATE.match):
+        name = wt.plain(p.get("name", ""))
+        if p.get("other"):
+            name = f"{name} ({wt.plain(p['other'])})"
+        rows.append([name, wt.plain(p.get("nat", "")), wt.plain(p.get("pos", ""))])
+    if rows:
+        return {"rows": rows}
+    found = [wt.table_html(t) for _, t in wt.tables(body)]
+    return {"tables": found} if found else None
+
+def infobox_manager(text):
+    """HLV hiện tại trong Infobox football club (như dòng th "Manager"/"Head coach" của crawler)."""
+    box = wt.find_templates(text, lambda n: n == "infobox football club")
+    if not box:
+        return None
+    _, _, p = box[0]
+    value = p.get("manager") or p.get("head coach") or p.get("coach")
+    return crawl_coaches.clean_text(wt.plain(value)) if value else None
+
+def manager_table(text):
+    """Bảng HLV của trang CLB: wikitable đầu tiên sau heading Managerial/Managers."""
+    for _, end, _, title in wt.headings(text):
+        if MANAGER_HEADING.search(title):
+            table = next((t for _, t in wt.tables(text, end)), None)
+            return wt.table_html(table) if table else None
+    return None
+
+def list_table(text):
+    """Trang "List of … managers": wikitable nhiều dòng nhất có cột Manager/Head coach/Name (như crawler)."""
+    found = [t for _, t in wt.tables(text)]
+    best = max((t for t in found if MANAGER_TABLE.search(t)), key=wt.row_count, default=None)
+    best = best or max(found, key=wt.row_count, default=None)
+    return wt.table_html(best) if best else None
+
+@timed("parse", name="dump_extract", rows=lambda d: d["stats"]["kept"])
+def extract(path):
+    """1 lượt qua dump → dict gọn (JSON được) chỉ chứa phần đã bóc của các trang liên quan."""
+    out = {"seasons": {}, "clubs": {}, "articles": {}, "lists": {}, "redirects": {},
+           "stats": {"pages": 0, "kept": 0}}
+    st = out["stats"]
+    t0 = time.perf_counter()
+    for title, ns, redirect, text in iter_pages(path):
+        st["pages"] += 1
+        if st["pages"] % PROGRESS_EVERY == 0:
+            print(f"📖 {st['pages']} trang, giữ {st['kept']} ({time.perf_counter() - t0:.0f}s)")
+        if ns != "0" or not title:
+            continue
+        if redirect is not None:
+            target = wt.normalize_title(redirect)
+            if CLUB_LIKE.search(target) or MANAGER_LIST.match(target) or CLUB_SEASON.match(target):
+                out["redirects"][title] = target
+            continue
+        m = SEASON_PAGE.match(title)
+        if m:
+            page = stadia_table(text)
+            if page:
+                out["seasons"][m.group(1)] = page
+        elif CLUB_SEASON.match(title):
+            if EPL not in text:
+                continue
+            out["articles"][title] = squad(text)
+        elif MANAGER_LIST.match(title):
+            out["lists"][title] = list_table(text)
+        elif CLUB_INFOBOX.search(text) and EPL in text:
+            out["clubs"][title] = {"squad": squad(text), "manager": infobox_manager(text),
+                                   "managers": manager_table(text)}
+        else:
+            continue
+        st["kept"] += 1
+    st["seconds"] = round(time.perf_counter() - t0, 3)
+    st["bytes"] = os.path.getsize(path)
+    return out
+
+def dump_key(path):
+    s = os.stat(path)
+    raw = json.dumps([os.path.abspath(path), s.st_size, int(s.st_mtime), EXTRACT_VERSION])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def load_extract(path, cache_dir):
+    """Kết quả bóc của dump (đọc lại từ cache nếu dump không đổi)."""
+    cache = os.path.join(cache_dir, f"{dump_key(path)}.json.gz")
+    if os.path.exists(cache):
+        with gzip.open(cache, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        print(f"♻️  Dùng kết quả bóc đã lưu {cache}")
+        return data
+    print(f"📦 Đọc dump {path} ({os.path.getsize(path) / 1e6:.1f} MB)...")
+    data = extract(path)
+    st = data["stats"]
+    print(f"✅ {st['pages']} trang trong {st['seconds']:.1f}s "
+          f"({st['bytes'] / 1e6 / max(st['seconds'], 1e-9):.1f} MB/s đọc dump): "
+          f"{len(data['seasons'])} bài mùa giải, {len(data['clubs'])} trang CLB, "
+          f"{len(data['articles'])} bài mùa của CLB, {len(data['lists'])} danh sách HLV, "
+          f"{len(data['redirects'])} redirect")
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = cache + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, cache)
+    return data
+
+# ---------- ghép → output như crawler ----------
+class Dump:
+    """Tra cứu trên kết quả bóc: redirect, tên CLB (như trong bảng sân) → title bài CLB."""
+
+    def __init__(self, data):
+        self.data = data
+        self.titles = {}
+        for season in sorted(data["seasons"], reverse=True):
+            for shown, target in data["seasons"][season]["links"].items():
+                self.titles.setdefault(self.club_name(shown), self.resolve(target))
+
+    @staticmethod
+    def club_name(shown):
+        # cùng cách cột Club được làm sạch ở crawl_clubs (collapse khoảng trắng như _cell_text → clean_text)
+        return tn.clean_text(tn.collapse_spaces(shown.replace("\n", "")), parens=True)
+
+    def resolve(self, title):
+        seen = set()
+        while title in self.data["redirects"] and title not in seen:
+            seen.add(title)
+            title = self.data["redirects"][title]
+        return title
+
+    def get(self, kind, title):
+        return self.data[kind].get(self.resolve(title)) if title else None
+
+def squad_frame(page):
+    if page.get("rows"):
+        return pd.DataFrame(page["rows"], columns=["Player", "Nation", "Position"])
+    dfs = []
+    for t in page.get("tables", []):
+        try:
+            df = wt.html_frame(t)
+        except Exception:
+            continue
+        df.columns = [str(c).strip() for c in df.columns]
+        dfs.append(df)
+    return pd.concat(dfs, ignore_index=True) if dfs else None
+
+def write_clubs(dump, seasons, node_dir, rel_dir):
+    all_dfs = []
+    for season in seasons:
+        page = dump.data["seasons"].get(season)
+        if page is None:
+            continue
+        try:
+            df = crawl_clubs.stadia_frame(wt.html_frame(page["table"]), season)
+        except Exception:
+            df = None
+        if df is not None:
+            all_dfs.append(crawl_clubs.basic_club_filter(df))
+    print(f"🏟️  Bảng sân: {len(all_dfs)}/{len(seasons)} mùa")
+    if not all_dfs:
+        return
+    merged, final_df = crawl_clubs.club_outputs(all_dfs)
+    merged[["club_id", "Club", "Season"]].to_csv(os.path.join(rel_dir, "clubs_by_season.csv"), index=False,
+                                                 encoding="utf-8-sig")
+    final_df[["club_id", "Club", "Location", "Stadium"]].to_csv(os.path.join(node_dir, "clubs.csv"), index=False,
+                                                                encoding="utf-8-sig")
+    print(f"✅ clubs.csv → {len(final_df)} CLB, clubs_by_season.csv → {len(merged)} dòng")
+
+def player_plan(dump, clubs_df, seasons, cbs_path):
+    """Như fetch_plan.build_plan: mùa mới nhất → trang CLB, mùa cũ → bài "<mùa> <CLB> season"; gộp theo trang."""
+    latest = season_name(LATEST_SEASON)
+    tasks, skipped = {}, 0
+    for name, club_id, season in participants(clubs_df, seasons, path=cbs_path):
+        title = dump.titles.get(name)
+        if title and season == latest:
+            key, page = title, dump.get("clubs", title)
+            page = page and page["squad"]
+        elif title:
+            key = dump.resolve(f"{season} {title} season")
+            page = dump.data["articles"].get(key)
+        else:
+            page = None
+        if not page:
+            skipped += 1
+            continue
+        tasks.setdefault(key, (key, page, club_id, []))[3].append(season)
+    if skipped:
+        print(f"⚠️  {skipped} cặp (CLB, mùa) không có trang đội hình trong dump → bỏ qua")
+    return list(tasks.values())
+
+def write_players(dump, seasons, node_dir, rel_dir, part_root):
+    clubs_df = pd.read_csv(os.path.join(node_dir, "clubs.csv"))
+    plan = player_plan(dump, clubs_df, seasons, os.path.join(rel_dir, "clubs_by_season.csv"))
+    cp = Checkpoint("dump_players", crawl_players.PLAYER_COLS, [t[0] for t in plan], sort_key="player_id",
+                    root=part_root, resume=False)
+    for key, page, club_id, club_seasons in plan:
+        df = squad_frame(page)
+        cp.commit(key, [] if df is None else crawl_players.players_from_frame(df, club_id, club_seasons))
+    players_path = os.path.join(node_dir, "players.csv")
+    rel_path = os.path.join(rel_dir, "played_for.csv")
+    with AtomicCSV(players_path, crawl_players.PLAYER_NODE_COLS) as pw, \
+            AtomicCSV(rel_path, crawl_players.REL_COLS) as rw:
+        crawl_players.merge_outputs(cp, pw.write, rw.write)
+    cp.clear()
+    print(f"✅ players.csv → {pw.rows} cầu thủ, played_for.csv → {rw.rows} dòng ({len(plan)} trang đội hình)")
+
+def coach_history(dump, club_name, club_id, season):
+    """Như crawl_coaches.parse_coach_history: infobox + bảng HLV trang CLB, không có bảng → trang danh sách HLV."""
+    title = dump.titles.get(club_name)
+    page = dump.get("clubs", title)
+    if page is None:
+        return []
+    table = page["managers"] or dump.get("lists", f"List of {title} managers")
+    df = pd.DataFrame()
+    if table:
+        try:
+            df = wt.html_frame(table)
+        except Exception:
+            return []
+    return crawl_coaches.coach_rows(df, page["manager"], club_id, club_name, season)
+
+def write_coaches(dump, node_dir, rel_dir, part_root):
+    clubs_df = pd.read_csv(os.path.join(node_dir, "clubs.csv"))
+    season = season_name(LATEST_SEASON)
+    jobs = list(zip(clubs_df["Club"], clubs_df["club_id"]))
+    cp = Checkpoint("dump_coaches", crawl_coaches.COACH_COLS, [j[1] for j in jobs], sort_key="coach_id",
+                    root=part_root, resume=False)
+    for club_name, club_id in jobs:
+        cp.commit(club_id, coach_history(dump, club_name, club_id, season))
+    if not any(e["rows"] for e in cp.committed.values()):
+        cp.clear()
+        print("❌ Không có dữ liệu HLV nào trong dump!")
+        return
+    with AtomicCSV(os.path.join(node_dir, "coaches.csv"), crawl_coaches.COACH_NODE_COLS) as cw, \
+            AtomicCSV(os.path.join(rel_dir, "coached.csv"), crawl_coaches.COACHED_COLS) as ew:
+        crawl_coaches.merge_outputs(cp, cw.write, ew.write)
+    cp.clear()
+    print(f"✅ coaches.csv → {cw.rows} HLV, coached.csv → {ew.rows} dòng")
+
+def ingest(path, kinds=KINDS, seasons=None, out=BASE_DIR):
+    """Dump → các file nodes/relations của `kinds` trong `out` (mặc định ../data như crawler)."""
+    seasons = seasons or parse_seasons()
+    node_dir, rel_dir = os.path.join(out, "nodes"), os.path.join(out, "relations")
+    os.makedirs(node_dir, exist_ok=True)
+    os.makedirs(rel_dir, exist_ok=True)
+    dump = Dump(load_extract(path, os.path.join(out, ".dump")))
+    part_root = os.path.join(out, ".parts")
+    if "clubs" in kinds:
+        write_clubs(dump, seasons, node_dir, rel_dir)
+    if "players" in kinds:
+        write_players(dump, seasons, node_dir, rel_dir, part_root)
+    if "coaches" in kinds:
+        write_coaches(dump, node_dir, rel_dir, part_root)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nạp CLB / cầu thủ / HLV từ dump Wikipedia (pages-articles XML)")
+    ap.add_argument("dump", help="file pages-articles*.xml.bz2 (hoặc .xml.gz / .xml)")
+    ap.add_argument("--only", nargs="+", default=list(KINDS), help=f"một số trong {', '.join(KINDS)}")
+    ap.add_argument("--seasons", default=None, help='khoảng mùa: "last5" (mặc định), "all", "2010-2024", …')
+    ap.add_argument("--out", default=BASE_DIR, help="thư mục data (chứa nodes/ và relations/)")
+    args = ap.parse_args(argv)
+    unknown = [k for k in args.only if k not in KINDS]
+    if unknown:
+        ap.error(f"không có loại: {', '.join(unknown)}")
+    ingest(args.dump, args.only, parse_seasons(args.seasons) if args.seasons else None, args.out)
+
+if __name__ == "__main__":
+    main_entry("ingest_dump", main)
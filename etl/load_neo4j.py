@@ -0,0 +1,372 @@
+import os, re, csv, sys, time, zlib, argparse, threading
+from concurrent.futures import ThreadPoolExecutor
+from metrics import timed, main_entry
+from entity_resolution import prefer_resolved
+
+# =============================
+# Nạp data/nodes + data/edges vào Neo4j
+#   online : UNWIND $batch theo lô (mỗi lô 1 transaction), quan hệ chia lưới để nạp song song không tranh khoá
+#   offline: --admin-import DIR → header + file dữ liệu + lệnh cho `neo4j-admin database import full`
+#   thử    : --dry-run → MemoryDriver (driver giả trong bộ nhớ, không cần database)
+# =============================
+BASE_DIR = "../data"
+NODE_DIR = os.path.join(BASE_DIR, "nodes")
+EDGE_DIR = os.path.join(BASE_DIR, "edges")
+NEO4J_URI = os.environ.get("NEO4J_URI", "neo4j://localhost:7687")
+NEO4J_USER = os.environ.get("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.environ.get("NEO4J_PASSWORD", "test1234")
+NEO4J_DATABASE = os.environ.get("NEO4J_DATABASE") or None
+BATCH_SIZE = int(os.environ.get("EPL_NEO4J_BATCH", 5000))
+WORKERS = int(os.environ.get("EPL_NEO4J_WORKERS", 4))
+CSV_ENCODING = "utf-8-sig"
+
+def _int(v):
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return None
+
+def _bool(v):
+    return {"true": True, "false": False}.get(str(v).strip().lower())
+
+# Node: nhãn → (file, cột ID, [(thuộc tính, cột theo tên hoặc vị trí, kiểu)])
+#   clubs.csv có 2 cột cùng tên "Location" (cột thứ 2 thực ra là sức chứa) → chọn theo vị trí
+NODE_SPECS = {
+    "Club": ("clubs.csv", "club_id",
+             [("name", "Club", str), ("location", 2, str), ("capacity", 3, _int), ("stadium", "Stadium", str)]),
+    "Player": ("players.csv", "player_id",
+               [("name", "name", str), ("nation", "nation", str), ("position", "position", str)]),
+    "Coach": ("coaches.csv", "coach_id", [("name", "name", str)]),
+    "Season": ("seasons.csv", "season_id",
+               [("name", "name", str), ("start_year", "start_year", _int), ("end_year", "end_year", _int),
+                ("url", "url", str)]),
+}
+EDGE_FILES = ["part_of.csv", "played_for.csv", "coached.csv"]
+# cột CSV cạnh → thuộc tính quan hệ (mùa giải luôn là `season`, khoá của MERGE)
+EDGE_PROPS = {"season_id": ("season", str), "Season": ("season", str), "position": ("position", str),
+              "years": ("years", str), "is_current": ("is_current", _bool)}
+ENDPOINT = re.compile(r"^:(START|END)_ID\((\w+)\)$")
+
+# ---------- đọc CSV thành dòng cho UNWIND ----------
+def _reader(path):
+    f = open(path, encoding=CSV_ENCODING, newline="")
+    rows = csv.reader(f)
+    return f, next(rows), rows
+
+def _col(header, ref):
+    return ref if isinstance(ref, int) else header.index(ref)
+
+def _clean(v, conv):
+    if v is None or v == "":
+        return None
+    return conv(v)
+
+def node_rows(label, node_dir=NODE_DIR):
+    fname, id_col, props = NODE_SPECS[label]
+    f, header, rows = _reader(prefer_resolved(os.path.join(node_dir, fname)))
+    with f:
+        id_i = header.index(id_col)
+        cols = [(name, _col(header, ref), conv) for name, ref, conv in props]
+        for r in rows:
+            if r and r[id_i]:
+                yield {"id": r[id_i], "props": {n: _clean(r[i], c) for n, i, c in cols if i < len(r)}}
+
+def edge_spec(path):
+    """Đọc header file cạnh: (nhãn đầu, nhãn cuối, kiểu quan hệ, [(vị trí, thuộc tính, kiểu)])."""
+    f, header, rows = _reader(path)
+    with f:
+        first = next(rows, None)
+    ends, props = {}, []
+    for i, col in enumerate(header):
+        m = ENDPOINT.match(col)
+        if m:
+            ends[m.group(1)] = (i, m.group(2))
+        elif col in EDGE_PROPS:
+            props.append((i,) + EDGE_PROPS[col])
+    type_i = header.index(":TYPE")
+    rel_type = first[type_i] if first else os.path.basename(path)[:-4].upper()
+    return ends["START"], ends["END"], rel_type, props
+
+def edge_rows(path):
+    (s_i, _), (e_i, _), _, props = edge_spec(path)
+    f, _, rows = _reader(path)
+    with f:
+        for r in rows:
+            if r and r[s_i] and r[e_i]:
+                p = {name: _clean(r[i], conv) for i, name, conv in props}
+                yield {"start": r[s_i], "end": r[e_i], "season": p.pop("season", None) or "", "props": p}
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# ---------- Cypher ----------
+def constraint_query(label):
+    return (f"CREATE CONSTRAINT {label.lower()}_id_unique IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.id IS UNIQUE")
+
+def node_query(label):
+    return f"UNWIND $batch AS row MERGE (n:{label} {{id: row.id}}) SET n += row.props"
+
+def rel_query(start, end, rel_type, create=False):
+    verb = "CREATE" if create else "MERGE"
+    return (f"UNWIND $batch AS row "
+            f"MATCH (a:{start} {{id: row.start}}) MATCH (b:{end} {{id: row.end}}) "
+            f"{verb} (a)-[r:{rel_type} {{season: row.season}}]->(b) SET r += row.props")
+
+# ---------- chia lưới quan hệ ----------
+def _bucket(key, k):
+    return zlib.crc32(key.encode("utf-8")) % k
+
+def partition(rows, k):
+    """Chia quan hệ vào lưới k×k theo (băm đầu, băm cuối).
+
+    Các ô trên cùng 1 "đường chéo" d = {(i, (i + d) % k)} không chung node đầu cũng không chung node cuối,
+    nên k ô đó nạp song song mà không tranh khoá node; k đường chéo chạy lần lượt.
+    """
+    grid = {}
+    for row in rows:
+        grid.setdefault((_bucket(row["start"], k), _bucket(row["end"], k)), []).append(row)
+    return [[grid.get((i, (i + d) % k), []) for i in range(k)] for d in range(k)]
+
+# ---------- nạp ----------
+class LoadStats:
+    def __init__(self):
+        self.steps = []
+        self._lock = threading.Lock()
+
+    def add(self, name, rows, secs, batches_):
+        with self._lock:
+            self.steps.append((name, rows, secs, batches_))
+        print(f"✅ {name:<12} {rows:>8} dòng / {batches_:>4} lô  {secs:7.2f}s  {rows / secs if secs else 0:10.0f} dòng/s")
+
+    def report(self):
+        rows = sum(s[1] for s in self.steps)
+        secs = sum(s[2] for s in self.steps)
+        print(f"📈 Tổng: {rows} dòng trong {secs:.2f}s ({rows / secs if secs else 0:.0f} dòng/s)")
+
+def _write_batches(driver, query, chunks, database):
+    n = 0
+    with driver.session(database=database) as session:
+        for batch in chunks:
+            session.execute_write(lambda tx, b=batch: tx.run(query, batch=b).consume())
+            n += 1
+    return n
+
+@timed("load", rows=None)
+def load(driver, node_dir=NODE_DIR, edge_dir=EDGE_DIR, batch_size=BATCH_SIZE, workers=WORKERS,
+         create=False, database=NEO4J_DATABASE):
+    stats = LoadStats()
+    with driver.session(database=database) as session:
+        for label in NODE_SPECS:
+            session.run(constraint_query(label)).consume()
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        # node: các lô độc lập (ID khác nhau) → song song thoải mái
+        for label, (fname, _, _) in NODE_SPECS.items():
+            if not os.path.exists(os.path.join(node_dir, fname)):
+                continue
+            t0 = time.perf_counter()
+            rows = list(node_rows(label, node_dir))
+            parts = [rows[i::workers] for i in range(workers)]
+            done = ex.map(lambda p: _write_batches(driver, node_query(label), batches(p, batch_size), database), parts)
+            stats.add(label, len(rows), time.perf_counter() - t0, sum(done))
+
+        # quan hệ: từng đường chéo của lưới, các ô trong đường chéo song song
+        for fname in EDGE_FILES:
+            path = os.path.join(edge_dir, fname)
+            if not os.path.exists(path):
+                continue
+            (_, start), (_, end), rel_type, _ = edge_spec(path)
+            query = rel_query(start, end, rel_type, create)
+            t0 = time.perf_counter()
+            rows = list(edge_rows(path))
+            n_batches = 0
+            for diagonal in partition(rows, workers):
+                done = ex.map(lambda cell: _write_batches(driver, query, batches(cell, batch_size), database),
+                              diagonal)
+                n_batches += sum(done)
+            stats.add(rel_type, len(rows), time.perf_counter() - t0, n_batches)
+    stats.report()
+    return stats
+
+# ---------- driver giả trong bộ nhớ ----------
+_NODE_Q = re.compile(r"MERGE \(n:(\w+) \{id: row\.id\}\)")
+_REL_Q = re.compile(r"MATCH \(a:(\w+) .*MATCH \(b:(\w+) .*(MERGE|CREATE) \(a\)-\[r:(\w+)")
+
+class MemoryResult:
+    def consume(self):
+        return None
+
+class MemoryTx:
+    def __init__(self, db):
+        self.db = db
+
+    def run(self, query, batch=None, **_):
+        if query.startswith("CREATE CONSTRAINT"):
+            return MemoryResult()
+        m = _NODE_Q.search(query)
+        if m:
+            self.db.merge_nodes(m.group(1), batch)
+            return MemoryResult()
+        m = _REL_Q.search(query)
+        if m:
+            self.db.merge_rels(m.group(1), m.group(2), m.group(4), batch, m.group(3) == "CREATE")
+            return MemoryResult()
+        raise ValueError(f"MemoryDriver không hiểu truy vấn: {query[:80]}")
+
+class MemorySession:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        return MemoryTx(self.db).run(query, **params)
+
+    def execute_write(self, fn, *args, **kwargs):
+        self.db.transactions += 1
+        return fn(MemoryTx(self.db), *args, **kwargs)
+
+class MemoryDriver:
+    """Đóng vai neo4j.Driver cho kiểm thử: lưu node/quan hệ trong dict, đếm transaction,
+    và đếm xung đột khoá (2 lô đang chạy cùng lúc đụng cùng 1 node) để kiểm chứng cách chia lưới."""
+
+    def __init__(self):
+        self.nodes = {}          # (nhãn, id) → props
+        self.rels = {}           # (kiểu, đầu, cuối, season) → props
+        self.transactions = 0
+        self.conflicts = 0
+        self.missing = 0
+        self._held = set()
+        self._lock = threading.Lock()
+
+    def session(self, database=None):
+        return MemorySession(self)
+
+    def close(self):
+        pass
+
+    def merge_nodes(self, label, batch):
+        with self._lock:
+            for row in batch:
+                self.nodes.setdefault((label, row["id"]), {}).update(row["props"])
+
+    def merge_rels(self, start, end, rel_type, batch, create=False):
+        keys = {(start, r["start"]) for r in batch} | {(end, r["end"]) for r in batch}
+        with self._lock:
+            if keys & self._held:
+                self.conflicts += 1
+            self._held |= keys
+        try:
+            with self._lock:
+                for r in batch:
+                    if (start, r["start"]) not in self.nodes or (end, r["end"]) not in self.nodes:
+                        self.missing += 1       # MATCH không thấy node → Neo4j bỏ qua dòng
+                        continue
+                    key = (rel_type, r["start"], r["end"], r["season"])
+                    if create and key in self.rels:
+                        key = key + (len(self.rels),)
+                    self.rels.setdefault(key, {}).update(r["props"])
+            time.sleep(0)                        # nhường thread khác để xung đột (nếu có) lộ ra
+        finally:
+            with self._lock:
+                self._held -= keys
+
+    def report(self):
+        print(f"🧪 MemoryDriver: {len(self.nodes)} node, {len(self.rels)} quan hệ, {self.transactions} transaction, "
+              f"{self.conflicts} xung đột khoá, {self.missing} dòng thiếu node")
+
+# ---------- neo4j-admin import ----------
+_ADMIN_TYPES = {_int: "int", _bool: "boolean", str: None}
+
+def write_admin_import(out_dir, node_dir=NODE_DIR, edge_dir=EDGE_DIR):
+    """Sinh header + file dữ liệu (không header) cho `neo4j-admin database import full` và script import.sh."""
+    os.makedirs(out_dir, exist_ok=True)
+    args = []
+    for label, (fname, _, props) in NODE_SPECS.items():
+        if not os.path.exists(os.path.join(node_dir, fname)):
+            continue
+        cols = [f"id:ID({label})"] + [f"{n}:{_ADMIN_TYPES[c]}" if _ADMIN_TYPES[c] else n for n, _, c in props]
+        _write_pair(out_dir, label, cols + [":LABEL"],
+                    ([r["id"]] + [r["props"].get(n) for n, _, _ in props] + [label] for r in node_rows(label, node_dir)))
+        args.append(f"--nodes={label}=nodes/{label}_header.csv,nodes/{label}.csv")
+
+    for fname in EDGE_FILES:
+        path = os.path.join(edge_dir, fname)
+        if not os.path.exists(path):
+            continue
+        (_, start), (_, end), rel_type, props = edge_spec(path)
+        names = list(dict.fromkeys(n for _, n, _ in props if n != "season"))
+        conv = {n: c for _, n, c in props}
+        cols = ([f":START_ID({start})", f":END_ID({end})", "season"]
+                + [f"{n}:{_ADMIN_TYPES[conv[n]]}" if _ADMIN_TYPES[conv[n]] else n for n in names] + [":TYPE"])
+        _write_pair(out_dir, rel_type, cols,
+                    ([r["start"], r["end"], r["season"]] + [r["props"].get(n) for n in names] + [rel_type]
+                     for r in edge_rows(path)))
+        args.append(f"--relationships={rel_type}=edges/{rel_type}_header.csv,edges/{rel_type}.csv")
+
+    cmd = ("neo4j-admin database import full neo4j --overwrite-destination --skip-bad-relationships "
+           "--skip-duplicate-nodes " + " ".join(args))
+    with open(os.path.join(out_dir, "import.sh"), "w", encoding="utf-8") as f:
+        f.write("#!/bin/sh\n# chạy trong thư mục này, khi database đang dừng\n" + cmd + "\n")
+    print(f"📦 neo4j-admin import → {out_dir}\n   {cmd}")
+
+def _write_pair(out_dir, name, header, rows):
+    sub = "nodes" if header[0].startswith("id:ID") else "edges"
+    os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+    with open(os.path.join(out_dir, sub, f"{name}_header.csv"), "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerow(header)
+    n = 0
+    with open(os.path.join(out_dir, sub, f"{name}.csv"), "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        for row in rows:
+            w.writerow(["" if v is None else ("true" if v is True else "false" if v is False else v) for v in row])
+            n += 1
+    print(f"✅ {sub}/{name}.csv → {n} dòng")
+
+# =============================
+# MAIN
+# =============================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Nạp nodes/edges vào Neo4j theo lô, hoặc sinh file cho neo4j-admin import")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    ap.add_argument("--workers", type=int, default=WORKERS, help="số luồng (và kích thước lưới k×k cho quan hệ)")
+    ap.add_argument("--create", action="store_true", help="CREATE thay vì MERGE quan hệ (database mới, nhanh hơn)")
+    ap.add_argument("--uri", default=NEO4J_URI)
+    ap.add_argument("--database", default=NEO4J_DATABASE)
+    ap.add_argument("--dry-run", action="store_true", help="nạp vào MemoryDriver, không cần Neo4j")
+    ap.add_argument("--admin-import", metavar="DIR", help="chỉ sinh file cho neo4j-admin database import")
+    args = ap.parse_args(argv)
+
+    if args.admin_import:
+        write_admin_import(args.admin_import)
+        return
+
+    if args.dry_run:
+        driver = MemoryDriver()
+    else:
+        from neo4j import GraphDatabase
+        driver = GraphDatabase.driver(args.uri, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        load(driver, batch_size=args.batch_size, workers=max(1, args.workers), create=args.create,
+             database=args.database)
+    finally:
+        driver.close()
+    if args.dry_run:
+        driver.report()
+        if driver.conflicts:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main_entry("load", main)
@@ -0,0 +1,190 @@
+import os, re, json, threading
+from archive import request_key
+from fetch_engine import ENGINE, get_page
+from http_client import http_get
+
+# =============================
+# Tải qua MediaWiki API thay vì cả trang HTML
+#   - query: metadata (revid, displaytitle, redirect) cho tối đa 50 title/request
+#   - parse&section=N: chỉ HTML của 1 mục (infobox = mục 0, đội hình, danh sách HLV...)
+#   - EPL_API_URL trỏ sang server giả lập cục bộ để chạy thử (bench/mediawiki_stub.py)
+#   - EPL_FETCH_MODE=api (hoặc --api ở crawler) bật chế độ tải theo mục; mặc định html như trước (không gọi API
+#     để phân giải title: thử lần lượt /wiki/<title> ứng viên, trang tải về dùng lại qua page cache)
+#   - đổi lại: mỗi trang cần mục lục + mục (2–3 request thay cho 1 trang HTML) → giảm byte, không giảm số request;
+#     số request chỉ giảm ở metadata (50 title/query, displaytitle thay cho tải cả trang mùa giải)
+# =============================
+API_URL = os.environ.get("EPL_API_URL", "https://en.wikipedia.org/w/api.php")
+BASE_URL = "https://en.wikipedia.org/wiki/{}"
+BATCH_TITLES = 50      # giới hạn titles/request của MediaWiki API cho client thường
+FETCH_MODE = os.environ.get("EPL_FETCH_MODE", "html").lower()
+
+_TAGS = re.compile(r"<[^>]+>")
+_titles = {}           # khoá (CLB, ...) → title chuẩn đã phân giải
+_display = {}          # title → displaytitle
+_revids = {}           # title chuẩn → revid hiện tại (chỉ từ query_pages(cached=False): bản cache có thể đã cũ)
+_toc = {}              # (title, revid) → mục lục; 1 revision không đổi → dùng lại cho mọi mục của trang
+_lock = threading.Lock()
+
+def use_api(enabled=True):
+    global FETCH_MODE
+    if enabled:
+        FETCH_MODE = "api"
+
+def api_mode():
+    return FETCH_MODE == "api"
+
+def page_url(title):
+    return BASE_URL.format(title.replace(" ", "_"))
+
+def api_get(params, cached=True):
+    """GET api.php (JSON, formatversion=2). cached=True đi qua page cache/engine; False luôn hỏi server (revid)."""
+    params = dict(params, format="json", formatversion=2)
+    if cached:
+        res = get_page(request_key(API_URL, params), timeout=30)
+    else:
+        res = http_get(API_URL, params=params, timeout=30)
+    res.raise_for_status()
+    data = json.loads(res.content)
+    if "error" in data:
+        raise ValueError(f"MediaWiki API: {data['error'].get('info', data['error'])}")
+    return data
+
+# ---------- query: nhiều title / request ----------
+def query_pages(titles, cached=True):
+    """{title_đầu_vào: {"title", "revid", "missing", "displaytitle"}} — theo normalized + redirects."""
+    titles = list(dict.fromkeys(titles))
+    result = {}
+    for i in range(0, len(titles), BATCH_TITLES):
+        batch = titles[i:i + BATCH_TITLES]
+        data = api_get({"action": "query", "prop": "revisions|info", "rvprop": "ids", "inprop": "displaytitle",
+                        "redirects": 1, "titles": "|".join(batch)}, cached=cached).get("query", {})
+
+        # title đầu vào → title chuẩn (normalized → redirect)
+        alias = {t: t for t in batch}
+        for key in ("normalized", "redirects"):
+            step = {x["from"]: x["to"] for x in data.get(key, [])}
+            alias = {t: step.get(a, a) for t, a in alias.items()}
+
+        pages = {}
+        for page in data.get("pages", []):
+            missing = bool(page.get("missing") or page.get("invalid"))
+            revs = page.get("revisions") or []
+            pages[page["title"]] = {"title": page["title"], "missing": missing,
+                                    "revid": None if missing or not revs else revs[0]["revid"],
+                                    "displaytitle": _TAGS.sub("", page.get("displaytitle", page["title"]))}
+        for t in batch:
+            result[t] = pages.get(alias[t], {"title": alias[t], "missing": True, "revid": None, "displaytitle": t})
+        if not cached:
+            with _lock:
+                _revids.update((p["title"], p["revid"]) for p in pages.values() if p["revid"])
+    return result
+
+def resolve_titles(candidates):
+    """{khoá: [title thử lần lượt]} → {khoá: title chuẩn đầu tiên tồn tại (hoặc None)}; 1 lô query cho tất cả."""
+    info = query_pages([t for ts in candidates.values() for t in ts])
+    out = {}
+    for key, ts in candidates.items():
+        out[key] = next((info[t]["title"] for t in ts if not info[t]["missing"]), None)
+    return out
+
+def club_candidates(club_name):
+    # thay cho bảng special_cases + thử lại bỏ "_F.C." khi 404: để API chọn title tồn tại (theo redirect)
+    return [f"{club_name} F.C.", f"AFC {club_name}", club_name]
+
+def probe_title(candidates):
+    """Chế độ HTML (không gọi API): title đầu tiên mà /wiki/<title> trả 200; trang đã tải nằm sẵn trong page cache."""
+    for t in candidates:
+        try:
+            if get_page(page_url(t), timeout=20).status_code == 200:
+                return t
+        except Exception:
+            pass
+    return None
+
+def prefetch_club_titles(club_names):
+    names = [n for n in dict.fromkeys(club_names) if ("club", n) not in _titles]
+    if not names:
+        return
+    if not api_mode():
+        jobs = [(club_candidates(n),) for n in names]
+        found = ENGINE.run(probe_title, jobs) if len(jobs) > 1 else [probe_title(*jobs[0])]
+        resolved = dict(zip(names, found))
+    else:
+        try:
+            resolved = resolve_titles({n: club_candidates(n) for n in names})
+        except Exception as e:
+            print(f"⚠️  Không phân giải được title CLB qua API: {e}")
+            resolved = {}
+    with _lock:
+        for n in names:
+            _titles[("club", n)] = resolved.get(n) or club_candidates(n)[0]
+
+def club_title(club_name):
+    """Title trang Wikipedia của CLB ("Arsenal" → "Arsenal F.C.", "Bournemouth" → "AFC Bournemouth")."""
+    if ("club", club_name) not in _titles:
+        prefetch_club_titles([club_name])
+    return _titles[("club", club_name)]
+
+def prefetch_display_titles(titles):
+    todo = [t for t in titles if t not in _display]
+    if todo:
+        info = query_pages(todo)
+        with _lock:
+            for t in todo:
+                _display[t] = None if info[t]["missing"] else info[t]["displaytitle"]
+
+def display_title(title):
+    """Tiêu đề hiển thị (chính là <h1> của trang) mà không phải tải trang."""
+    prefetch_display_titles([title])
+    return _display[title]
+
+def revision_at(title, timestamp):
+    """revid của bản sửa cuối cùng trước `timestamp` (ISO 8601), hoặc None. Bản cũ không đổi → cache an toàn."""
+    data = api_get({"action": "query", "prop": "revisions", "titles": title, "rvprop": "ids", "rvlimit": 1,
+                    "rvdir": "older", "rvstart": timestamp, "redirects": 1})
+    pages = data.get("query", {}).get("pages", [])
+    revs = (pages[0].get("revisions") or []) if pages else []
+    return revs[0]["revid"] if revs else None
+
+# ---------- parse: chỉ tải mục cần ----------
+def _page_params(title, oldid=None):
+    # oldid → ghim đúng 1 revision (đội hình mùa cũ); không có thì revid hiện tại nếu query_pages đã biết
+    # (mục lục + mục cùng 1 revision, cache theo revision), cuối cùng mới là bản hiện tại của title
+    oldid = oldid or _revids.get(title)
+    return {"oldid": oldid} if oldid else {"page": title, "redirects": 1}
+
+def sections(title, oldid=None):
+    """Mục lục của trang; cache theo (title, revid) → mỗi revision chỉ hỏi 1 lần."""
+    hit = _toc.get((title, oldid or _revids.get(title)))
+    if hit is not None:
+        return hit
+    data = api_get({"action": "parse", "prop": "sections", **_page_params(title, oldid)})
+    toc = data.get("parse", {}).get("sections", [])
+    with _lock:
+        _toc[(title, oldid or _revids.get(title))] = toc
+    return toc
+
+def find_section(title, pattern, toc=None):
+    """Chỉ số mục đầu tiên có tiêu đề (hoặc anchor) khớp `pattern`, hoặc None."""
+    pattern = re.compile(pattern, re.I) if isinstance(pattern, str) else pattern
+    for s in (sections(title) if toc is None else toc):
+        if pattern.search(_TAGS.sub("", s.get("line", ""))) or pattern.search(s.get("anchor", "")):
+            return s["index"]
+    return None
+
+def _text_params(title, oldid=None):
+    return {"action": "parse", "disableeditsection": 1, "disablelimitreport": 1, "disabletoc": 1,
+            **_page_params(title, oldid)}
+
+def section_html(title, section=None, oldid=None):
+    """HTML (bytes) của 1 mục; section=None → cả nội dung bài (vẫn nhẹ hơn trang HTML đầy đủ)."""
+    params = dict(_text_params(title, oldid), prop="text")
+    if section is not None:
+        params["section"] = section
+    return api_get(params).get("parse", {}).get("text", "").encode("utf-8")
+
+def sections_html(title, *patterns):
+    """Ghép HTML của các mục khớp từng pattern; None nếu không khớp mục nào."""
+    toc = sections(title)
+    parts = [section_html(title, idx) for idx in (find_section(title, p, toc) for p in patterns) if idx is not None]
+    return b"\n".join(parts) if parts else None
@@ -0,0 +1,303 @@
+import os, re, sys, json, time, atexit, functools, threading, contextlib
+
+# =============================
+# Số liệu + profiling dùng chung cho ETL và code đồ thị (chỉ thư viện chuẩn)
+#   - timed(kind)  : decorator ghi thời gian mỗi lời gọi (+ số dòng) theo hàm
+#       kind = fetch (get_*) | parse | build (build_*) | query | load
+#   - stage(name)  : khối lệnh có tên (1 script / 1 bước lớn); EPL_PROFILE bật cProfile/tracemalloc cho nó
+#   - REGISTRY.inc / observe: counter và summary tự do (bytes HTTP, latency, ...)
+# Xuất ra:
+#   EPL_METRICS=../data/metrics      → <dir>/<tên script>.json + .prom (Prometheus text) khi thoát
+#   EPL_PROFILE=all | players,load_graph | cpu:players | mem:all
+#       → EPL_PROFILE_DIR (mặc định ../data/profiles): <stage>.prof (cProfile), <stage>.txt (top hàm),
+#         <stage>.mem.txt (top cấp phát tracemalloc)
+#   <script có main_entry> --profile → in bảng thời gian theo hàm / stage khi xong (EPL_METRICS cũng bật bảng này)
+#   python etl/metrics.py run crawl_players.py --incremental   # bọc cả script mà không sửa code
+# =============================
+METRICS_DIR = os.environ.get("EPL_METRICS", "")
+PROFILE = os.environ.get("EPL_PROFILE", "")
+PROFILE_DIR = os.environ.get("EPL_PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "data", "profiles"))
+PROFILE_TOP = int(os.environ.get("EPL_PROFILE_TOP", 40))
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 10_000           # số mẫu giữ lại cho mỗi summary (tính phân vị)
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Summary:
+    __slots__ = ("count", "sum", "min", "max", "samples")
+
+    def __init__(self):
+        self.count, self.sum = 0, 0.0
+        self.min, self.max = float("inf"), float("-inf")
+        self.samples = []
+
+    def add(self, v):
+        self.count += 1
+        self.sum += v
+        self.min = min(self.min, v)
+        self.max = max(self.max, v)
+        if len(self.samples) < WINDOW:
+            self.samples.append(v)
+        else:                                    # giữ mẫu đều trên cả lượt chạy
+            self.samples[self.count % WINDOW] = v
+
+    def quantile(self, q):
+        if not self.samples:
+            return 0.0
+        xs = sorted(self.samples)
+        return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))]
+
+    def as_dict(self):
+        d = {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else 0.0,
+             "min": self.min if self.count else 0.0, "max": self.max if self.count else 0.0}
+        d.update({f"p{int(q * 100)}": self.quantile(q) for q in QUANTILES})
+        return d
+
+class Registry:
+    def __init__(self):
+        self.counters = {}
+        self.summaries = {}
+        self.help = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            s = self.summaries.get(key)
+            if s is None:
+                s = self.summaries[key] = Summary()
+            s.add(value)
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.summaries.clear()
+
+    # ---------- xuất ----------
+    def as_dict(self):
+        with self._lock:
+            return {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                    "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self.counters.items()],
+                    "summaries": [{"name": n, "labels": dict(l), **s.as_dict()}
+                                  for (n, l), s in self.summaries.items()]}
+
+    def to_prometheus(self, prefix="epl_"):
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+        def metric(n):
+            return prefix + re.sub(r"[^a-zA-Z0-9_]", "_", n)
+
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                m = metric(name)
+                lines.append(f"# HELP {m} {self.help.get(name, name)}")
+                lines.append(f"# TYPE {m} counter")
+                for (n, l), v in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{m}{fmt(l)} {v}")
+            for name in sorted({n for n, _ in self.summaries}):
+                m = metric(name)
+                lines.append(f"# HELP {m} {self.help.get(name, name)}")
+                lines.append(f"# TYPE {m} summary")
+                for (n, l), s in sorted(self.summaries.items()):
+                    if n != name:
+                        continue
+                    for q in QUANTILES:
+                        lines.append(f"{m}{fmt(l, [('quantile', q)])} {s.quantile(q):.9g}")
+                    lines.append(f"{m}_sum{fmt(l)} {s.sum:.9g}")
+                    lines.append(f"{m}_count{fmt(l)} {s.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, out_dir=None, name=None):
+        """Ghi <out_dir>/<name>.json và .prom; trả về (đường dẫn json, prom)."""
+        out_dir = out_dir or METRICS_DIR
+        name = name or _script_name()
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, name)
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=1)
+        with open(base + ".prom", "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        return base + ".json", base + ".prom"
+
+    def report(self, kinds=("stage", "fetch", "parse", "build", "load", "query")):
+        rows = [(dict(l), s) for (n, l), s in self.summaries.items() if n.endswith("_seconds")
+                and dict(l).get("kind", n.split("_")[0]) in kinds]
+        if not rows:
+            return
+        print("📊 Thời gian theo hàm / stage:")
+        for l, s in sorted(rows, key=lambda x: -x[1].sum):
+            what = l.get("fn") or l.get("stage") or "?"
+            print(f"   {l.get('kind', 'stage'):<6} {what:<32} {s.count:>6}×  tổng {s.sum:8.2f}s  "
+                  f"p50 {s.quantile(.5) * 1000:8.1f} ms  p95 {s.quantile(.95) * 1000:8.1f} ms")
+
+REGISTRY = Registry()
+REGISTRY.describe("call_seconds", "Thời gian mỗi lời gọi hàm được đo (label kind/fn)")
+REGISTRY.describe("rows_total", "Số dòng hàm trả về (parse/build/fetch)")
+REGISTRY.describe("stage_seconds", "Thời gian mỗi stage")
+REGISTRY.describe("http_request_seconds", "Độ trễ HTTP (không tính lần đọc từ cache/archive)")
+REGISTRY.describe("http_bytes_total", "Số byte body đã tải")
+REGISTRY.describe("http_wire_bytes_total", "Số byte thật trên đường truyền (sau nén)")
+REGISTRY.describe("http_requests_total", "Số request HTTP (label ok)")
+REGISTRY.describe("peak_memory_bytes", "Đỉnh bộ nhớ Python (tracemalloc) của stage được profile")
+
+def _script_name():
+    return os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+
+def count_rows(result):
+    """Đếm dòng của kết quả thường gặp: list/DataFrame/dict {"rows": n}/tuple (lấy phần tử đầu)."""
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return int(result.get("rows", 0) or 0)
+    if isinstance(result, tuple) and result:
+        return count_rows(result[0])
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+def timed(kind, name=None, rows=count_rows, registry=REGISTRY):
+    """Decorator: call_seconds{kind, fn} + rows_total{kind, fn} (rows=None → không đếm)."""
+    def deco(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                registry.inc("errors_total", kind=kind, fn=label)
+                raise
+            finally:
+                registry.observe("call_seconds", time.perf_counter() - t0, kind=kind, fn=label)
+            if rows is not None:
+                registry.inc("rows_total", rows(result), kind=kind, fn=label)
+            return result
+        return wrapper
+    return deco
+
+# ---------- profiling ----------
+def _profile_modes(name):
+    """EPL_PROFILE → tập {"cpu", "mem"} cho stage `name` (rỗng = tắt)."""
+    modes = set()
+    for part in filter(None, (p.strip() for p in PROFILE.split(","))):
+        mode, _, target = part.rpartition(":") if ":" in part else ("cpu+mem", "", part)
+        if target in ("all", "1", name):
+            modes |= {"cpu", "mem"} if mode == "cpu+mem" else {mode}
+    return modes
+
+@contextlib.contextmanager
+def profiled(name, modes=None, out_dir=None):
+    modes = _profile_modes(name) if modes is None else set(modes)
+    if not modes:
+        yield
+        return
+    import cProfile, pstats, io, tracemalloc
+    out_dir = out_dir or PROFILE_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, re.sub(r"[^\w.-]", "_", name))
+    prof = cProfile.Profile() if "cpu" in modes else None
+    started_tm = "mem" in modes and not tracemalloc.is_tracing()
+    if started_tm:
+        tracemalloc.start(25)
+    if prof:
+        prof.enable()
+    try:
+        yield
+    finally:
+        if prof:
+            prof.disable()
+            prof.dump_stats(base + ".prof")
+            buf = io.StringIO()
+            pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(buf.getvalue())
+        if "mem" in modes:
+            snap = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            with open(base + ".mem.txt", "w", encoding="utf-8") as f:
+                f.write(f"current {current / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB\n")
+                for st in snap.statistics("lineno")[:PROFILE_TOP]:
+                    f.write(f"{st}\n")
+            REGISTRY.observe("peak_memory_bytes", peak, stage=name)
+            if started_tm:
+                tracemalloc.stop()
+        print(f"🔬 Profile {name} → {base}.*")
+
+@contextlib.contextmanager
+def stage(name, registry=REGISTRY):
+    """stage_seconds{stage} + profiling nếu EPL_PROFILE chọn stage này."""
+    with profiled(name), registry.timer("stage_seconds", stage=name):
+        yield
+
+def main_entry(name, main):
+    """Chạy main() trong stage(name); in bảng thời gian + xuất số liệu chỉ khi có EPL_METRICS hoặc cờ --profile."""
+    show = bool(METRICS_DIR)
+    if "--profile" in sys.argv[1:]:
+        sys.argv.remove("--profile")           # main() tự parse sys.argv, không biết cờ này
+        show = True
+    try:
+        with stage(name):
+            return main()
+    finally:
+        if show:
+            REGISTRY.report()
+        if METRICS_DIR:
+            js, prom = REGISTRY.export(name=name)
+            _export_at_exit.done = True
+            print(f"📈 Số liệu → {js}, {prom}")
+
+@atexit.register
+def _export_at_exit():
+    # script không đi qua main_entry (vd. chạy bằng `metrics.py run`) vẫn được xuất
+    if METRICS_DIR and (REGISTRY.counters or REGISTRY.summaries) and not getattr(_export_at_exit, "done", False):
+        REGISTRY.export()
+
+def _run(argv):
+    """python metrics.py run <script.py> [args...] — chạy script như __main__ trong stage + profiling."""
+    import runpy
+    script, rest = argv[0], argv[1:]
+    name = os.path.splitext(os.path.basename(script))[0]
+    sys.argv = [script] + rest
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    try:
+        with stage(name):
+            runpy.run_path(script, run_name="__main__")
+    finally:
+        if not getattr(_export_at_exit, "done", False):     # script tự gọi main_entry → đã báo cáo
+            REGISTRY.report()
+            if METRICS_DIR:
+                REGISTRY.export(name=name)
+                _export_at_exit.done = True
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "run":
+        sys.exit("Cách dùng: python metrics.py run <script.py> [tham số...]   (EPL_PROFILE=all để profile)")
+    import metrics                  # dùng chung REGISTRY với module `metrics` mà script import
+    metrics._run(sys.argv[2:])
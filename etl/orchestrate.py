@@ -0,0 +1,244 @@
+import os, sys, json, time, hashlib, argparse, subprocess, threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# =============================
+# Chạy cả pipeline ETL theo DAG (gọi được từ bất kỳ thư mục nào)
+#   python etl/orchestrate.py [--force players] [--only build_relations] [--skip load] [--dry-run]
+#                             [--load-args="--dry-run"] [--dump enwiki-…-pages-articles.xml.bz2]
+#   seasons → clubs → {players, coaches} → resolve → build_relations → load
+# Mỗi stage khai báo input (code + file dữ liệu) và output. Stage được bỏ qua khi hash nội dung
+# input (+ tham số) khớp lần chạy thành công trước và output vẫn còn nguyên; players và coaches
+# chạy song song. Trạng thái lưu ở data/.etl_state.json.
+# Input của crawler còn là Wikipedia (không hash được) → với --incremental các stage crawl luôn chạy:
+# crawler tự so revision trong manifest và chỉ tải lại trang đã đổi.
+# =============================
+ETL_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(ETL_DIR), "data")
+STATE_PATH = os.environ.get("EPL_ETL_STATE", os.path.join(DATA_DIR, ".etl_state.json"))
+WORKERS = int(os.environ.get("EPL_ETL_WORKERS", 2))
+
+# stage đọc Wikipedia: không bỏ qua khi --incremental (xem up_to_date)
+CRAWL_STAGES = {"seasons", "clubs", "players", "coaches"}
+
+# module dùng chung của các crawler: đổi → mọi crawler chạy lại
+CRAWL_LIB = ["archive.py", "http_client.py", "page_cache.py", "fetch_engine.py", "pipeline.py", "html_tables.py",
+             "revisions.py", "mediawiki_api.py", "fetch_plan.py", "ids.py", "checkpoint.py",
+             "metrics.py", "table_normalize.py", "wikitext.py", "ingest_dump.py"]
+
+def _data(*parts):
+    return os.path.join("data", *parts)
+
+# output của entity_resolution.py (nodes + relations đã gộp ID, bảng alias)
+RESOLVED = [_data("resolved", "nodes", "players.csv"), _data("resolved", "nodes", "coaches.csv"),
+            _data("resolved", "relations", "played_for.csv"), _data("resolved", "relations", "coached.csv"),
+            _data("resolved", "aliases.csv")]
+
+# name: (script, deps, input, output) — đường dẫn data/... tính từ gốc repo, code tính từ etl/
+STAGES = {
+    "seasons": ("crawl_seasons.py", [], [],
+                [_data("nodes", "seasons.csv")]),
+    "clubs": ("crawl_clubs.py", ["seasons"], [],
+              [_data("nodes", "clubs.csv"), _data("relations", "clubs_by_season.csv")]),
+    "players": ("crawl_players.py", ["clubs"],
+                [_data("nodes", "clubs.csv"), _data("relations", "clubs_by_season.csv")],
+                [_data("nodes", "players.csv"), _data("relations", "played_for.csv")]),
+    "coaches": ("crawl_coaches.py", ["clubs"],
+                [_data("nodes", "clubs.csv")],
+                [_data("nodes", "coaches.csv"), _data("relations", "coached.csv")]),
+    "resolve": ("entity_resolution.py", ["players", "coaches"],
+                [_data("nodes", f) for f in ("players.csv", "coaches.csv")]
+                + [_data("relations", f) for f in ("played_for.csv", "coached.csv")],
+                RESOLVED),
+    "build_relations": ("build_relations.py", ["seasons", "players", "coaches", "resolve"],
+                        [_data("nodes", f) for f in ("clubs.csv", "players.csv", "coaches.csv", "seasons.csv")]
+                        + [_data("relations", f) for f in ("clubs_by_season.csv", "played_for.csv", "coached.csv")]
+                        + RESOLVED,
+                        [_data("edges", f) for f in ("part_of.csv", "played_for.csv", "coached.csv")]),
+    "load": ("load_neo4j.py", ["build_relations"],
+             [_data("nodes", f) for f in ("clubs.csv", "players.csv", "coaches.csv", "seasons.csv")]
+             + [_data("edges", f) for f in ("part_of.csv", "played_for.csv", "coached.csv")] + RESOLVED[:2],
+             []),
+}
+CODE = {
+    "seasons": CRAWL_LIB,
+    "clubs": CRAWL_LIB,
+    "players": CRAWL_LIB,
+    "coaches": CRAWL_LIB,
+    "resolve": ["metrics.py"],
+    "build_relations": ["columnar_store.py", "entity_resolution.py", "metrics.py"],
+    "load": ["entity_resolution.py", "metrics.py"],
+}
+
+# ---------- hash ----------
+def file_hash(path, chunk=1 << 20):
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _root(path):
+    return os.path.join(os.path.dirname(ETL_DIR), path)
+
+def input_hash(name, args):
+    """Hash gộp: code của stage + module dùng chung + file input + tham số dòng lệnh."""
+    script, _, inputs, _ = STAGES[name]
+    h = hashlib.sha1(json.dumps(args).encode("utf-8"))
+    for a in args:
+        # file truyền qua tham số (dump Wikipedia hàng chục GB): hash theo kích thước + mtime thay vì nội dung
+        if os.path.isfile(a):
+            st = os.stat(a)
+            h.update(f"{a}:{st.st_size}:{int(st.st_mtime)}".encode("utf-8"))
+    for f in [script] + CODE[name]:
+        h.update(f"{f}:{file_hash(os.path.join(ETL_DIR, f))}".encode("utf-8"))
+    for f in inputs:
+        h.update(f"{f}:{file_hash(_root(f))}".encode("utf-8"))
+    return h.hexdigest()
+
+def output_hashes(name):
+    return {f: file_hash(_root(f)) for f in STAGES[name][3]}
+
+# ---------- trạng thái ----------
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def up_to_date(name, state, args):
+    if name in CRAWL_STAGES and "--incremental" in args:
+        return False
+    prev = state.get(name)
+    if not prev or prev.get("input_hash") != input_hash(name, args):
+        return False
+    outs = output_hashes(name)
+    return all(h is not None for h in outs.values()) and outs == prev.get("outputs", {})
+
+# ---------- chạy ----------
+_print_lock = threading.Lock()
+
+def run_stage(name, args):
+    """Chạy script của stage trong etl/ (đường dẫn ../data của script vẫn đúng), in log kèm tiền tố."""
+    cmd = [sys.executable, "-u", STAGES[name][0]] + args
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ETL_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, encoding="utf-8", errors="replace")
+    for line in proc.stdout:
+        with _print_lock:
+            print(f"[{name}] {line}", end="")
+    return proc.wait(), time.perf_counter() - t0
+
+def order(stages):
+    """Thứ tự topo (giữ thứ tự khai báo khi hoà)."""
+    done, out = set(), []
+    def visit(n):
+        if n in done:
+            return
+        for d in STAGES[n][1]:
+            visit(d)
+        done.add(n)
+        out.append(n)
+    for n in stages:
+        visit(n)
+    return out
+
+def run(selected, stage_args, force=(), workers=WORKERS, dry_run=False, state_path=STATE_PATH):
+    state = load_state(state_path)
+    selected = [n for n in order(STAGES) if n in selected]
+    status, timings = {}, {}
+    pending = list(selected)
+    running = {}
+    t_start = time.perf_counter()
+
+    def ready(n):
+        # stage ngoài lựa chọn coi như đã xong (dùng output hiện có)
+        return all(status.get(d, "skipped" if d not in selected else None) in ("ran", "skipped", "planned")
+                   for d in STAGES[n][1])
+
+    def blocked(n):
+        return any(status.get(d) in ("failed", "blocked") for d in STAGES[n][1])
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        while pending or running:
+            for n in list(pending):
+                if blocked(n):
+                    status[n] = "blocked"
+                    pending.remove(n)
+                elif ready(n):
+                    pending.remove(n)
+                    args = stage_args.get(n, [])
+                    if n not in force and up_to_date(n, state, args):
+                        status[n], timings[n] = "skipped", 0.0
+                        print(f"⏭️  {n}: input không đổi → bỏ qua")
+                    elif dry_run:
+                        status[n], timings[n] = "planned", 0.0
+                        print(f"📝 {n}: sẽ chạy {STAGES[n][0]} {' '.join(args)}")
+                    else:
+                        print(f"▶️  {n}: {STAGES[n][0]} {' '.join(args)}")
+                        running[ex.submit(run_stage, n, args)] = (n, args, input_hash(n, args))
+            if not running:
+                if pending and not any(ready(n) or blocked(n) for n in pending):
+                    raise RuntimeError(f"DAG kẹt ở: {pending}")
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                n, args, ih = running.pop(fut)
+                code, secs = fut.result()
+                timings[n] = secs
+                if code == 0:
+                    status[n] = "ran"
+                    state[n] = {"input_hash": ih, "outputs": output_hashes(n), "args": args,
+                                "seconds": round(secs, 3), "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+                    save_state(state, state_path)
+                    print(f"✅ {n}: xong trong {secs:.1f}s")
+                else:
+                    status[n] = "failed"
+                    print(f"❌ {n}: thoát mã {code} sau {secs:.1f}s")
+
+    report(selected, status, timings, time.perf_counter() - t_start)
+    return status
+
+def report(selected, status, timings, wall):
+    icons = {"ran": "✅", "skipped": "⏭️ ", "planned": "📝", "failed": "❌", "blocked": "⛔"}
+    print("\n⏱️  Thời gian theo stage:")
+    for n in selected:
+        s = status.get(n, "blocked")
+        print(f"  {icons[s]} {n:<16} {s:<8} {timings.get(n, 0.0):8.1f}s")
+    print(f"  {'tổng (wall)':<19} {'':<8} {wall:8.1f}s  (tổng tuần tự {sum(timings.values()):.1f}s)")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Chạy pipeline ETL EPL theo DAG")
+    ap.add_argument("--only", nargs="+", choices=list(STAGES), help="chỉ chạy các stage này")
+    ap.add_argument("--skip", nargs="+", choices=list(STAGES), default=[], help="bỏ các stage này")
+    ap.add_argument("--force", nargs="*", choices=list(STAGES), default=None,
+                    help="chạy lại dù input không đổi (không kèm tên = mọi stage)")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="số stage chạy song song tối đa")
+    ap.add_argument("--dry-run", action="store_true", help="chỉ in stage nào sẽ chạy / bỏ qua")
+    ap.add_argument("--incremental", action="store_true", help="truyền --incremental cho các crawler")
+    ap.add_argument("--api", action="store_true", help="truyền --api cho các crawler")
+    ap.add_argument("--seasons", help="truyền --seasons cho crawl_seasons / crawl_clubs / crawl_players")
+    ap.add_argument("--dump", help="clubs / players / coaches đọc từ dump Wikipedia thay vì crawl (ingest_dump.py)")
+    ap.add_argument("--load-args", default="", help='tham số cho load_neo4j.py, vd. --load-args="--dry-run"')
+    args = ap.parse_args(argv)
+
+    crawl = (["--incremental"] if args.incremental else []) + (["--api"] if args.api else [])
+    seasons = ["--seasons", args.seasons] if args.seasons else []
+    dump = ["--dump", os.path.abspath(args.dump)] if args.dump else []
+    stage_args = {"seasons": crawl + seasons, "clubs": crawl + seasons + dump, "players": crawl + seasons + dump,
+                  "coaches": crawl + dump, "resolve": [], "build_relations": [], "load": args.load_args.split()}
+    selected = [n for n in (args.only or STAGES) if n not in args.skip]
+    force = set(STAGES) if args.force == [] else set(args.force or ())
+    status = run(selected, stage_args, force=force, workers=args.workers, dry_run=args.dry_run)
+    sys.exit(1 if any(s in ("failed", "blocked") for s in status.values()) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import os, time, gzip, hashlib, sqlite3, threading
+import requests
+from http_client import http_get
+from archive import ARCHIVE
+
+# =============================
+# Cấu hình cache
+# =============================
+CACHE_DIR = os.environ.get("EPL_CACHE_DIR", os.path.join("..", ".cache", "pages"))
+CACHE_TTL = float(os.environ.get("EPL_CACHE_TTL", 7 * 24 * 3600))         # giây
+CACHE_MAX_BYTES = int(float(os.environ.get("EPL_CACHE_MAX_MB", 512)) * 1024 * 1024)
+CACHEABLE_STATUS = (200, 404)
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+class CachedResponse:
+    """Đối tượng tối giản giống requests.Response (status_code/content/text/headers)."""
+
+    def __init__(self, url, status_code, content, headers=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content or b""
+        self.headers = dict(headers or {})
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+class PageCache:
+    """Cache trang trên đĩa, lưu theo nội dung (sha256) và nén gzip.
+
+    - Chỉ mục SQLite: url → digest, ETag, Last-Modified, thời điểm tải / truy cập.
+    - Blob: <dir>/blobs/<2 ký tự đầu>/<digest>.gz, nhiều URL có thể dùng chung 1 blob.
+    - Hết TTL → gửi request có điều kiện (If-None-Match / If-Modified-Since), 304 thì dùng lại blob.
+    - Vượt dung lượng → xoá theo LRU (accessed_at cũ nhất trước).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stale": 0,
+                      "stored": 0, "evicted": 0, "bytes_from_cache": 0, "bytes_from_network": 0}
+        self._lock = threading.Lock()
+        self._db = None
+
+    # ---------- chỉ mục ----------
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.join(self.cache_dir, "blobs"), exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"),
+                                 timeout=30, check_same_thread=False)
+            db.execute("""CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY, digest TEXT, status INTEGER,
+                etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL)""")
+            db.execute("CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER)")
+            db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages(accessed_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, "blobs", digest[:2], digest + ".gz")
+
+    def _read_blob(self, digest):
+        with gzip.open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    def _write_blob(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(content)
+            os.replace(tmp, path)
+        self._conn().execute("INSERT OR REPLACE INTO blobs(digest, size) VALUES (?, ?)",
+                             (digest, os.path.getsize(path)))
+        return digest
+
+    def _drop_blob(self, db, digest):
+        """Xoá blob nếu không còn trang nào trỏ tới; trả về số byte giải phóng (gọi khi đang giữ _lock)."""
+        if db.execute("SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return 0
+        size = db.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._blob_path(digest))
+        except OSError:
+            pass
+        return size[0] if size else 0
+
+    def _count(self, **deltas):
+        # nhiều fetcher thread cùng cập nhật → cộng dưới lock
+        with self._lock:
+            for k, v in deltas.items():
+                self.stats[k] += v
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT digest, status, etag, last_modified, fetched_at FROM pages WHERE url = ?",
+                (url,)).fetchone()
+        if not row:
+            return None
+        return dict(zip(["digest", "status", "etag", "last_modified", "fetched_at"], row))
+
+    def is_fresh(self, url):
+        entry = self.lookup(url)
+        return bool(entry) and time.time() - entry["fetched_at"] < self.ttl
+
+    def expire(self, url):
+        """Đánh dấu hết hạn: lần get sau sẽ revalidate (vẫn giữ blob để nhận 304)."""
+        with self._lock:
+            self._conn().execute("UPDATE pages SET fetched_at = 0 WHERE url = ?", (url,))
+            self._conn().commit()
+
+    def _load(self, url, entry):
+        try:
+            content = self._read_blob(entry["digest"])
+        except (OSError, EOFError):
+            # blob bị xoá / hỏng → coi như miss
+            with self._lock:
+                self._conn().execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._conn().commit()
+            return None
+        with self._lock:
+            self._conn().execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn().commit()
+        self._count(bytes_from_cache=len(content))
+        return CachedResponse(url, entry["status"], content, from_cache=True)
+
+    def store(self, url, status, content, etag=None, last_modified=None):
+        ts = time.time()
+        with self._lock:
+            db = self._conn()
+            old = db.execute("SELECT digest FROM pages WHERE url = ?", (url,)).fetchone()
+            digest = self._write_blob(content)
+            db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       (url, digest, status, etag, last_modified, ts, ts))
+            if old and old[0] != digest:
+                # nội dung URL đã đổi → blob cũ có thể không còn ai dùng
+                self._drop_blob(db, old[0])
+            db.commit()
+            self.stats["stored"] += 1
+        self.evict()
+
+    def _touch_fetched(self, url):
+        with self._lock:
+            ts = time.time()
+            self._conn().execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?", (ts, ts, url))
+            self._conn().commit()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn().execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        """Xoá các trang ít được truy cập nhất cho tới khi tổng dung lượng ≤ max_bytes."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            db = self._conn()
+            # blob mồ côi (trang trỏ sang digest khác / bị xoá khi blob hỏng) vẫn nằm trong SUM(size)
+            for (digest,) in db.execute("SELECT digest FROM blobs WHERE digest NOT IN "
+                                        "(SELECT digest FROM pages)").fetchall():
+                self._drop_blob(db, digest)
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= limit:
+                db.commit()
+                return 0
+            removed = 0
+            for url, digest in db.execute("SELECT url, digest FROM pages ORDER BY accessed_at ASC").fetchall():
+                if total <= limit:
+                    break
+                db.execute("DELETE FROM pages WHERE url = ?", (url,))
+                removed += 1
+                total -= self._drop_blob(db, digest)
+            db.commit()
+            self.stats["evicted"] += removed
+            return removed
+
+    # ---------- API chính ----------
+    def get(self, url, session=None, headers=None, timeout=20):
+        """Thay thế cho requests.get / session.get: đọc cache nếu còn hạn, nếu không thì tải lại."""
+        if ARCHIVE.mode and session is None:
+            # record/replay: bỏ qua cache để archive chứa (và trả về) đúng từng response
+            res = http_get(url, headers={**HEADERS, **(headers or {})}, timeout=timeout)
+            return CachedResponse(url, res.status_code, res.content, res.headers)
+        entry = self.lookup(url)
+        if entry and time.time() - entry["fetched_at"] < self.ttl:
+            res = self._load(url, entry)
+            if res is not None:
+                self._count(hits=1)
+                return res
+            entry = None
+
+        if entry and not os.path.exists(self._blob_path(entry["digest"])):
+            entry = None                  # không còn blob để dùng lại khi nhận 304 → gửi GET thường
+        req_headers = dict(HEADERS)
+        req_headers.update(headers or {})
+        if entry and entry["etag"]:
+            req_headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            req_headers["If-Modified-Since"] = entry["last_modified"]
+
+        send = session.get if session is not None else http_get
+        try:
+            res = send(url, headers=req_headers, timeout=timeout)
+        except requests.RequestException:
+            # mạng lỗi nhưng còn bản cũ → dùng tạm bản cũ
+            if entry:
+                stale = self._load(url, entry)
+                if stale is not None:
+                    self._count(stale=1)
+                    return stale
+            raise
+
+        if res.status_code == 304 and entry:
+            cached = self._load(url, entry)
+            if cached is not None:
+                self._touch_fetched(url)
+                self._count(revalidated=1)
+                return cached
+            # blob hỏng / bị xoá giữa chừng: 304 không kèm nội dung → tải lại không điều kiện
+            req_headers.pop("If-None-Match", None)
+            req_headers.pop("If-Modified-Since", None)
+            res = send(url, headers=req_headers, timeout=timeout)
+
+        self._count(misses=1, bytes_from_network=len(res.content))
+        if res.status_code in CACHEABLE_STATUS:
+            self.store(url, res.status_code, res.content,
+                       etag=res.headers.get("ETag"), last_modified=res.headers.get("Last-Modified"))
+        return CachedResponse(url, res.status_code, res.content, res.headers)
+
+    def hit_ratio(self):
+        total = self.stats["hits"] + self.stats["revalidated"] + self.stats["misses"]
+        return (self.stats["hits"] + self.stats["revalidated"]) / total if total else 0.0
+
+    def report(self):
+        s = self.stats
+        print(f"📦 Cache: {s['hits']} hit, {s['revalidated']} revalidated (304), {s['misses']} miss, "
+              f"{s['stale']} stale, {s['evicted']} evicted — hit ratio {self.hit_ratio():.0%}, "
+              f"{s['bytes_from_cache'] / 1e6:.1f} MB local / {s['bytes_from_network'] / 1e6:.1f} MB network")
+
+CACHE = PageCache()
@@ -0,0 +1,218 @@
+import os, time, queue, threading
+from concurrent.futures import ProcessPoolExecutor
+from fetch_engine import ENGINE
+from metrics import REGISTRY, count_rows
+
+# =============================
+# Cấu hình pipeline fetch → parse → write
+# =============================
+FETCHERS = int(os.environ.get("EPL_FETCHERS", 8))
+PARSERS = int(os.environ.get("EPL_PARSERS", os.cpu_count() or 2))
+QUEUE_SIZE = int(os.environ.get("EPL_QUEUE_SIZE", 16))
+POLL = 0.1            # giây: chu kỳ thread nền kiểm tra cờ dừng khi chờ hàng đợi
+
+class More:
+    """Parser cần thêm trang (vd. trang 'List of ... managers'): item quay lại tầng fetch với các khoá này."""
+
+    def __init__(self, wanted):
+        self.wanted = list(wanted)
+
+class _Failed:
+    def __init__(self, exc):
+        self.exc = exc
+
+def _timed_parse(parse, item, pages):
+    # chạy trong process worker → trả kèm thời gian CPU của riêng bước parse
+    t0 = time.perf_counter()
+    result = parse(item, pages)
+    return result, time.perf_counter() - t0
+
+def _put(q, job, stop):
+    """q.put nhưng bỏ cuộc khi `stop` được bật (hàng đợi đầy mà đầu ra đã dừng) → False."""
+    while not stop.is_set():
+        try:
+            q.put(job, timeout=POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _get(q, stop):
+    """q.get chờ tới khi có việc hoặc `stop` được bật (→ None)."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=POLL)
+        except queue.Empty:
+            pass
+    return None
+
+def _fn_name(fn):
+    return getattr(fn, "__name__", None) or type(fn).__name__
+
+class StageStats:
+    def __init__(self, name, workers, fn=None):
+        self.name = name
+        self.workers = workers
+        self.fn = fn or name
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.items += 1
+            self.busy += seconds
+        REGISTRY.observe("call_seconds", seconds, kind=self.name, fn=self.fn)
+
+    def line(self, wall):
+        rate = self.items / wall if wall else 0.0
+        util = self.busy / (wall * max(1, self.workers)) if wall else 0.0
+        return (f"   {self.name:<6} {self.items:>5} item  {self.busy:7.2f}s bận  "
+                f"{rate:6.2f} item/s  ({self.workers} worker, dùng {util:.0%})")
+
+class Pipeline:
+    """Pipeline 3 tầng với hàng đợi có giới hạn.
+
+    - fetch(item, wanted) → {khoá: bytes}: chạy trong `fetchers` thread (I/O), tải qua FetchEngine.
+      wanted = None ở lượt đầu, hoặc danh sách khoá trang mà parser yêu cầu thêm (More).
+    - parse(item, pages) → kết quả | More(urls): chạy trong ProcessPoolExecutor (`parsers` process);
+      phải là hàm top-level để pickle được. parsers=0 → parse ngay trong thread điều phối.
+    - write(item, kết quả): chạy tuần tự ở thread gọi `run()`.
+
+    `queue_size` giới hạn số trang đã tải đang chờ parse và số kết quả chờ ghi (backpressure):
+    fetcher bị chặn khi parser không theo kịp, nên bộ nhớ không phình theo số CLB.
+
+    Khi xong (hoặc write raise) cờ dừng được bật: mọi thread nền đang chờ hàng đợi đầy/rỗng
+    đều thoát sau tối đa POLL giây, nên lỗi ở writer được raise lại thay vì treo.
+    """
+
+    def __init__(self, fetch, parse, write, fetchers=FETCHERS, parsers=PARSERS,
+                 queue_size=QUEUE_SIZE, engine=ENGINE):
+        self.fetch = fetch
+        self.parse = parse
+        self.write = write
+        self.fetchers = max(1, fetchers)
+        self.parsers = max(0, parsers)
+        self.queue_size = max(1, queue_size)
+        self.engine = engine
+        # tên hàm của từng tầng làm label cho số liệu chung (metrics.py)
+        self.stats = {"fetch": StageStats("fetch", self.fetchers, _fn_name(fetch)),
+                      "parse": StageStats("parse", self.parsers or 1, _fn_name(parse)),
+                      "write": StageStats("write", 1, _fn_name(write))}
+        self.wall = 0.0
+
+    def _fetch_loop(self, in_q, parse_q, stop):
+        if self.engine is not None:
+            self.engine.bind()
+        while True:
+            job = _get(in_q, stop)
+            if job is None:
+                return
+            item, pages, wanted = job
+            t0 = time.perf_counter()
+            try:
+                pages = {**pages, **self.fetch(item, wanted)}
+            except Exception as e:
+                pages = _Failed(e)
+            self.stats["fetch"].add(time.perf_counter() - t0)
+            if not _put(parse_q, (item, pages), stop):
+                return
+
+    def _dispatch_loop(self, pool, in_q, parse_q, write_q, stop):
+        slots = threading.BoundedSemaphore(self.queue_size)
+
+        def finish(item, pages, result, seconds):
+            self.stats["parse"].add(seconds)
+            if isinstance(result, More):
+                in_q.put((item, pages, result.wanted))
+            else:
+                if not isinstance(result, _Failed):
+                    REGISTRY.inc("rows_total", count_rows(result), kind="parse", fn=self.stats["parse"].fn)
+                _put(write_q, (item, result), stop)
+
+        while True:
+            job = _get(parse_q, stop)
+            if job is None:
+                return
+            item, pages = job
+            if isinstance(pages, _Failed):
+                _put(write_q, (item, pages), stop)
+                continue
+            if pool is None:
+                try:
+                    result, seconds = _timed_parse(self.parse, item, pages)
+                except Exception as e:
+                    result, seconds = _Failed(e), 0.0
+                finish(item, pages, result, seconds)
+                continue
+
+            while not slots.acquire(timeout=POLL):
+                if stop.is_set():
+                    return
+            fut = pool.submit(_timed_parse, self.parse, item, pages)
+
+            def done(f, item=item, pages=pages):
+                slots.release()
+                try:
+                    result, seconds = f.result()
+                except Exception as e:
+                    result, seconds = _Failed(e), 0.0
+                finish(item, pages, result, seconds)
+            fut.add_done_callback(done)
+
+    def run(self, items):
+        items = list(items)
+        in_q = queue.Queue()
+        parse_q = queue.Queue(maxsize=self.queue_size)
+        write_q = queue.Queue(maxsize=self.queue_size)
+        for item in items:
+            in_q.put((item, {}, None))
+
+        pool = None
+        if self.parsers:
+            # fork toàn bộ worker trước khi có thread nền nào (tránh fork khi thread khác đang giữ lock)
+            pool = ProcessPoolExecutor(max_workers=self.parsers)
+            pool.submit(time.sleep, 0).result()
+        started_engine = self.engine is not None and not self.engine.running
+        if started_engine:
+            self.engine.start()
+        stop = threading.Event()
+        fetchers = [threading.Thread(target=self._fetch_loop, args=(in_q, parse_q, stop), daemon=True)
+                    for _ in range(self.fetchers)]
+        dispatcher = threading.Thread(target=self._dispatch_loop, args=(pool, in_q, parse_q, write_q, stop),
+                                      daemon=True)
+        for t in fetchers + [dispatcher]:
+            t.start()
+
+        t_start = time.perf_counter()
+        error = None
+        try:
+            for _ in range(len(items)):
+                item, result = write_q.get()
+                if isinstance(result, _Failed):
+                    error = error or result.exc
+                    continue
+                t0 = time.perf_counter()
+                self.write(item, result)
+                self.stats["write"].add(time.perf_counter() - t0)
+        finally:
+            # xong hết hoặc write lỗi: mọi thread nền đang chờ hàng đợi thoát trong ≤ POLL giây
+            stop.set()
+            for t in fetchers + [dispatcher]:
+                t.join()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if started_engine:
+                self.engine.stop()
+                self.engine.report()
+            self.wall = time.perf_counter() - t_start
+        self.report()
+        if error is not None:
+            raise error
+
+    def report(self):
+        wall = self.wall
+        bound = max(self.stats.values(), key=lambda s: s.busy / max(1, s.workers))
+        print(f"🧵 Pipeline: {wall:.1f}s tổng — tầng chậm nhất: {bound.name}")
+        for s in self.stats.values():
+            print(s.line(wall))
@@ -0,0 +1,176 @@
+import os, re, json, time, hashlib, tempfile
+import pandas as pd
+from urllib.parse import urlparse, unquote, parse_qs
+from mediawiki_api import query_pages
+
+try:
+    import fcntl
+except ImportError:          # Windows: không khoá được giữa các process
+    fcntl = None
+
+# =============================
+# Cấu hình
+# =============================
+MANIFEST_PATH = os.path.join("..", "data", ".manifest.json")
+
+def title_from_url(url):
+    """https://en.wikipedia.org/wiki/Arsenal_F.C. (hoặc index.php?title=Arsenal_F.C.&oldid=…) → 'Arsenal F.C.'"""
+    u = urlparse(url)
+    qs = parse_qs(u.query)
+    if "title" in qs:
+        return qs["title"][0].replace("_", " ")
+    return unquote(u.path.rsplit("/", 1)[-1]).replace("_", " ")
+
+def pinned_revid(url):
+    """URL ghim revision (oldid=…) → revid đó (không bao giờ đổi), còn lại None."""
+    oldid = parse_qs(urlparse(url).query).get("oldid")
+    return int(oldid[0]) if oldid else None
+
+def fetch_revisions(titles):
+    """Lấy revision ID hiện tại cho nhiều title (50 title/request, tự theo redirect).
+
+    Trả về {title_đầu_vào: revid}, revid = None nếu trang không tồn tại.
+    """
+    # luôn hỏi server (không qua page cache): revid cũ sẽ làm incremental bỏ sót thay đổi
+    return {t: p["revid"] for t, p in query_pages(titles, cached=False).items()}
+
+def table_hash(rows):
+    """Hash ổn định của bảng đã bóc tách (list dict / DataFrame)."""
+    if isinstance(rows, pd.DataFrame):
+        rows = rows.astype(str).to_dict("records")
+    payload = json.dumps(rows, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class Manifest:
+    """Manifest lưu cho mỗi trang (theo scope): title, revision ID và hash của bảng đã bóc tách."""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.pages = self._read()
+        self._current = {}
+        self._dirty = set()        # khoá đã record() trong lần chạy này — chỉ các khoá này được ghi đè khi save()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _key(scope, url):
+        return f"{scope}:{url}"
+
+    def check(self, urls, strict=True):
+        """Hỏi revision ID hiện tại của tất cả URL (theo lô) và nhớ lại để `changed()`/`record()` dùng.
+
+        strict=False (crawl đầy đủ, chỉ ghi manifest cho lần --incremental sau): API lỗi thì chỉ cảnh báo,
+        revid = None → lần incremental kế tiếp sẽ crawl lại các trang đó.
+        """
+        by_title = {}
+        for u in urls:
+            pinned = pinned_revid(u)
+            if pinned is not None:
+                self._current[u] = pinned          # revision ghim: khỏi hỏi server
+            else:
+                by_title[title_from_url(u)] = u
+        try:
+            revids = fetch_revisions(list(by_title)) if by_title else {}
+        except Exception as e:
+            if strict:
+                raise
+            print(f"⚠️  Không lấy được revision ID ({e}) — manifest ghi revid = None")
+            revids = dict.fromkeys(by_title)
+        for title, revid in revids.items():
+            self._current[by_title[title]] = revid
+        return {u: self._current.get(u) for u in urls}
+
+    def changed(self, scope, urls):
+        """Danh sách URL có revision khác lần crawl trước (hoặc chưa từng crawl)."""
+        current = self.check(urls)
+        out = []
+        for u in urls:
+            old = self.pages.get(self._key(scope, u))
+            if old is None or old.get("revid") != current[u]:
+                out.append(u)
+        return out
+
+    def same_table(self, scope, url, digest):
+        old = self.pages.get(self._key(scope, url))
+        return bool(old) and old.get("table_hash") == digest
+
+    def record(self, scope, url, digest):
+        self._dirty.add(self._key(scope, url))
+        self.pages[self._key(scope, url)] = {
+            "title": title_from_url(url),
+            "revid": self._current.get(url),
+            "table_hash": digest,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    def save(self):
+        """Gộp các khoá đã record() vào manifest hiện có trên đĩa rồi ghi nguyên tử.
+
+        players và coaches (orchestrate.py chạy song song) cùng ghi 1 file: đọc lại dưới file lock để không
+        xoá mất scope của crawler kia, file tạm tên riêng để 2 process không os.replace cùng 1 file tạm.
+        """
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        with open(self.path + ".lock", "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                pages = self._read()
+                pages.update((k, self.pages[k]) for k in self._dirty)
+                fd, tmp = tempfile.mkstemp(dir=folder, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(pages, f, ensure_ascii=False, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        self.pages = pages
+
+# =============================
+# Vá file output tại chỗ
+# =============================
+def _unique_columns(cols):
+    """Đặt tên cột trùng như pandas.read_csv (Location, Location.1) để concat được."""
+    seen, out = {}, []
+    for c in cols:
+        n = seen.get(c, 0)
+        out.append(c if n == 0 else f"{c}.{n}")
+        seen[c] = n + 1
+    return out
+
+def _write(df, path):
+    # ghi lại header gốc (bỏ hậu tố .1 do pandas thêm vào cột trùng tên)
+    header = [re.sub(r"\.\d+$", "", str(c)) for c in df.columns]
+    df.to_csv(path, index=False, header=header, encoding="utf-8-sig")
+
+def _keys(df, key_col):
+    if isinstance(key_col, str):
+        return df[key_col]
+    return pd.Series(list(zip(*(df[c] for c in key_col))), index=df.index, dtype=object)
+
+def patch_csv(path, new_df, key_col, replaced_keys):
+    """Xoá các dòng có key_col ∈ replaced_keys rồi thêm new_df; giữ nguyên các dòng khác.
+    key_col có thể là list cột (replaced_keys khi đó là các tuple, vd. (club_id, season))."""
+    new_df = new_df.set_axis(_unique_columns(new_df.columns), axis=1)
+    if os.path.exists(path):
+        old = pd.read_csv(path)
+        old = old[~_keys(old, key_col).isin(set(replaced_keys))]
+        new_df = pd.concat([old, new_df], ignore_index=True)
+    _write(new_df, path)
+    return new_df
+
+def upsert_csv(path, new_df, id_col, keep_ids=None):
+    """Ghi đè các node có cùng id_col; nếu có keep_ids thì bỏ các node không còn được tham chiếu."""
+    new_df = new_df.set_axis(_unique_columns(new_df.columns), axis=1)
+    if os.path.exists(path):
+        old = pd.read_csv(path)
+        old = old[~old[id_col].isin(set(new_df[id_col]))]
+        new_df = pd.concat([old, new_df], ignore_index=True)
+    if keep_ids is not None:
+        new_df = new_df[new_df[id_col].isin(set(keep_ids))]
+    _write(new_df, path)
+    return new_df
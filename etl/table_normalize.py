@@ -0,0 +1,85 @@
+import re
+import pandas as pd
+
+# =============================
+# Chuẩn hoá ô bảng đội hình / HLV / sân theo cột, thay cho vòng df.iterrows().
+#   - iterrows dựng 1 Series cho mỗi dòng: tốn hơn cả phần làm sạch. Ở đây lấy cột ra list 1 lần rồi chạy
+#     hàm làm sạch (regex biên dịch sẵn, bỏ qua regex khi ô không có "[" / "(") trên từng phần tử.
+#   - Bảng Wikipedia chỉ vài chục dòng nên chuỗi .str của pandas (mỗi phép ~50µs cố định) còn chậm hơn;
+#     list comprehension trên cột nhanh hơn cả hai.
+# Kết quả giống hệt cách cũ từng ký tự (kể cả "nan" khi ô trống đi qua str(), fallback về dòng đầu / cả ô);
+# kiểm tra tương đương + đo tốc độ: python bench/bench_normalize.py
+# =============================
+REF = re.compile(r"\[.*?\]")                   # chú thích [1], [a]
+PAREN = re.compile(r"\(.*?\)")                 # (caretaker), (interim)
+LINE_BREAK = re.compile(r"[\r\n]+|<br\s*/?>", re.I)
+MULTI_SPACE = re.compile(r"\s{2,}")
+COUNTRY_TOKEN = re.compile(r"^[A-Z]{2,4}$")    # ENG, IRE, SCO, ...
+DATEISH = re.compile(r"\d")                    # chứa số: ngày/tháng/năm
+PCTISH = re.compile(r"\d+\.\d+%?$")            # 44.34, 60.63, ...
+LETTER = re.compile(r"[A-Za-z]")
+
+# ---------- 1 ô ----------
+def clean_text(s, parens=False):
+    """Bỏ chú thích [..] (và (..) nếu parens), \\xa0 → space, strip; không phải chuỗi → ""."""
+    if not isinstance(s, str):
+        return ""
+    if "[" in s:
+        s = REF.sub("", s)
+    if parens and "(" in s:
+        s = PAREN.sub("", s)
+    return s.replace("\xa0", " ").strip()
+
+def collapse_spaces(s):
+    return MULTI_SPACE.sub(" ", str(s)).strip()
+
+def split_lines(s):
+    """Tách ô nhiều dòng theo xuống dòng / <br>, làm sạch từng dòng, bỏ dòng rỗng."""
+    return [p for p in (clean_text(p, parens=True) for p in LINE_BREAK.split(s)) if p]
+
+def looks_like_name(token):
+    """Có chữ cái và không phải mã quốc tịch / số liệu %."""
+    return (bool(token) and not COUNTRY_TOKEN.match(token) and not PCTISH.match(token)
+            and LETTER.search(token) is not None)
+
+def pick_name(text):
+    """Dòng đầu trông giống tên → nếu không có: dòng đầu → nếu ô không có dòng nào: cả ô."""
+    lines = split_lines(text)
+    for t in lines:
+        t2 = MULTI_SPACE.sub(" ", t).strip(" ,;")
+        if looks_like_name(t2):
+            return t2
+    return lines[0] if lines else text
+
+def pick_years(text):
+    """Dòng đầu có chữ số (ngày/tháng/năm) → dòng đầu → cả ô."""
+    lines = split_lines(text)
+    for t in lines:
+        if DATEISH.search(t):
+            return t
+    return lines[0] if lines else text
+
+# ---------- cả cột ----------
+def column(df, col):
+    """df[col] dạng list — nếu tên cột bị trùng thì lấy cột đầu."""
+    out = df[col]
+    return (out.iloc[:, 0] if isinstance(out, pd.DataFrame) else out).tolist()
+
+def clean_column(cells, parens=False):
+    return [clean_text(c, parens) for c in cells]
+
+def clean_series(s, parens=False):
+    """clean_text cho cả Series (giữ index)."""
+    return pd.Series(clean_column(s.tolist(), parens), index=s.index, dtype=object)
+
+def coach_names(cells):
+    """Tên HLV cho cả cột: str(ô) (NaN → "nan" như trước), làm sạch rồi pick_name."""
+    return [pick_name(clean_text(str(c), parens=True)) for c in cells]
+
+def coach_years(cells):
+    return [pick_years(clean_text(str(c), parens=True)) for c in cells]
+
+def squad_rows(df, cols=("Name", "Nation", "Position")):
+    """[(name, nation, position), ...] đã làm sạch (cột thiếu → ""), bỏ dòng không có tên."""
+    empty = [""] * len(df)
+    return [r for r in zip(*(clean_column(column(df, c)) if c in df.columns else empty for c in cols)) if r[0]]
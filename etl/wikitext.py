@@ -0,0 +1,247 @@
+import re, html
+from html_tables import parse_html, table_to_frame
+
+# =============================
+# Đọc wikitext (dump Wikipedia) không cần render: heading, template, wikitable → DataFrame
+#   - wikitext → text: bỏ <ref>/comment, [[link|hiển thị]] → hiển thị, template hay gặp trong bảng
+#     ({{sort}}, {{sortname}}, {{nts}}, {{dts}}, {{flagicon}}…) → phần chữ trình duyệt sẽ thấy
+#   - wikitable → <table> HTML → html_tables.table_to_frame: cùng luật header / rowspan / colspan / kiểu dữ liệu
+#     với đường crawl HTML nên các hàm chuẩn hoá của crawler dùng lại nguyên vẹn
+# =============================
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref\s*>", re.S | re.I)
+_BR = re.compile(r"<br\s*/?>", re.I)
+_TAG = re.compile(r"</?[a-z][^>]*>", re.I)
+_TEMPLATE = re.compile(r"\{\{([^{}]*)\}\}")                     # template trong cùng (không lồng)
+_FILE_LINK = re.compile(r"\[\[\s*(?:File|Image|Category)\s*:[^\[\]]*\]\]", re.I)
+_LINK = re.compile(r"\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]")
+_EXT_LINK = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+_QUOTES = re.compile(r"'{2,}")
+_HEADING = re.compile(r"^(={2,6})\s*(.+?)\s*\1\s*$", re.M)
+_TABLE_LINE = re.compile(r"^[ \t]*(\{\||\|\})", re.M)
+_BRACKETS = re.compile(r"\{\{|\}\}|\[\[|\]\]")
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+
+# ---------- template ----------
+def split_top(s, sep="|"):
+    """Tách theo `sep` ở mức ngoài cùng (không cắt bên trong {{…}} / [[…]])."""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(s):
+        if s.startswith(("{{", "[["), i):
+            depth, i = depth + 1, i + 2
+        elif s.startswith(("}}", "]]"), i):
+            depth, i = max(0, depth - 1), i + 2
+        elif depth == 0 and s.startswith(sep, i):
+            parts.append(s[start:i])
+            i = start = i + len(sep)
+        else:
+            i += 1
+    parts.append(s[start:])
+    return parts
+
+def template_name(name):
+    return " ".join(name.replace("_", " ").split()).lower()
+
+def parse_template(body):
+    """"Tên|a|k=v" → (tên chuẩn hoá, [đối số vị trí], {đối số tên})."""
+    name, *parts = split_top(body)
+    args, named = [], {}
+    for p in parts:
+        k, eq, v = p.partition("=")
+        if eq and not _BRACKETS.search(k):
+            named[k.strip().lower()] = v.strip()
+        else:
+            args.append(p.strip())
+    return template_name(name), args, named
+
+def find_templates(text, pred):
+    """[(tên, đối số, đối số tên)] của các template ngoài cùng có tên thoả pred (theo thứ tự xuất hiện)."""
+    out, depth, start = [], 0, 0
+    for m in re.finditer(r"\{\{|\}\}", text):
+        if m.group() == "{{":
+            if depth == 0:
+                start = m.end()
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                body = text[start:m.start()]
+                if pred(template_name(body.split("|", 1)[0])):
+                    out.append(parse_template(body))
+    return out
+
+def _date(args):
+    nums = [a for a in args[:3] if a.strip().isdigit()]
+    if len(nums) < len(args[:3]) or not nums:
+        return args[0] if args else ""
+    y, *md = (int(a) for a in nums)
+    if len(md) == 2:
+        return f"{md[1]} {MONTHS[md[0] - 1]} {y}" if 1 <= md[0] <= 12 else str(y)
+    if len(md) == 1 and 1 <= md[0] <= 12:
+        return f"{MONTHS[md[0] - 1]} {y}"
+    return str(y)
+
+_FIRST = {"nowrap", "nobr", "small", "big", "nobold", "center", "sup", "sub", "abbr", "nts", "ntsh", "flagathlete",
+          "flag", "ill", "tooltip", "avoid wrap", "vanchor", "anchor", "hs"}
+
+def render_template(body):
+    name, args, named = parse_template(body)
+    if name in _FIRST:
+        return args[0] if args else ""
+    if name == "sort":
+        return args[1] if len(args) > 1 else (args[0] if args else "")
+    if name == "sortname":
+        return " ".join(a for a in args[:2] if a)
+    if name in ("dts", "dtsh", "date", "start date", "end date", "birth date", "death date"):
+        return _date(args)
+    if name in ("lang", "resize"):
+        return args[-1] if args else ""
+    if name in ("ubl", "unbulleted list", "plainlist", "flatlist", "hlist"):
+        return "\n".join(a.lstrip("* ") for a in args if a)
+    if name in ("nbsp", "spaces"):
+        return "\xa0"
+    if name in ("ndash", "snd", "spaced ndash"):
+        return "–"
+    return ""                     # {{flagicon}}, {{efn}}, {{cite …}}, số liệu phụ … → không có chữ
+
+# ---------- text ----------
+def plain(s):
+    """Wikitext → text hiển thị (<br> → "\\n"; chú thích và template không có chữ bị bỏ)."""
+    if not s:
+        return ""
+    s = _REF.sub("", _COMMENT.sub("", s))
+    s = _BR.sub("\n", s)
+    while "{{" in s:
+        s2 = _TEMPLATE.sub(lambda m: render_template(m.group(1)), s)
+        if s2 == s:
+            break
+        s = s2
+    s = _FILE_LINK.sub("", s)
+    s = _LINK.sub(lambda m: m.group(2) if m.group(2) is not None else m.group(1), s)
+    s = _EXT_LINK.sub(r"\1", s)
+    s = _TAG.sub("", _QUOTES.sub("", s))
+    return html.unescape(s).strip()
+
+def link_target(s):
+    """Đích của wikilink đầu tiên trong ô ([[Arsenal F.C.|Arsenal]] → "Arsenal F.C."), không có → None."""
+    m = _LINK.search(_REF.sub("", s or ""))
+    return normalize_title(m.group(1)) if m else None
+
+def normalize_title(title):
+    title = " ".join(title.split("#", 1)[0].replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+# ---------- mục (heading) ----------
+def headings(text):
+    """[(vị trí bắt đầu, vị trí sau heading, mức, chữ)] theo thứ tự."""
+    return [(m.start(), m.end(), len(m.group(1)), plain(m.group(2))) for m in _HEADING.finditer(text)]
+
+def find_section(text, patterns, hs=None):
+    """Mục đầu tiên có heading khớp (thử lần lượt từng pattern như crawler) → (vị trí sau heading, cuối mục)."""
+    hs = headings(text) if hs is None else hs
+    for pattern in patterns:
+        for i, (_, end, level, title) in enumerate(hs):
+            if pattern.search(title):
+                stop = next((h[0] for h in hs[i + 1:] if h[2] <= level), len(text))
+                return end, stop
+    return None
+
+def section_body(text, patterns):
+    """Phần giữa heading khớp và heading kế tiếp (bất kỳ mức nào) — như lấy bảng ngay dưới heading."""
+    hs = headings(text)
+    span = find_section(text, patterns, hs)
+    if span is None:
+        return None
+    end = next((h[0] for h in hs if h[0] >= span[0]), len(text))
+    return text[span[0]:end]
+
+# ---------- wikitable ----------
+def tables(text, start=0, wikitable=True):
+    """[(vị trí, wikitext bảng)] các bảng ngoài cùng từ `start`; wikitable=True: chỉ class "wikitable"."""
+    out, depth, begin = [], 0, 0
+    for m in _TABLE_LINE.finditer(text, start):
+        if m.group(1) == "{|":
+            if depth == 0:
+                begin = m.start()
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                t = text[begin:m.end()]
+                if not wikitable or "wikitable" in t.split("\n", 1)[0]:
+                    out.append((begin, t))
+    return out
+
+def _cell(raw, header):
+    """'attrs | nội dung' → (thẻ, rowspan, colspan, nội dung)."""
+    parts = split_top(raw, "|")
+    attrs, content = ("", raw) if len(parts) == 1 or "=" not in parts[0] else (parts[0], "|".join(parts[1:]))
+    span = lambda k: (re.search(rf'{k}\s*=\s*"?(\d+)', attrs, re.I) or [None, "1"])[1]
+    return ("th" if header else "td"), span("rowspan"), span("colspan"), content
+
+def _rows(table):
+    """Wikitext 1 bảng → [[(thẻ, rowspan, colspan, nội dung wikitext)]]; bảng lồng bên trong giữ nguyên là nội dung."""
+    rows, cur, depth = [], None, 0
+    for line in table.split("\n")[1:]:
+        s = line.strip()
+        if depth:
+            depth += s.startswith("{|") - s.startswith("|}")
+            if cur:
+                cur[-1] = cur[-1][:3] + (cur[-1][3] + "\n" + line,)
+            continue
+        if s.startswith("|}"):
+            break
+        if s.startswith("{|"):
+            depth = 1
+            if cur:
+                cur[-1] = cur[-1][:3] + (cur[-1][3] + "\n" + line,)
+            continue
+        if s.startswith("|-"):
+            cur = None
+            continue
+        if s.startswith("|+"):
+            continue
+        if s.startswith(("!", "|")):
+            if cur is None:
+                cur = []
+                rows.append(cur)
+            header = s[0] == "!"
+            seps = ("!!", "||") if header else ("||",)
+            cells = [s[1:]]
+            for sep in seps:
+                cells = [c for part in cells for c in split_top(part, sep)]
+            cur.extend(_cell(c, header) for c in cells)
+        elif cur:
+            cur[-1] = cur[-1][:3] + (cur[-1][3] + "\n" + line,)
+    return [r for r in rows if r]
+
+def row_count(table):
+    return len(_rows(table))
+
+def _cell_html(content):
+    # xuống dòng trong nguồn = khoảng trắng; <br> giữ là <br> (lxml text_content cho kết quả như trang thật)
+    return html.escape(plain(content.replace("\n", " "))).replace("\n", "<br>")
+
+def table_html(table):
+    """Wikitext 1 bảng → chuỗi <table> HTML (giữ rowspan/colspan, th/td)."""
+    out = ["<table>"]
+    for row in _rows(table):
+        out.append("<tr>" + "".join(f'<{tag} rowspan="{rs}" colspan="{cs}">{_cell_html(c)}</{tag}>'
+                                    for tag, rs, cs, c in row) + "</tr>")
+    out.append("</table>")
+    return "".join(out)
+
+def html_frame(table_html_str):
+    """Chuỗi <table> (từ table_html) → DataFrame như html_tables.table_to_frame trên trang thật."""
+    return table_to_frame(parse_html(table_html_str).find(".//table"))
+
+def table_links(table):
+    """{chữ hiển thị: đích link} của mọi ô có wikilink (vd. tên CLB → title bài CLB)."""
+    out = {}
+    for row in _rows(table):
+        for tag, _, _, content in row:
+            target = link_target(content) if tag == "td" else None
+            if target:
+                out.setdefault(plain(content.replace("\n", " ")), target)
+    return out
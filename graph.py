@@ -1,24 +1,43 @@
-from neo4j import GraphDatabase
-import networkx as nx
+import os, sys, time, argparse
+from graph_index import GraphIndex, open_index, INDEX_DIR, DEFAULT_EDGES
+from metrics import main_entry
 
-# 1. Kết nối Neo4j
-driver = GraphDatabase.driver("neo4j://localhost:7687", auth=("neo4j", "test1234"))
+# =============================
+# Đường đi ngắn nhất giữa 2 node (cầu thủ / CLB / HLV)
+#   python graph.py player_david_raya player_bukayo_saka
+#   python graph.py A B --edges played_for coached     # thêm cạnh HLV — CLB
+#   python graph.py A B --neo4j                        # dựng chỉ mục từ Neo4j 1 lần (thay vì data/edges)
+# Chỉ mục CSR được lưu ở data/graph_index/ và nạp lại bằng mmap cho các lần chạy sau.
+# =============================
+NEO4J_URI = os.environ.get("NEO4J_URI", "neo4j://localhost:7687")
+NEO4J_AUTH = (os.environ.get("NEO4J_USER", "neo4j"), os.environ.get("NEO4J_PASSWORD", "test1234"))
 
-query = """
-MATCH (p:Player)-[:PLAYED_FOR]->(c:Club)
-RETURN p.id AS player, c.id AS club
-"""
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Đường đi ngắn nhất trong đồ thị EPL")
+    ap.add_argument("src", nargs="?", default="player_david_raya")
+    ap.add_argument("dst", nargs="?", default="player_bukayo_saka")
+    ap.add_argument("--edges", nargs="+", default=list(DEFAULT_EDGES), help="các file trong data/edges (không .csv)")
+    ap.add_argument("--rebuild", action="store_true", help="dựng lại chỉ mục dù snapshot còn mới")
+    ap.add_argument("--neo4j", action="store_true", help="dựng chỉ mục từ Neo4j (PLAYED_FOR) thay vì CSV")
+    args = ap.parse_args(argv)
 
-# 3. Tạo graph NetworkX
-G = nx.Graph()
+    t0 = time.perf_counter()
+    if args.neo4j:
+        g = GraphIndex.from_neo4j(NEO4J_URI, NEO4J_AUTH)
+        g.save(INDEX_DIR)
+        g = GraphIndex.load(INDEX_DIR)
+    else:
+        g = open_index(args.edges, rebuild=args.rebuild)
+    t1 = time.perf_counter()
 
-with driver.session() as session:
-    for record in session.run(query):
-        G.add_edge(record["player"], record["club"])
+    try:
+        path = g.shortest_path(args.src, args.dst)
+    except KeyError as e:
+        sys.exit(f"❌ Không có node {e} trong đồ thị")
+    t2 = time.perf_counter()
 
-src = "player_david_raya"
-dst = "player_bukayo_saka"
+    print("Shortest path:", path)
+    print(f"⏱️  nạp {(t1 - t0) * 1000:.1f} ms, truy vấn {(t2 - t1) * 1000:.2f} ms")
 
-path = nx.shortest_path(G, src, dst)
-
-print("Shortest path:", path)
+if __name__ == "__main__":
+    main_entry("graph", main)
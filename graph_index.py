@@ -0,0 +1,215 @@
+import os, sys, json, time
+import numpy as np
+
+# =============================
+# Chỉ mục đồ thị CSR (compressed sparse row) cho data/edges
+#   - node = số nguyên 0..n-1; keys.npy (đã sắp xếp) ↔ ID chuỗi, tra bằng searchsorted (không cần dict)
+#   - indptr.npy / indices.npy: danh sách kề vô hướng, lưu .npy và nạp lại bằng mmap (gần như 0 ms)
+#   - shortest_path: BFS 2 chiều, mở rộng cả frontier bằng NumPy
+# =============================
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, "data")
+EDGE_DIR = os.path.join(DATA_DIR, "edges")
+INDEX_DIR = os.path.join(DATA_DIR, "graph_index")
+DEFAULT_EDGES = ("played_for",)          # như graph.py cũ: Player — Club
+sys.path.insert(0, os.path.join(ROOT, "etl"))
+from metrics import timed  # noqa: E402 — etl/ vừa được thêm vào sys.path
+
+class GraphIndex:
+    def __init__(self, keys, indptr, indices, meta=None):
+        self.keys = keys              # mảng chuỗi đã sắp xếp
+        self.indptr = indptr          # int64[n + 1]
+        self.indices = indices        # int32[nnz]
+        self.meta = meta or {}
+
+    @property
+    def n_nodes(self):
+        return len(self.keys)
+
+    @property
+    def n_edges(self):
+        return len(self.indices) // 2
+
+    # ---------- dựng ----------
+    @classmethod
+    def from_pairs(cls, src, dst, meta=None):
+        """Dựng CSR vô hướng từ 2 mảng ID chuỗi (cạnh lặp lại giữa các mùa chỉ giữ 1)."""
+        src, dst = np.asarray(src, dtype=str), np.asarray(dst, dtype=str)
+        keys, inv = np.unique(np.concatenate([src, dst]), return_inverse=True)
+        n, m = len(keys), len(src)
+        a, b = inv[:m].astype(np.int64), inv[m:].astype(np.int64)
+        pair = np.unique(np.concatenate([a * n + b, b * n + a]))      # 2 chiều, đã sắp theo (dòng, cột)
+        rows, cols = pair // n, pair % n
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(keys, indptr, cols.astype(np.int32), meta)
+
+    @classmethod
+    def from_csv(cls, edges=DEFAULT_EDGES, edge_dir=EDGE_DIR):
+        import pandas as pd
+        src, dst, sources = [], [], {}
+        for name in edges:
+            path = os.path.join(edge_dir, f"{name}.csv")
+            df = pd.read_csv(path, usecols=[0, 1], dtype=str).dropna()
+            src.append(df.iloc[:, 0].to_numpy())
+            dst.append(df.iloc[:, 1].to_numpy())
+            sources[path] = os.path.getmtime(path)
+        return cls.from_pairs(np.concatenate(src), np.concatenate(dst), {"edges": list(edges), "sources": sources})
+
+    @classmethod
+    def from_store(cls, edges=DEFAULT_EDGES):
+        """Từ kho cột (etl/columnar_store.py): src/dst đã là số nguyên, chỉ cần giải mã 1 lần."""
+        import columnar_store
+        src, dst = [], []
+        for name in edges:
+            t = columnar_store.load_edges(name)
+            meta = columnar_store.table_meta(t)
+            src.append(columnar_store.decode_ids(meta["start"], t.column("src").to_numpy()))
+            dst.append(columnar_store.decode_ids(meta["end"], t.column("dst").to_numpy()))
+        src, dst = np.concatenate(src), np.concatenate(dst)
+        ok = (src != None) & (dst != None)  # noqa: E711 — so sánh phần tử mảng object
+        return cls.from_pairs(src[ok], dst[ok], {"edges": list(edges), "store": columnar_store.STORE_DIR})
+
+    @classmethod
+    def from_neo4j(cls, uri, auth, rel_type="PLAYED_FOR"):
+        """Kéo cạnh từ Neo4j đúng 1 lần (sau đó save() để các lần sau mmap)."""
+        from neo4j import GraphDatabase
+        driver = GraphDatabase.driver(uri, auth=auth)
+        try:
+            with driver.session() as session:
+                rows = session.run(f"MATCH (a)-[:{rel_type}]->(b) RETURN a.id AS a, b.id AS b").values()
+        finally:
+            driver.close()
+        src, dst = zip(*rows) if rows else ((), ())
+        return cls.from_pairs(list(src), list(dst), {"edges": [rel_type.lower()], "neo4j": uri})
+
+    # ---------- lưu / nạp ----------
+    def save(self, out_dir=INDEX_DIR):
+        # ghi file tạm rồi os.replace: process khác đang mmap bản cũ vẫn đọc được inode cũ, không bị cắt cụt giữa chừng
+        os.makedirs(out_dir, exist_ok=True)
+        for name in ("keys", "indptr", "indices"):
+            path = os.path.join(out_dir, f"{name}.npy")
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, getattr(self, name))
+            os.replace(path + ".tmp", path)
+        path = os.path.join(out_dir, "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    @timed("load", name="GraphIndex.load", rows=None)
+    def load(cls, in_dir=INDEX_DIR):
+        arr = {n: np.load(os.path.join(in_dir, f"{n}.npy"), mmap_mode="r") for n in ("keys", "indptr", "indices")}
+        meta = {}
+        if os.path.exists(os.path.join(in_dir, "meta.json")):
+            with open(os.path.join(in_dir, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        return cls(arr["keys"], arr["indptr"], arr["indices"], meta)
+
+    def is_stale(self, edges=DEFAULT_EDGES):
+        if list(edges) != self.meta.get("edges"):
+            return True
+        sources = self.meta.get("sources")
+        if not sources:
+            return False              # dựng từ Neo4j / kho cột: chỉ dựng lại khi được yêu cầu
+        return any(not os.path.exists(p) or os.path.getmtime(p) != t for p, t in sources.items())
+
+    # ---------- truy vấn ----------
+    def node(self, key):
+        i = int(np.searchsorted(self.keys, key))
+        if i >= len(self.keys) or self.keys[i] != key:
+            raise KeyError(key)
+        return i
+
+    def neighbours(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def _expand(self, frontier, parent, other=None):
+        """Mở rộng cả frontier 1 bước; trả về (frontier mới, node gặp nhau hoặc -1)."""
+        starts, ends = self.indptr[frontier], self.indptr[frontier + 1]
+        lens = ends - starts
+        total = int(lens.sum())
+        if total == 0:
+            return frontier[:0], -1
+        offs = np.repeat(starts - (np.cumsum(lens) - lens), lens) + np.arange(total)
+        nbrs = self.indices[offs]
+        srcs = np.repeat(frontier, lens)
+        fresh = parent[nbrs] < 0
+        nbrs, srcs = nbrs[fresh], srcs[fresh]
+        nbrs, first = np.unique(nbrs, return_index=True)
+        parent[nbrs] = srcs[first]
+        if other is None:
+            return nbrs, -1
+        met = nbrs[other[nbrs] >= 0]
+        return nbrs, (int(met[0]) if len(met) else -1)
+
+    def bfs(self, s, dist=None, parent=None, max_depth=254):
+        """BFS 1 nguồn theo từng tầng. Ghi vào dist (uint8, 255 = không tới được) và parent (-1 = chưa thăm)."""
+        n = self.n_nodes
+        dist = np.full(n, 255, dtype=np.uint8) if dist is None else dist
+        parent = np.full(n, -1, dtype=np.int32) if parent is None else parent
+        dist[:] = 255
+        parent[:] = -1
+        dist[s], parent[s] = 0, s
+        frontier, depth = np.array([s]), 0
+        while len(frontier) and depth < max_depth:
+            depth += 1
+            frontier, _ = self._expand(frontier, parent)
+            dist[frontier] = depth
+        return dist, parent
+
+    def shortest_path_ids(self, s, t):
+        if s == t:
+            return [s]
+        n = self.n_nodes
+        ps, pt = np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64)
+        ps[s], pt[t] = s, t
+        fs, ft = np.array([s]), np.array([t])
+        meet = -1
+        while len(fs) and len(ft):
+            # luôn mở rộng phía có frontier nhỏ hơn
+            if len(fs) <= len(ft):
+                fs, meet = self._expand(fs, ps, pt)
+            else:
+                ft, meet = self._expand(ft, pt, ps)
+            if meet >= 0:
+                break
+        if meet < 0:
+            return None
+        left, v = [], meet
+        while v != s:
+            left.append(v)
+            v = int(ps[v])
+        right, v = [], meet
+        while v != t:
+            v = int(pt[v])
+            right.append(v)
+        return [s] + left[::-1] + right
+
+    @timed("query", name="GraphIndex.shortest_path", rows=None)
+    def shortest_path(self, src, dst):
+        ids = self.shortest_path_ids(self.node(src), self.node(dst))
+        return None if ids is None else [str(self.keys[i]) for i in ids]
+
+def index_dir_for(edges):
+    """Thư mục chỉ mục riêng cho từng bộ cạnh (data/graph_index chung được graph.py dựng lại chỉ với played_for)."""
+    return os.path.join(DATA_DIR, "graph_index_" + "_".join(edges))
+
+@timed("load", rows=None)
+def open_index(edges=DEFAULT_EDGES, index_dir=INDEX_DIR, rebuild=False, verbose=True):
+    """Nạp snapshot nếu còn mới, nếu không thì dựng lại từ CSV và lưu."""
+    t0 = time.perf_counter()
+    if not rebuild and os.path.exists(os.path.join(index_dir, "indptr.npy")):
+        g = GraphIndex.load(index_dir)
+        if not g.is_stale(edges):
+            if verbose:
+                print(f"⚡ Nạp chỉ mục {index_dir} (mmap): {g.n_nodes} node, {g.n_edges} cạnh "
+                      f"trong {(time.perf_counter() - t0) * 1000:.1f} ms")
+            return g
+    g = GraphIndex.from_csv(edges)
+    g.save(index_dir)
+    if verbose:
+        print(f"🏗️  Dựng chỉ mục từ CSV: {g.n_nodes} node, {g.n_edges} cạnh "
+              f"trong {(time.perf_counter() - t0) * 1000:.1f} ms → {index_dir}")
+    return GraphIndex.load(index_dir)
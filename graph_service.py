@@ -0,0 +1,291 @@
+import os, json, time, asyncio, argparse, threading, traceback
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pandas as pd
+from graph_index import open_index, index_dir_for, GraphIndex, EDGE_DIR, DEFAULT_EDGES
+from metrics import REGISTRY, main_entry
+
+# =============================
+# Dịch vụ truy vấn đồ thị thường trú (asyncio, HTTP/1.1 keep-alive, chỉ dùng thư viện chuẩn)
+#   python graph_service.py --port 8765 --workers 4
+#   GET /path?src=player_david_raya&dst=player_bukayo_saka
+#   GET /neighbours?id=club_arsenal
+#   GET /roster?club=club_arsenal&season=2024–25
+#   GET /coaches?club=club_arsenal
+#   GET /stats
+# Đồ thị nạp 1 lần (mmap); truy vấn nặng (/path) chạy trong process pool; kết quả cache LRU,
+# tự xoá cache + nạp lại khi file trong data/edges thay đổi (pool mới thay ngay, pool cũ chạy nốt /path đang chờ).
+# Chỉ mục riêng cho từng bộ cạnh: data/graph_index_<cạnh> (--edges played_for coached → graph_index_played_for_coached).
+# =============================
+HOST = os.environ.get("EPL_SERVICE_HOST", "127.0.0.1")
+PORT = int(os.environ.get("EPL_SERVICE_PORT", 8765))
+WORKERS = int(os.environ.get("EPL_WORKERS", 2))
+CACHE_SIZE = int(os.environ.get("EPL_SERVICE_CACHE", 10_000))
+WATCH_INTERVAL = float(os.environ.get("EPL_SERVICE_WATCH", 2.0))
+WATCHED = ["played_for.csv", "coached.csv", "part_of.csv"]
+
+# ---------- worker pool: mỗi process mmap chỉ mục 1 lần ----------
+_G = None
+
+def _init_worker(index_dir):
+    global _G
+    _G = GraphIndex.load(index_dir)
+
+def _shortest_path(src, dst):
+    return _G.shortest_path(src, dst)
+
+# ---------- cache + số liệu ----------
+class LRUCache:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        if key in self.data:
+            self.data.move_to_end(key)
+            self.hits += 1
+            return self.data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+
+class LatencyStats:
+    def __init__(self, window=10_000, rate_window=60):
+        self.samples = {}
+        self.counts = {}
+        self.started = time.monotonic()
+        self.recent = deque()                     # [giây, số request hoàn thành trong giây đó] → QPS 60s gần nhất
+        self.window = window
+        self.rate_window = rate_window
+
+    def _trim(self, now):
+        while self.recent and self.recent[0][0] <= now - self.rate_window:
+            self.recent.popleft()
+
+    def record(self, endpoint, secs):
+        self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(secs)
+        self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+        sec = int(time.monotonic())
+        if self.recent and self.recent[-1][0] == sec:
+            self.recent[-1][1] += 1
+        else:
+            self.recent.append([sec, 1])
+            self._trim(sec)
+        REGISTRY.observe("call_seconds", secs, kind="query", fn=endpoint)
+
+    def as_dict(self):
+        now = time.monotonic()
+        self._trim(int(now))
+        total = sum(self.counts.values())
+        out = {"uptime_s": now - self.started, "requests": total,
+               "qps": total / max(now - self.started, 1e-9),
+               "qps_60s": sum(n for _, n in self.recent) / min(float(self.rate_window),
+                                                                max(now - self.started, 1e-9)),
+               "endpoints": {}}
+        for ep, s in self.samples.items():
+            arr = np.fromiter(s, dtype=np.float64) * 1000
+            out["endpoints"][ep] = {"count": self.counts[ep], "p50_ms": float(np.percentile(arr, 50)),
+                                    "p95_ms": float(np.percentile(arr, 95)),
+                                    "p99_ms": float(np.percentile(arr, 99))}
+        return out
+
+# ---------- dịch vụ ----------
+class GraphService:
+    def __init__(self, edges=DEFAULT_EDGES, edge_dir=EDGE_DIR, index_dir=None, workers=WORKERS,
+                 cache_size=CACHE_SIZE):
+        self.edges, self.edge_dir, self.index_dir = list(edges), edge_dir, index_dir or index_dir_for(edges)
+        self.workers = workers
+        self.cache = LRUCache(cache_size)
+        self.stats = LatencyStats()
+        self.pool = None
+        self.reloads = 0
+        self.generation = 0       # tăng mỗi lần nạp lại: kết quả tính trên đồ thị cũ không được vào cache mới
+        self._mtimes = None
+        self.load()
+
+    def _current_mtimes(self):
+        return {f: os.path.getmtime(os.path.join(self.edge_dir, f))
+                for f in WATCHED if os.path.exists(os.path.join(self.edge_dir, f))}
+
+    def _build(self):
+        """Dựng trạng thái mới (chạy trong executor được): không đụng tới trạng thái đang phục vụ."""
+        t0 = time.perf_counter()
+        state = {"mtimes": self._current_mtimes(), "g": open_index(self.edges, self.index_dir)}
+        played = pd.read_csv(os.path.join(self.edge_dir, "played_for.csv"), dtype=str)
+        played.columns = ["player_id", "club_id", "season_id"] + list(played.columns[3:])
+        state["rosters"] = {k: grp[["player_id", "position"]].to_dict("records")
+                            for k, grp in played.groupby(["club_id", "season_id"])}
+        coached_path = os.path.join(self.edge_dir, "coached.csv")
+        state["coaches"] = {}
+        if os.path.exists(coached_path):
+            coached = pd.read_csv(coached_path, dtype=str)
+            coached.columns = ["coach_id", "club_id"] + list(coached.columns[2:])
+            state["coaches"] = {k: grp[["coach_id", "season_id", "years", "is_current"]].fillna("").to_dict("records")
+                                for k, grp in coached.groupby("club_id")}
+        state["pool"] = (ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.index_dir,))
+                         if self.workers > 0 else None)
+        state["ms"] = (time.perf_counter() - t0) * 1000
+        return state
+
+    def _swap(self, state):
+        """Thay trạng thái đang phục vụ — gọi trên thread của event loop (cùng thread với dispatch)."""
+        old = self.pool
+        self._mtimes, self.g = state["mtimes"], state["g"]
+        self.rosters, self.coaches, self.pool = state["rosters"], state["coaches"], state["pool"]
+        if self.pool is None:
+            _init_worker(self.index_dir)
+        if old is not None:
+            # /path đã gửi vào pool cũ vẫn chạy xong (không cancel → client không bị rớt), đóng pool ở thread nền
+            threading.Thread(target=old.shutdown, kwargs={"wait": True}, daemon=True).start()
+        self.generation += 1
+        self.cache.clear()
+        self.reloads += 1
+        print(f"🔄 Nạp đồ thị: {self.g.n_nodes} node, {len(self.rosters)} đội hình (CLB, mùa) "
+              f"trong {state['ms']:.0f} ms")
+
+    def load(self):
+        self._swap(self._build())
+
+    async def watch(self, interval=WATCH_INTERVAL):
+        """Theo dõi mtime của data/edges; đổi → dựng lại trong executor, thay + xoá cache trên event loop."""
+        while True:
+            await asyncio.sleep(interval)
+            if self._current_mtimes() != self._mtimes:
+                print("📝 data/edges thay đổi → nạp lại")
+                self._swap(await asyncio.get_running_loop().run_in_executor(None, self._build))
+
+    # ---------- các endpoint ----------
+    async def path(self, q):
+        src, dst = q["src"], q["dst"]
+        if self.pool is None:
+            p = _shortest_path(src, dst)
+        else:
+            p = await asyncio.get_running_loop().run_in_executor(self.pool, _shortest_path, src, dst)
+        return {"path": p, "hops": None if p is None else len(p) - 1}
+
+    async def neighbours(self, q):
+        i = self.g.node(q["id"])
+        return {"id": q["id"], "neighbours": [str(self.g.keys[j]) for j in self.g.neighbours(i)]}
+
+    async def roster(self, q):
+        season = q["season"] if q["season"].startswith("EPL-") else f"EPL-{q['season']}"
+        return {"club": q["club"], "season": season, "players": self.rosters.get((q["club"], season), [])}
+
+    async def coaches_of(self, q):
+        return {"club": q["club"], "coaches": self.coaches.get(q["club"], [])}
+
+    async def stats_(self, q):
+        d = self.stats.as_dict()
+        d["cache"] = {"size": len(self.cache.data), "hits": self.cache.hits, "misses": self.cache.misses}
+        d["reloads"] = self.reloads
+        return d
+
+    ROUTES = {"/path": ("path", ("src", "dst")), "/neighbours": ("neighbours", ("id",)),
+              "/roster": ("roster", ("club", "season")), "/coaches": ("coaches_of", ("club",)),
+              "/stats": ("stats_", ())}
+
+    async def dispatch(self, target):
+        url = urlsplit(target)
+        route = self.ROUTES.get(url.path)
+        if route is None:
+            return 404, {"error": f"không có endpoint {url.path}"}
+        name, required = route
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        missing = [k for k in required if k not in q]
+        if missing:
+            return 400, {"error": f"thiếu tham số: {', '.join(missing)}"}
+        key = (url.path, tuple(sorted(q.items())))
+        cacheable = url.path != "/stats"
+        if cacheable:
+            hit = self.cache.get(key)
+            if hit is not None:
+                return 200, hit
+        generation = self.generation
+        try:
+            result = await getattr(self, name)(q)
+        except KeyError as e:
+            return 404, {"error": f"không có node {e}"}
+        except Exception as e:
+            traceback.print_exc()
+            return 500, {"error": f"lỗi nội bộ: {type(e).__name__}: {e}"}
+        if cacheable and generation == self.generation:
+            self.cache.put(key, result)
+        return 200, result
+
+    # ---------- HTTP ----------
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                t0 = time.perf_counter()
+                if method != "GET":
+                    status, body = 405, {"error": "chỉ hỗ trợ GET"}
+                else:
+                    status, body = await self.dispatch(target)
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                close = headers.get("connection", "").lower() == "close"
+                writer.write((f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                              f"Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(payload)}\r\n"
+                              f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                self.stats.record(urlsplit(target).path, time.perf_counter() - t0)
+                if close:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+async def serve(host=HOST, port=PORT, **kw):
+    svc = GraphService(**kw)
+    server = await asyncio.start_server(svc.handle, host, port)
+    watcher = asyncio.create_task(svc.watch())
+    print(f"🚀 Graph service: http://{host}:{port}  (/path /neighbours /roster /coaches /stats)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+        svc.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Dịch vụ truy vấn đồ thị EPL")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--workers", type=int, default=WORKERS, help="số process cho /path (0 = chạy tại chỗ)")
+    ap.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    ap.add_argument("--edges", nargs="+", default=list(DEFAULT_EDGES))
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, edges=args.edges, workers=args.workers, cache_size=args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main_entry("graph_service", main)
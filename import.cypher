@@ -69,11 +69,13 @@ SET s.name       = row.name,
 // 6. LOAD RELATIONSHIPS: PLAYED_FOR
 ///////////////////////////////////////////////////////////////////////////
 
+// Cột theo file edges do build_relations.py sinh ra
+// (nạp nhanh theo lô / song song: python etl/load_neo4j.py)
 LOAD CSV WITH HEADERS FROM "file:///edges/played_for.csv" AS row
-MATCH (p:Player {id: row.player_id})
-MATCH (c:Club   {id: row.club_id})
-MATCH (s:Season {id: row.season})
-MERGE (p)-[r:PLAYED_FOR {season: row.season}]
+MATCH (p:Player {id: row.`:START_ID(Player)`})
+MATCH (c:Club   {id: row.`:END_ID(Club)`})
+MATCH (s:Season {id: row.season_id})
+MERGE (p)-[r:PLAYED_FOR {season: row.season_id}]
       ->(c)
 SET r.position = row.position;
 
@@ -83,10 +85,10 @@ SET r.position = row.position;
 ///////////////////////////////////////////////////////////////////////////
 
 LOAD CSV WITH HEADERS FROM "file:///edges/coached.csv" AS row
-MATCH (co:Coach {id: row.coach_id})
-MATCH (cl:Club  {id: row.club_id})
-MATCH (s:Season {id: row.season})
-MERGE (co)-[r:COACHED {season: row.season}]
+MATCH (co:Coach {id: row.`:START_ID(Coach)`})
+MATCH (cl:Club  {id: row.`:END_ID(Club)`})
+MATCH (s:Season {id: row.season_id})
+MERGE (co)-[r:COACHED {season: row.season_id}]
       ->(cl)
 SET r.years      = row.years,
     r.is_current = row.is_current;
@@ -0,0 +1,190 @@
+import os, re, sys, json, time, argparse
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from graph_index import DATA_DIR, EDGE_DIR
+from metrics import timed, main_entry
+
+# =============================
+# Phép chiếu đồ thị theo mùa giải (scipy.sparse)
+#   B  = ma trận liên thuộc cầu thủ × (CLB, mùa)       (1 nếu cầu thủ đá cho CLB trong mùa đó)
+#   teammates    = B · Bᵀ (bỏ đường chéo)              trọng số = số (CLB, mùa) chơi chung
+#   coach_player = C · Bᵀ  (C: HLV × (CLB, mùa))       trọng số = số (CLB, mùa) làm việc cùng nhau
+#     (CLB, mùa) của HLV suy từ cột years: nhiệm kỳ = ngày bắt đầu → ngày kết thúc ghi trong ô, nếu không có thì
+#     tới ngày HLV kế tiếp của CLB bắt đầu; chỉ giữ các mùa giao với mùa có đội hình (season_id của coached.csv
+#     là mùa lúc crawl, không phải mùa HLV làm việc)
+#   python projection.py build
+#   python projection.py teammates player_bukayo_saka
+# =============================
+PROJ_DIR = os.path.join(DATA_DIR, "projections")
+
+def incidence(rows, groups, row_keys=None, group_keys=None):
+    """Ma trận CSR nhị phân rows × groups từ 2 mảng khoá (cặp trùng chỉ tính 1)."""
+    if row_keys is None:
+        row_keys = pd.Index(pd.unique(rows))
+    if group_keys is None:
+        group_keys = pd.Index(pd.unique(groups))
+    r, g = row_keys.get_indexer(rows), group_keys.get_indexer(groups)
+    ok = (r >= 0) & (g >= 0)
+    m = sp.csr_matrix((np.ones(ok.sum(), dtype=np.int32), (r[ok], g[ok])), shape=(len(row_keys), len(group_keys)))
+    m.sum_duplicates()
+    m.data[:] = 1
+    return m, row_keys, group_keys
+
+def _club_seasons(name, edge_dir=EDGE_DIR):
+    df = pd.read_csv(os.path.join(edge_dir, f"{name}.csv"), dtype=str)
+    df = df.dropna(subset=[df.columns[0], df.columns[1], "season_id"])
+    return df.iloc[:, 0].to_numpy(), (df.iloc[:, 1] + "|" + df["season_id"]).to_numpy()
+
+MONTHS = {m: i for i, m in enumerate(["January", "February", "March", "April", "May", "June", "July", "August",
+                                       "September", "October", "November", "December"], 1)}
+DATE = re.compile(r"(?:(\d{1,2})\s+)?(?:(" + "|".join(MONTHS) + r")\s+)?(\d{4})")
+SHORT_END = re.compile(r"^\d{4}\s*[–-]\s*(\d{2})\b")
+SEASON = re.compile(r"(\d{4})[–-]\d{2,4}$")
+
+def _date(match, end=False):
+    day, month, year = match
+    year = int(year)
+    if not month:                   # chỉ có năm: bắt đầu từ mùa mở vào năm đó, rời đi lúc nào đó trong năm
+        return pd.Timestamp(year, 12, 31) if end else pd.Timestamp(year, 7, 1)
+    return pd.Timestamp(year, MONTHS[month], int(day) if day else 1)
+
+def tenure(years):
+    """'1 October 1996' / '2018–19' / '1949–1955' / '1 June 2024 30 June 2025' → (bắt đầu, kết thúc | NaT)."""
+    years = str(years)
+    found = DATE.findall(years)
+    if not found:
+        return pd.NaT, pd.NaT
+    if len(found) > 1:
+        return _date(found[0]), _date(found[1], end=True)
+    short = SHORT_END.match(years)
+    if short:                       # '2018–19' là mùa giải → hết mùa
+        return _date(found[0]), pd.Timestamp(int(found[0][2]) // 100 * 100 + int(short.group(1)), 6, 30)
+    return _date(found[0]), pd.NaT
+
+def _coach_club_seasons(edge_dir=EDGE_DIR, season_ids=()):
+    """(HLV, 'CLB|mùa') cho mọi mùa trong season_ids giao với nhiệm kỳ của HLV ở CLB đó + khoá mọi HLV
+    (HLV không giao mùa nào vẫn có hàng, rỗng)."""
+    df = pd.read_csv(os.path.join(edge_dir, "coached.csv"), dtype=str)
+    coach, club = df.columns[0], df.columns[1]
+    df = df.dropna(subset=[coach, club])
+    keys = pd.Index(pd.unique(df[coach]))
+    spans = [tenure(y) for y in df["years"].fillna("")]
+    df = df.assign(start=[s for s, _ in spans], end=[e for _, e in spans])
+    # không ghi ngày kết thúc → tới khi HLV kế tiếp của CLB bắt đầu; HLV cuối / đương nhiệm → còn đang làm
+    df = df.dropna(subset=["start"]).sort_values([club, "start"], kind="stable")
+    df["end"] = df["end"].fillna(df.groupby(club)["start"].shift(-1)).fillna(pd.Timestamp.max)
+
+    seasons = {sid: int(m.group(1)) for sid in season_ids if (m := SEASON.search(sid))}
+    coaches, groups = [], []
+    for sid, y in seasons.items():
+        first, last = pd.Timestamp(y, 7, 1), pd.Timestamp(y + 1, 5, 31)
+        hit = df[(df["start"] <= last) & (df["end"] > first)]
+        coaches.append(hit[coach].to_numpy())
+        groups.append((hit[club] + "|" + sid).to_numpy())
+    if not coaches:
+        return np.array([], dtype=str), np.array([], dtype=str), keys
+    return np.concatenate(coaches), np.concatenate(groups), keys
+
+def teammate_matrix(B):
+    W = (B @ B.T).tocsr()
+    W.setdiag(0)
+    W.eliminate_zeros()
+    return W
+
+@timed("build", name="projection.build", rows=None)
+def build(edge_dir=EDGE_DIR, out_dir=PROJ_DIR):
+    timings = {}
+    t0 = time.perf_counter()
+    players, p_groups = _club_seasons("played_for", edge_dir)
+    B, player_keys, group_keys = incidence(players, p_groups)
+    timings["incidence"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    W = teammate_matrix(B)
+    timings["teammates"] = time.perf_counter() - t0
+
+    coach_path = os.path.join(edge_dir, "coached.csv")
+    CP, coach_keys = None, pd.Index([])
+    if os.path.exists(coach_path):
+        t0 = time.perf_counter()
+        season_ids = pd.unique(pd.Series(p_groups).str.split("|").str[-1])
+        coaches, c_groups, coach_keys = _coach_club_seasons(edge_dir, season_ids)
+        C, coach_keys, _ = incidence(coaches, c_groups, row_keys=coach_keys, group_keys=group_keys)
+        CP = (C @ B.T).tocsr()
+        CP.eliminate_zeros()
+        timings["coach_player"] = time.perf_counter() - t0
+
+    os.makedirs(out_dir, exist_ok=True)
+    sp.save_npz(os.path.join(out_dir, "teammates.npz"), W)
+    np.save(os.path.join(out_dir, "player_keys.npy"), player_keys.to_numpy(dtype=str))
+    if CP is not None:
+        sp.save_npz(os.path.join(out_dir, "coach_player.npz"), CP)
+        np.save(os.path.join(out_dir, "coach_keys.npy"), coach_keys.to_numpy(dtype=str))
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"players": len(player_keys), "club_seasons": len(group_keys), "coaches": len(coach_keys),
+                   "teammate_pairs": W.nnz // 2, "coach_player_pairs": 0 if CP is None else CP.nnz,
+                   "timings": timings}, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Đồng đội: {len(player_keys)} cầu thủ, {len(group_keys)} (CLB, mùa), {W.nnz // 2} cặp "
+          f"({timings['teammates'] * 1000:.1f} ms)")
+    if CP is not None:
+        print(f"✅ HLV–cầu thủ: {len(coach_keys)} HLV, {CP.nnz} cặp ({timings['coach_player'] * 1000:.1f} ms)")
+    print(f"💾 → {out_dir}")
+    return W, CP
+
+class Projection:
+    """Nạp kết quả đã lưu: ma trận CSR + khoá (đã sắp theo thứ tự hàng)."""
+
+    def __init__(self, out_dir=PROJ_DIR):
+        self.teammates = sp.load_npz(os.path.join(out_dir, "teammates.npz")).tocsr()
+        self.player_keys = pd.Index(np.load(os.path.join(out_dir, "player_keys.npy")))
+        cp = os.path.join(out_dir, "coach_player.npz")
+        self.coach_player = sp.load_npz(cp).tocsr() if os.path.exists(cp) else None
+        self.coach_keys = (pd.Index(np.load(os.path.join(out_dir, "coach_keys.npy")))
+                           if self.coach_player is not None else pd.Index([]))
+
+    @staticmethod
+    def _row(M, i, keys):
+        lo, hi = M.indptr[i], M.indptr[i + 1]
+        order = np.argsort(-M.data[lo:hi], kind="stable")
+        return [(keys[j], int(w)) for j, w in zip(M.indices[lo:hi][order], M.data[lo:hi][order])]
+
+    @timed("query", name="Projection.teammates_of")
+    def teammates_of(self, player):
+        return self._row(self.teammates, self.player_keys.get_loc(player), self.player_keys)
+
+    @timed("query", name="Projection.players_of_coach")
+    def players_of_coach(self, coach):
+        return self._row(self.coach_player, self.coach_keys.get_loc(coach), self.player_keys)
+
+    @timed("query", name="Projection.coaches_of")
+    def coaches_of(self, player):
+        col = self.coach_player[:, self.player_keys.get_loc(player)].tocoo()
+        order = np.argsort(-col.data, kind="stable")
+        return [(self.coach_keys[i], int(w)) for i, w in zip(col.row[order], col.data[order])]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Đồ thị đồng đội / HLV–cầu thủ theo mùa (sparse)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build")
+    for name in ("teammates", "coaches", "players"):
+        q = sub.add_parser(name)
+        q.add_argument("key", help="player_* (teammates/coaches) hoặc coach_* (players)")
+        q.add_argument("--top", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        build()
+        return
+    proj = Projection()
+    lookup = {"teammates": proj.teammates_of, "coaches": proj.coaches_of, "players": proj.players_of_coach}
+    try:
+        rows = lookup[args.cmd](args.key)
+    except KeyError:
+        sys.exit(f"❌ Không có {args.key} trong phép chiếu")
+    for key, w in rows[:args.top]:
+        print(f"  {w:>3}  {key}")
+
+if __name__ == "__main__":
+    main_entry("projection", main)